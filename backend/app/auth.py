@@ -1,5 +1,9 @@
-import json
+import time
+import asyncio
 import bcrypt
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from pathlib import Path
@@ -8,13 +12,31 @@ from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from .config import DATA_DIR, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_HOURS, DEFAULT_ADMIN
+from .config import (
+    DATA_DIR, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_HOURS, DEFAULT_ADMIN,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING,
+    LOGIN_MAX_FAILURES, LOGIN_FAILURE_WINDOW, LAST_LOGIN_FLUSH_DELAY
+)
+from .services.signed_urls import verify_signature
+from .services.json_store import JsonStore
+from .services.tracing import span
 
 # Bearer token security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # User data file
 USERS_FILE = DATA_DIR / "users.json"
+USERS_STORE = JsonStore(USERS_FILE, lambda: {"users": [], "next_id": 1}, indent=2)
+
+# Username index over the hot users.json copy, rebuilt when any worker saves it
+_users_cache = {"data": None, "by_username": {}}
+_users_lock = threading.Lock()
+
+# Verified token payloads (token -> payload), evicted at expiry or when full
+TOKEN_CACHE_SIZE = 1024
+_token_cache = OrderedDict()
+_token_lock = threading.Lock()
 
 
 def hash_password(password: str) -> str:
@@ -29,7 +51,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def init_users():
     """Initialize users.json with default admin if not exists"""
-    if not USERS_FILE.exists():
+    if not USERS_STORE.exists():
         default_user = {
             "id": 1,
             "username": DEFAULT_ADMIN["username"],
@@ -38,31 +60,61 @@ def init_users():
             "created_at": datetime.now().isoformat(),
             "last_login": None
         }
-        save_users({"users": [default_user], "next_id": 2})
+        # Re-check under the lock: several workers may start at once
+        with USERS_STORE.lock:
+            if not USERS_STORE.exists():
+                USERS_STORE.save({"users": [default_user], "next_id": 2})
     return load_users()
 
 
 def load_users() -> dict:
-    """Load users from JSON file"""
-    if USERS_FILE.exists():
-        with open(USERS_FILE, "r") as f:
-            return json.load(f)
-    return {"users": [], "next_id": 1}
+    """Load users from JSON file (private copy, safe to modify)"""
+    return USERS_STORE.load_for_update()
 
 
 def save_users(data: dict):
-    """Save users to JSON file"""
-    with open(USERS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    """Save users to JSON file (atomic, locked across workers)"""
+    with USERS_STORE.lock:
+        USERS_STORE.save(data)
+    invalidate_user_cache()
+
+
+def _update_users(mutate) -> bool:
+    """Locked read-modify-write of users.json; mutate(data) returns whether to save"""
+    with USERS_STORE.lock:
+        data = load_users()
+        changed = mutate(data)
+        if changed:
+            USERS_STORE.save(data)
+    if changed:
+        invalidate_user_cache()
+    return changed
+
+
+def invalidate_user_cache():
+    """Forget the cached users.json (next lookup re-reads it)"""
+    with _users_lock:
+        _users_cache["data"] = None
+        _users_cache["by_username"] = {}
+
+
+def _get_users_by_username() -> dict:
+    """Get {username: user}, parsing users.json only after a change"""
+    data = USERS_STORE.load()
+    with _users_lock:
+        if _users_cache["data"] is data:
+            return _users_cache["by_username"]
+    
+    by_username = {user["username"]: user for user in data["users"]}
+    with _users_lock:
+        _users_cache["data"] = data
+        _users_cache["by_username"] = by_username
+    return by_username
 
 
 def get_user_by_username(username: str) -> Optional[dict]:
-    """Get user by username"""
-    data = load_users()
-    for user in data["users"]:
-        if user["username"] == username:
-            return user
-    return None
+    """Get user by username (cached; treat the result as read-only)"""
+    return _get_users_by_username().get(username)
 
 
 def create_access_token(data: dict) -> str:
@@ -75,17 +127,83 @@ def create_access_token(data: dict) -> str:
 
 
 def verify_token(token: str) -> Optional[dict]:
-    """Verify JWT token and return payload"""
+    """Verify JWT token and return payload (cached until the token expires)"""
+    now = time.time()
+    with _token_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            if cached["exp"] > now:
+                _token_cache.move_to_end(token)
+                return cached
+            del _token_cache[token]
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    # Tokens without an expiry are verified every time rather than cached forever
+    if isinstance(payload.get("exp"), (int, float)):
+        with _token_lock:
+            _token_cache[token] = payload
+            _token_cache.move_to_end(token)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Dependency to get current authenticated user"""
-    token = credentials.credentials
+    return authenticate_token(credentials.credentials)
+
+
+async def get_admin_user(user: dict = Depends(get_current_user)):
+    """Dependency for maintenance endpoints: only the admin account"""
+    if user["username"] != DEFAULT_ADMIN["username"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin only",
+        )
+    return user
+
+
+async def get_current_user_from_query(token: str):
+    """Dependency for clients that cannot send headers (EventSource): ?token="""
+    return authenticate_token(token)
+
+
+def media_access(variant: str):
+    """Dependency factory for media routes: a signed URL or a bearer token.
+
+    Returns the signature's expiry (None when authorized by token), so the
+    route can choose cache headers.
+    """
+    async def dependency(
+        file_id: str,
+        exp: Optional[int] = None,
+        sig: Optional[str] = None,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+    ) -> Optional[int]:
+        if exp is not None and sig and verify_signature(file_id, variant, exp, sig):
+            return exp
+        if credentials is not None:
+            authenticate_token(credentials.credentials)
+            return None
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired link",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return dependency
+
+
+def authenticate_token(token: str) -> dict:
+    """Resolve a bearer token to its user or raise 401"""
+    with span("auth"):
+        return _authenticate_token(token)
+
+
+def _authenticate_token(token: str) -> dict:
     payload = verify_token(token)
     
     if payload is None:
@@ -114,20 +232,140 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 def update_user_password(username: str, new_password: str) -> bool:
     """Update user password"""
-    data = load_users()
-    for user in data["users"]:
-        if user["username"] == username:
-            user["password_hash"] = hash_password(new_password)
-            save_users(data)
-            return True
-    return False
+    password_hash = hash_password(new_password)  # Slow - done before taking the lock
+    
+    def mutate(data: dict) -> bool:
+        for user in data["users"]:
+            if user["username"] == username:
+                user["password_hash"] = password_hash
+                return True
+        return False
+    
+    return _update_users(mutate)
 
 
 def update_last_login(username: str):
     """Update user's last login time"""
-    data = load_users()
-    for user in data["users"]:
-        if user["username"] == username:
-            user["last_login"] = datetime.now().isoformat()
-            save_users(data)
-            break
+    def mutate(data: dict) -> bool:
+        for user in data["users"]:
+            if user["username"] == username:
+                user["last_login"] = datetime.now().isoformat()
+                return True
+        return False
+    
+    _update_users(mutate)
+
+
+# ============ Login Throughput ============
+
+# bcrypt is deliberately slow, so it never runs on the event loop
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending_hashes = 0
+_pending_lock = threading.Lock()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool (503 when too many are queued)"""
+    global _pending_hashes
+    with _pending_lock:
+        if _pending_hashes >= PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many logins in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending_hashes += 1
+    
+    try:
+        loop = asyncio.get_running_loop()
+        with span("password_check"):
+            return await loop.run_in_executor(_password_pool, verify_password, plain_password, hashed_password)
+    finally:
+        with _pending_lock:
+            _pending_hashes -= 1
+
+
+# Failed logins per client+username: key -> [count, first failure time]
+_login_failures = {}
+_login_failures_lock = threading.Lock()
+
+
+def check_login_allowed(key: str):
+    """Refuse (429) a key that failed too often, before any hashing"""
+    now = time.time()
+    with _login_failures_lock:
+        entry = _login_failures.get(key)
+        if entry is None:
+            return
+        count, first = entry
+        if now - first >= LOGIN_FAILURE_WINDOW:
+            del _login_failures[key]
+            return
+    
+    if count >= LOGIN_MAX_FAILURES:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(int(LOGIN_FAILURE_WINDOW - (now - first)) + 1)},
+        )
+
+
+def record_login_failure(key: str):
+    """Count a failed login for a key"""
+    now = time.time()
+    with _login_failures_lock:
+        entry = _login_failures.get(key)
+        if entry is None or now - entry[1] >= LOGIN_FAILURE_WINDOW:
+            _login_failures[key] = [1, now]
+        else:
+            entry[0] += 1
+        
+        # Keep the table bounded under credential stuffing
+        if len(_login_failures) > 10000:
+            for stale in [k for k, (_, first) in _login_failures.items() if now - first >= LOGIN_FAILURE_WINDOW]:
+                del _login_failures[stale]
+
+
+def clear_login_failures(key: str):
+    """Forget failures after a successful login"""
+    with _login_failures_lock:
+        _login_failures.pop(key, None)
+
+
+# last_login timestamps waiting to be written in one users.json save
+_pending_last_login = {}
+_last_login_timer = None
+_last_login_lock = threading.Lock()
+
+
+def schedule_last_login(username: str):
+    """Record a login time; writes are coalesced and done off the request path"""
+    global _last_login_timer
+    with _last_login_lock:
+        _pending_last_login[username] = datetime.now().isoformat()
+        if _last_login_timer is None:
+            _last_login_timer = threading.Timer(LAST_LOGIN_FLUSH_DELAY, flush_last_logins)
+            _last_login_timer.daemon = True
+            _last_login_timer.start()
+
+
+def flush_last_logins():
+    """Write all pending last_login times in a single save"""
+    global _last_login_timer
+    with _last_login_lock:
+        pending = dict(_pending_last_login)
+        _pending_last_login.clear()
+        if _last_login_timer is not None:
+            _last_login_timer.cancel()
+            _last_login_timer = None
+    
+    if not pending:
+        return
+    
+    def mutate(data: dict) -> bool:
+        for user in data["users"]:
+            if user["username"] in pending:
+                user["last_login"] = pending[user["username"]]
+        return True
+    
+    _update_users(mutate)
@@ -5,16 +5,18 @@ from pathlib import Path
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
+INDEX_DIR = DATA_DIR / "index"  # Sidecar indexes (archive listings, etc.)
 STORAGE_DIR = BASE_DIR / "storage"
 FILES_DIR = STORAGE_DIR / "files"
 THUMBNAILS_DIR = STORAGE_DIR / "thumbnails"
 CHUNKS_DIR = STORAGE_DIR / "chunks"
 
-# Create directories if not exist
-DATA_DIR.mkdir(exist_ok=True)
-FILES_DIR.mkdir(parents=True, exist_ok=True)
-THUMBNAILS_DIR.mkdir(parents=True, exist_ok=True)
-CHUNKS_DIR.mkdir(parents=True, exist_ok=True)
+
+def ensure_directories():
+    """Create data and storage directories if missing (called once at startup)"""
+    for path in (DATA_DIR, INDEX_DIR, FILES_DIR, THUMBNAILS_DIR, CHUNKS_DIR):
+        path.mkdir(parents=True, exist_ok=True)
+
 
 # App config
 APP_NAME = "CloudDrive"
@@ -22,6 +24,12 @@ SECRET_KEY = "your-super-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 
+# Signed media URLs (preview/thumbnail/download) stay valid for at least
+# SIGNED_URL_TTL seconds; expiries are rounded up to SIGNED_URL_BUCKET so
+# URLs are stable (and cacheable) across listings
+SIGNED_URL_TTL = 3600
+SIGNED_URL_BUCKET = 600
+
 # ============ STORAGE CONFIGURATION ============
 # Options:
 #   "all"           - Use ALL available disk space
@@ -73,9 +81,61 @@ def get_disk_usage():
 THUMBNAIL_SIZE = (300, 300)
 THUMBNAIL_SUPPORTED = ["jpg", "jpeg", "png", "gif", "webp", "bmp"]
 
+# Full-text content search - text files larger than this are not indexed
+CONTENT_INDEX_MAX_SIZE = 10 * 1024 * 1024  # 10MB
+# How often the indexing worker picks up files handed over by other workers
+# (and how often the others check whether the indexer is gone)
+CONTENT_INDEX_POLL_INTERVAL = 2  # seconds
+
+# Worker threads for blocking file/metadata I/O (sync handlers, run_io, streaming)
+IO_THREADS = 32
+
+# Request timing - requests slower than this are logged with their span
+# breakdown. The admin-armed sampling profiler polls stacks every
+# PROFILE_INTERVAL seconds and writes folded profiles to PROFILES_DIR.
+SLOW_REQUEST_THRESHOLD = 1.0  # seconds
+PROFILES_DIR = DATA_DIR / "profiles"
+PROFILE_INTERVAL = 0.005  # seconds
+PROFILE_MAX_REQUESTS = 1000
+
+# Event loop lag monitor - samples scheduling delay every LOOP_LAG_INTERVAL.
+# With LOOP_BLOCK_DEBUG on, a watchdog thread prints the loop thread's stack
+# whenever the loop is held longer than LOOP_BLOCK_THRESHOLD.
+LOOP_LAG_INTERVAL = 0.1  # seconds
+LOOP_BLOCK_DEBUG = False
+LOOP_BLOCK_THRESHOLD = 0.25  # seconds
+
+# Storage consistency scanner (fsck) - cross-checks storage/ against
+# files.json on FSCK_WORKERS threads. Files younger than FSCK_GRACE are
+# skipped (an upload may be between its record and its blob). Repair moves
+# orphan blobs to QUARANTINE_DIR instead of deleting them.
+FSCK_DIR = DATA_DIR / "fsck"  # Reports and the hash manifest
+QUARANTINE_DIR = STORAGE_DIR / "quarantine"
+FSCK_WORKERS = 8
+FSCK_GRACE = 60 * 60  # seconds
+
 # Chunk size for large file uploads (5MB chunks)
 CHUNK_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Abandoned chunked uploads - sessions with no chunk for UPLOAD_SESSION_TTL
+# are expired by a background reaper every UPLOAD_REAPER_INTERVAL. Their
+# chunks are deleted at no more than UPLOAD_REAPER_BYTES_PER_SEC; the
+# session metadata is kept for UPLOAD_EXPIRED_RETENTION so status checks
+# report "expired" rather than "not found".
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # seconds
+UPLOAD_REAPER_INTERVAL = 10 * 60  # seconds
+UPLOAD_REAPER_BYTES_PER_SEC = 50 * 1024 * 1024
+UPLOAD_EXPIRED_RETENTION = 7 * 24 * 60 * 60  # seconds
+
+# Login throughput - bcrypt runs on a small pool; beyond MAX_PENDING queued
+# checks logins get 503. Repeated failures per client+username are refused
+# for the rest of the window without hashing.
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_MAX_PENDING = 32
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW = 300  # seconds
+LAST_LOGIN_FLUSH_DELAY = 5  # seconds; last_login writes are batched
+
 # Default admin
 DEFAULT_ADMIN = {
     "username": "admin",
@@ -1,13 +1,23 @@
+import time
+
+# Taken before the imports below so startup can report import time
+_import_started = time.perf_counter()
+
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, Response
 
 from .config import APP_NAME, BASE_DIR
-from .auth import init_users
-from .services.file_service import init_files
-from .routes import auth_routes, files_routes, storage_routes
+from .auth import get_admin_user
+from .startup import initialize, finalize, STARTUP_SECONDS
+from .services.async_io import configure_io_pool, run_io
+from .services.loop_monitor import start_loop_monitor, stop_loop_monitor
+from .services.upload_reaper import start_upload_reaper, stop_upload_reaper
+from .services.metrics import render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .middleware import MetricsMiddleware, TimingMiddleware
+from .routes import auth_routes, files_routes, storage_routes, events_routes, admin_routes
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,32 +35,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and byte counters for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Span breakdown (Server-Timing header), slow-request log and profiler hook
+app.add_middleware(TimingMiddleware)
+
 # Include routers
 app.include_router(auth_routes.router)
 app.include_router(files_routes.router)
 app.include_router(storage_routes.router)
+app.include_router(events_routes.router)
+app.include_router(admin_routes.router)
 
 # Static files directory
 STATIC_DIR = BASE_DIR.parent / "static"
 
-# Mount storage for thumbnail access
-STORAGE_DIR = BASE_DIR / "storage"
-if STORAGE_DIR.exists():
-    app.mount("/storage", StaticFiles(directory=str(STORAGE_DIR)), name="storage")
+# Stored blobs and thumbnails are not mounted: they are served by the
+# preview/thumbnail/download routes, which require a signed URL or a token
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize data on startup"""
-    init_users()
-    init_files()
+    configure_io_pool()
+    start_loop_monitor()
+    
+    started = time.perf_counter()
+    timings, files_source = await run_io(initialize)
+    total = IMPORT_SECONDS + time.perf_counter() - started
+    STARTUP_SECONDS.set(IMPORT_SECONDS, "imports")
+    STARTUP_SECONDS.set(total, "total")
+    start_upload_reaper()
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+    
     print(f"\n{'='*50}")
     print(f"  {APP_NAME} Backend Started!")
     print(f"  API Docs: http://localhost:8000/docs")
     print(f"  Default Login: admin / admin123")
+    print(f"  Startup: {total:.2f}s (imports {IMPORT_SECONDS:.2f}s, {phases}; files.json {files_source})")
     print(f"{'='*50}\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write state that is batched in memory"""
+    stop_loop_monitor()
+    stop_upload_reaper()
+    await run_io(finalize)
+
+
 # Serve static files with proper paths
 @app.get("/")
 async def root():
@@ -100,6 +134,9 @@ if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+
 @app.get("/api")
 async def api_info():
     """API info endpoint"""
@@ -110,7 +147,9 @@ async def api_info():
         "endpoints": {
             "auth": "/api/auth",
             "files": "/api/files",
-            "storage": "/api/storage"
+            "storage": "/api/storage",
+            "events": "/api/events",
+            "admin": "/api/admin"
         }
     }
 
@@ -119,3 +158,9 @@ async def api_info():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics(user: dict = Depends(get_admin_user)):
+    """Prometheus metrics for this worker process (admin only)"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,127 @@
+import time
+from typing import Dict
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import SLOW_REQUEST_THRESHOLD
+from .services.tracing import start_trace
+from .services.profiler import profiler
+from .services.metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_REQUEST_BYTES,
+    HTTP_RESPONSE_BYTES,
+)
+
+
+# Label for requests that matched no route (404s), so random paths
+# cannot blow up metric cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Record latency, status and body bytes per route template.
+
+    Plain ASGI (not BaseHTTPMiddleware) so streamed downloads and SSE pass
+    through untouched; it only peeks at the messages going by.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._route_paths: Dict[int, str] = {}
+
+    def _route_label(self, scope: Scope) -> str:
+        """Route template ("/api/files/{file_id}/download") of the matched endpoint"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if not self._route_paths:
+            for route in scope["app"].routes:
+                target = route.app if isinstance(route, Mount) else getattr(route, "endpoint", None)
+                if target is not None:
+                    self._route_paths.setdefault(id(target), route.path)
+        return self._route_paths.get(id(endpoint), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(1, method)
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(1, method)
+            route = self._route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, route, str(status_code))
+            if request_bytes:
+                HTTP_REQUEST_BYTES.inc(request_bytes, route)
+            if response_bytes:
+                HTTP_RESPONSE_BYTES.inc(response_bytes, route)
+
+
+class TimingMiddleware:
+    """Per-request span timings, slow-request log and profiler hook.
+
+    Opens a RequestTrace that span() blocks fill in, reports it in a
+    Server-Timing header, and logs requests slower than
+    SLOW_REQUEST_THRESHOLD with their breakdown. Requests claimed by an
+    armed SamplingProfiler are sampled while they run.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace()
+        profiled = profiler.request_started()
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", trace.server_timing())
+                # Event streams stay open by design; their duration is not slowness
+                streaming = headers.get("content-type", "").startswith("text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiled:
+                profiler.request_finished()
+            elapsed = trace.elapsed()
+            if elapsed >= SLOW_REQUEST_THRESHOLD and not streaming:
+                breakdown = ", ".join(trace.breakdown()) or "no spans"
+                print(f"Slow request: {scope['method']} {scope['path']} -> {status_code} "
+                      f"in {elapsed:.3f}s ({breakdown})")
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import FileResponse
+
+from ..auth import get_admin_user
+from ..config import PROFILE_MAX_REQUESTS
+from ..services.profiler import profiler, list_profiles, get_profile_path
+from ..services.fsck import fsck_job, list_reports, get_report_path, VERIFY_MODES
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+# ============ Profiling ============
+
+@router.post("/profile")
+def start_profile(
+    requests: int = Query(20, ge=1, le=PROFILE_MAX_REQUESTS),
+    user: dict = Depends(get_admin_user)
+):
+    """Sample stacks during the next N requests and save a folded profile"""
+    profiler.arm(requests)
+    return {"success": True, "data": profiler.status()}
+
+
+@router.get("/profile")
+def get_profile_status(user: dict = Depends(get_admin_user)):
+    """Profiler state and saved profiles (newest first)"""
+    return {
+        "success": True,
+        "data": dict(profiler.status(), profiles=list_profiles())
+    }
+
+
+@router.get("/profile/{name}")
+def download_profile(name: str, user: dict = Depends(get_admin_user)):
+    """Download a saved profile (folded stacks for flamegraph.pl / speedscope)"""
+    path = get_profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+
+# ============ Storage Consistency ============
+
+@router.post("/fsck")
+def start_fsck(
+    verify: str = Query("none"),
+    repair: bool = Query(False),
+    user: dict = Depends(get_admin_user)
+):
+    """Scan storage against the metadata in the background (optionally repair)"""
+    if verify not in VERIFY_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"verify must be one of: {', '.join(VERIFY_MODES)}"
+        )
+    if not fsck_job.start(verify, repair):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A storage scan is already running"
+        )
+    return {"success": True, "data": fsck_job.status()}
+
+
+@router.get("/fsck")
+def get_fsck_status(user: dict = Depends(get_admin_user)):
+    """Scan progress, last report summary and saved reports (newest first)"""
+    return {
+        "success": True,
+        "data": dict(fsck_job.status(), reports=list_reports())
+    }
+
+
+@router.get("/fsck/{name}")
+def download_fsck_report(name: str, user: dict = Depends(get_admin_user)):
+    """Download a saved scan report with every issue listed"""
+    path = get_report_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+    return FileResponse(path, media_type="application/json", filename=name)
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Request
 from pydantic import BaseModel
 from datetime import datetime
 
 from ..auth import (
     get_user_by_username, 
-    verify_password, 
+    verify_password_async, 
     create_access_token,
     update_user_password,
-    update_last_login
+    schedule_last_login,
+    check_login_allowed,
+    record_login_failure,
+    clear_login_failures
 )
+from ..services.async_io import run_io
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -34,27 +38,36 @@ class ResetPasswordRequest(BaseModel):
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, http_request: Request):
     """Login endpoint"""
-    user = get_user_by_username(request.username)
+    # Throttle per client and username, checked before any hashing
+    client = http_request.client.host if http_request.client else "unknown"
+    attempt_key = f"{client}:{request.username}"
+    check_login_allowed(attempt_key)
+    
+    user = await run_io(get_user_by_username, request.username)
     
     if not user:
+        record_login_failure(attempt_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
     
-    if not verify_password(request.password, user["password_hash"]):
+    if not await verify_password_async(request.password, user["password_hash"]):
+        record_login_failure(attempt_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
     
+    clear_login_failures(attempt_key)
+    
     # Create token
     token = create_access_token({"sub": user["username"]})
     
-    # Update last login
-    update_last_login(user["username"])
+    # Update last login (batched write)
+    schedule_last_login(user["username"])
     
     return {
         "success": True,
@@ -92,7 +105,7 @@ async def forgot_password(request: ForgotPasswordRequest):
 
 
 @router.post("/reset-password")
-async def reset_password(request: ResetPasswordRequest):
+def reset_password(request: ResetPasswordRequest):
     """Reset password with new password"""
     # For simplicity, we accept any token for local use
     # In production, validate the reset token
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from ..auth import get_current_user_from_query
+from ..services.event_service import broker, encode_event, EVENT_KEEPALIVE, EVENT_POLL_INTERVAL
+from ..services.file_service import get_current_seq, get_changes_since
+from ..services.signed_urls import with_signed_urls
+from ..services.async_io import run_io
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+_relay_task: Optional[asyncio.Task] = None
+
+
+def _changes_since(since: int) -> dict:
+    data = get_changes_since(since)
+    for change in data["changes"]:
+        change["record"] = with_signed_urls(change["record"])
+    return data
+
+
+async def _relay_other_workers():
+    """While this worker has subscribers, forward changes saved by other workers"""
+    global _relay_task
+    while broker.subscriber_count:
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+        try:
+            if await run_io(get_current_seq) != broker.cursor:
+                broker.relay(await run_io(_changes_since, broker.cursor))
+        except Exception as e:
+            print(f"Event relay failed: {e}")
+    _relay_task = None
+
+
+@router.get("")
+async def event_stream(
+    request: Request,
+    folder_id: Optional[str] = None,
+    user: dict = Depends(get_current_user_from_query)
+):
+    """Server-Sent Events stream of file, thumbnail and upload-progress events.
+
+    Pass ?folder_id=<id> (empty for root) to only receive events for one
+    folder; omit it to receive everything. Auth via ?token= since
+    EventSource cannot send headers.
+    """
+    global _relay_task
+    all_folders = "folder_id" not in request.query_params
+    sub = broker.subscribe(folder_id or None, all_folders)
+    seq = await run_io(get_current_seq)
+    if _relay_task is None:
+        broker.cursor = seq
+        _relay_task = asyncio.get_running_loop().create_task(_relay_other_workers())
+    
+    async def stream():
+        try:
+            # Cursor lets the client detect gaps and fall back to /changes
+            yield encode_event("ready", {"seq": seq})
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    frame = ": keep-alive\n\n"
+                yield frame
+        finally:
+            broker.unsubscribe(sub)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
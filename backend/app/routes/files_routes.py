@@ -1,19 +1,18 @@
 import os
 import shutil
 import uuid
-import json
 from pathlib import Path
 from typing import Optional, List
 from datetime import datetime
+from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Query, Form, Request, Header
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Query, Form, Request, Header, Response
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
-from ..auth import get_current_user
+from ..auth import get_current_user, media_access
 from ..config import FILES_DIR, CHUNKS_DIR, CHUNK_SIZE, THUMBNAIL_SUPPORTED
 from ..services.file_service import (
-    init_files,
     create_file_record,
     get_file_by_id,
     get_files_in_folder,
@@ -24,9 +23,46 @@ from ..services.file_service import (
     get_breadcrumb,
     get_folder_item_count,
     search_files,
-    get_storage_stats
+    get_storage_stats,
+    get_archive_entries,
+    get_mime_type,
+    load_files_data,
+    get_folder_tree,
+    find_existing_names,
+    NameConflictError,
+    CONFLICT_POLICIES,
+    get_changes_since,
+    get_current_seq,
+    get_folder_version
+)
+from ..services.archive_service import (
+    stream_zip,
+    archive_filename,
+    load_archive_index,
+    list_archive_entries,
+    find_archive_entry,
+    stream_archive_member
+)
+from ..services.thumbnail_service import generate_image_thumbnail
+from ..services.text_service import read_lines, read_bytes
+from ..services.event_service import broker
+from ..services.signed_urls import with_signed_urls, current_expiry, signed_cache_control
+from ..services.async_io import run_io, write_bytes
+from ..services.upload_sessions import session_lock, read_metadata, write_metadata, record_chunk
+from ..services.metrics import UPLOAD_BYTES
+from ..services.upload_reaper import session_expires_at
+from ..services.tracing import span
+from ..services.content_index import search_content, schedule_content_index, schedule_content_removal
+from ..services.http_cache import (
+    REVALIDATE_CACHE_CONTROL,
+    build_etag,
+    record_timestamp,
+    is_not_modified,
+    if_range_matches,
+    parse_range,
+    validator_headers,
+    not_modified_response
 )
-from ..services.thumbnail_service import generate_image_thumbnail, get_image_dimensions
 
 
 router = APIRouter(prefix="/api/files", tags=["Files"])
@@ -45,25 +81,101 @@ class MoveRequest(BaseModel):
     destination_folder_id: Optional[str] = None
 
 
+class ArchiveRequest(BaseModel):
+    file_ids: List[str]
+    name: Optional[str] = None
+
+
 class ChunkUploadInit(BaseModel):
     filename: str
     file_size: int
     total_chunks: int
     folder_id: Optional[str] = None
+    conflict: Optional[str] = None
 
 
-# Initialize files on module load
-init_files()
+class NameCheckRequest(BaseModel):
+    folder_id: Optional[str] = None
+    names: List[str]
+
+
+def _check_conflict_policy(conflict: Optional[str]):
+    """Validate the conflict query/form value"""
+    if conflict is not None and conflict not in CONFLICT_POLICIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"conflict must be one of: {', '.join(CONFLICT_POLICIES)}"
+        )
+
+
+def _conflict_response(error: NameConflictError, conflict: Optional[str]):
+    """Skip -> success with the existing record, anything else -> 409"""
+    if conflict == "skip":
+        return {
+            "success": True,
+            "message": "Skipped, name already exists",
+            "data": {"skipped": True, "existing": error.existing}
+        }
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=str(error)
+    )
+
+
+def _finish_upload(record: dict, file_path: Path):
+    """Post-write steps shared by both upload paths: thumbnail and content index"""
+    name = record["original_filename"]
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    
+    # Generate thumbnail ONLY for supported image formats
+    if record["file_type"] == "image" and ext in THUMBNAIL_SUPPORTED:
+        try:
+            thumb_path = generate_image_thumbnail(file_path, record["id"])
+            if thumb_path:
+                update_file(record["id"], {"thumbnail_path": thumb_path})
+                record["thumbnail_path"] = thumb_path
+                broker.publish("thumbnail", {
+                    "id": record["id"],
+                    "thumbnail_path": thumb_path
+                }, [record["parent_folder_id"]])
+        except Exception:
+            pass  # Thumbnail failed, continue without it
+    
+    schedule_content_index(record)
 
 
 # ============ Chunked Upload Endpoints ============
 
+def _upload_expired(metadata: dict) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_410_GONE,
+        detail=f"Upload session expired at {metadata.get('expired_at')} after being idle; start a new upload"
+    )
+
+
+def _check_session_open(metadata: dict):
+    """Reject chunks for sessions that are no longer accepting them"""
+    if metadata["status"] == "expired":
+        raise _upload_expired(metadata)
+    if metadata["status"] != "in_progress":
+        raise HTTPException(status_code=400, detail="Upload already completed or cancelled")
+
+
 @router.post("/upload/init")
-async def init_chunked_upload(
+def init_chunked_upload(
     request: ChunkUploadInit,
     user: dict = Depends(get_current_user)
 ):
     """Initialize a chunked upload session"""
+    _check_conflict_policy(request.conflict)
+    
+    # Fail fast so the client doesn't send chunks that can never be stored
+    # (the final check still happens atomically on complete)
+    if request.conflict in ("fail", "skip"):
+        existing = find_existing_names(request.folder_id, [request.filename])
+        if existing:
+            return _conflict_response(NameConflictError(existing[request.filename]), request.conflict)
+    
     upload_id = str(uuid.uuid4())
     
     # Create upload session directory
@@ -77,13 +189,13 @@ async def init_chunked_upload(
         "file_size": request.file_size,
         "total_chunks": request.total_chunks,
         "folder_id": request.folder_id,
+        "conflict": request.conflict,
         "uploaded_chunks": [],
         "status": "in_progress",
         "created_at": datetime.now().isoformat()
     }
     
-    with open(upload_dir / "metadata.json", "w") as f:
-        json.dump(metadata, f)
+    write_metadata(upload_dir, metadata)
     
     return {
         "success": True,
@@ -104,28 +216,33 @@ async def upload_chunk(
     """Upload a single chunk"""
     upload_dir = CHUNKS_DIR / upload_id
     
-    if not upload_dir.exists():
+    # Read metadata (fail fast before reading the body)
+    try:
+        metadata = await run_io(read_metadata, upload_dir)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Upload session not found")
+    _check_session_open(metadata)
     
-    # Read metadata
-    with open(upload_dir / "metadata.json", "r") as f:
-        metadata = json.load(f)
-    
-    if metadata["status"] != "in_progress":
-        raise HTTPException(status_code=400, detail="Upload already completed or cancelled")
-    
-    # Save chunk
+    # Save chunk to a part file, then move it into place and update the
+    # metadata in one step under the session lock (re-read there, so
+    # parallel chunks don't overwrite each other's progress)
     chunk_data = await chunk.read()
-    chunk_path = upload_dir / f"chunk_{chunk_index}"
-    with open(chunk_path, "wb") as f:
-        f.write(chunk_data)
-    
-    # Update metadata
-    if chunk_index not in metadata["uploaded_chunks"]:
-        metadata["uploaded_chunks"].append(chunk_index)
+    part_path = upload_dir / f"chunk_{chunk_index}.{uuid.uuid4().hex}.part"
+    try:
+        await write_bytes(part_path, chunk_data)
+        metadata = await run_io(record_chunk, upload_dir, chunk_index, part_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    _check_session_open(metadata)
+    UPLOAD_BYTES.inc(len(chunk_data), "chunked")
     
-    with open(upload_dir / "metadata.json", "w") as f:
-        json.dump(metadata, f)
+    broker.publish("upload_progress", {
+        "upload_id": upload_id,
+        "filename": metadata["filename"],
+        "folder_id": metadata["folder_id"],
+        "uploaded_chunks": len(metadata["uploaded_chunks"]),
+        "total_chunks": metadata["total_chunks"]
+    }, [metadata["folder_id"]])
     
     return {
         "success": True,
@@ -138,56 +255,68 @@ async def upload_chunk(
 
 
 @router.post("/upload/complete/{upload_id}")
-async def complete_chunked_upload(
+def complete_chunked_upload(
     upload_id: str,
     user: dict = Depends(get_current_user)
 ):
     """Complete chunked upload - merge chunks into final file"""
     upload_dir = CHUNKS_DIR / upload_id
     
-    if not upload_dir.exists():
+    # Claim the session under its lock: from here on late chunks are
+    # discarded and the reaper leaves it alone
+    try:
+        with session_lock(upload_dir):
+            metadata = read_metadata(upload_dir)
+            _check_session_open(metadata)
+            
+            # Verify all chunks received (on disk, not just listed)
+            total = metadata["total_chunks"]
+            present = sum(1 for i in range(total) if (upload_dir / f"chunk_{i}").exists())
+            if present != total:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Missing chunks. Got {present}, expected {total}"
+                )
+            
+            metadata["status"] = "completing"
+            metadata["updated_at"] = datetime.now().isoformat()
+            write_metadata(upload_dir, metadata)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Upload session not found")
     
-    # Read metadata
-    with open(upload_dir / "metadata.json", "r") as f:
-        metadata = json.load(f)
-    
-    # Verify all chunks received
-    if len(metadata["uploaded_chunks"]) != metadata["total_chunks"]:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Missing chunks. Got {len(metadata['uploaded_chunks'])}, expected {metadata['total_chunks']}"
-        )
-    
     # Create file record
-    record = create_file_record(
-        filename=metadata["filename"],
-        original_filename=metadata["filename"],
-        file_size=metadata["file_size"],
-        parent_folder_id=metadata["folder_id"],
-        is_folder=False
-    )
+    try:
+        record = create_file_record(
+            filename=metadata["filename"],
+            original_filename=metadata["filename"],
+            file_size=metadata["file_size"],
+            parent_folder_id=metadata["folder_id"],
+            is_folder=False,
+            conflict=metadata.get("conflict")
+        )
+    except NameConflictError as e:
+        shutil.rmtree(upload_dir)
+        return _conflict_response(e, metadata.get("conflict"))
     
     # Save file directly in files/ folder (no subfolder)
     file_path = FILES_DIR / record["filename"]
     
     # Merge chunks
-    with open(file_path, "wb") as outfile:
-        for i in range(metadata["total_chunks"]):
-            chunk_path = upload_dir / f"chunk_{i}"
-            with open(chunk_path, "rb") as chunk_file:
-                outfile.write(chunk_file.read())
-    
-    # Generate thumbnail for supported images
-    ext = metadata["filename"].rsplit(".", 1)[-1].lower() if "." in metadata["filename"] else ""
-    if record["file_type"] == "image" and ext in THUMBNAIL_SUPPORTED:
-        try:
-            thumb_path = generate_image_thumbnail(file_path, record["id"])
-            if thumb_path:
-                update_file(record["id"], {"thumbnail_path": thumb_path})
-                record["thumbnail_path"] = thumb_path
-        except Exception:
-            pass  # Thumbnail generation failed, continue without it
+    try:
+        with open(file_path, "wb") as outfile:
+            for i in range(metadata["total_chunks"]):
+                chunk_path = upload_dir / f"chunk_{i}"
+                with open(chunk_path, "rb") as chunk_file:
+                    shutil.copyfileobj(chunk_file, outfile, CHUNK_SIZE)
+    except OSError:
+        # Don't leave a record without a blob; the client may retry complete
+        delete_file_record(record["id"])
+        with session_lock(upload_dir):
+            metadata["status"] = "in_progress"
+            write_metadata(upload_dir, metadata)
+        raise
+    
+    _finish_upload(record, file_path)
     
     # Cleanup chunks
     shutil.rmtree(upload_dir)
@@ -200,7 +329,7 @@ async def complete_chunked_upload(
 
 
 @router.get("/upload/status/{upload_id}")
-async def get_upload_status(
+def get_upload_status(
     upload_id: str,
     user: dict = Depends(get_current_user)
 ):
@@ -210,23 +339,30 @@ async def get_upload_status(
     if not upload_dir.exists():
         raise HTTPException(status_code=404, detail="Upload session not found")
     
-    with open(upload_dir / "metadata.json", "r") as f:
-        metadata = json.load(f)
+    metadata = read_metadata(upload_dir)
+    
+    data = {
+        "upload_id": upload_id,
+        "filename": metadata["filename"],
+        "uploaded_chunks": sorted(metadata["uploaded_chunks"]),
+        "total_chunks": metadata["total_chunks"],
+        "status": metadata["status"]
+    }
+    if metadata["status"] == "expired":
+        # Chunks are gone; the client has to start over with /upload/init
+        data["expired_at"] = metadata.get("expired_at")
+        data["message"] = "Upload session expired after being idle; start a new upload"
+    else:
+        data["expires_at"] = session_expires_at(metadata).isoformat()
     
     return {
         "success": True,
-        "data": {
-            "upload_id": upload_id,
-            "filename": metadata["filename"],
-            "uploaded_chunks": sorted(metadata["uploaded_chunks"]),
-            "total_chunks": metadata["total_chunks"],
-            "status": metadata["status"]
-        }
+        "data": data
     }
 
 
 @router.delete("/upload/cancel/{upload_id}")
-async def cancel_chunked_upload(
+def cancel_chunked_upload(
     upload_id: str,
     user: dict = Depends(get_current_user)
 ):
@@ -245,37 +381,35 @@ async def cancel_chunked_upload(
 async def upload_file(
     file: UploadFile = File(...),
     folder_id: Optional[str] = Form(None),
+    conflict: Optional[str] = Form(None),
     user: dict = Depends(get_current_user)
 ):
     """Upload a file (no size limit)"""
+    _check_conflict_policy(conflict)
+    
     # Read file contents
     contents = await file.read()
     file_size = len(contents)
     
     # Create file record (no extension restrictions!)
-    record = create_file_record(
-        filename=file.filename,
-        original_filename=file.filename,
-        file_size=file_size,
-        parent_folder_id=folder_id,
-        is_folder=False
-    )
+    try:
+        record = await run_io(
+            create_file_record,
+            filename=file.filename,
+            original_filename=file.filename,
+            file_size=file_size,
+            parent_folder_id=folder_id,
+            is_folder=False,
+            conflict=conflict
+        )
+    except NameConflictError as e:
+        return _conflict_response(e, conflict)
     
     # Save file directly in files/ folder (no subfolder)
     file_path = FILES_DIR / record["filename"]
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # Generate thumbnail ONLY for supported image formats
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
-    if record["file_type"] == "image" and ext in THUMBNAIL_SUPPORTED:
-        try:
-            thumb_path = generate_image_thumbnail(file_path, record["id"])
-            if thumb_path:
-                update_file(record["id"], {"thumbnail_path": thumb_path})
-                record["thumbnail_path"] = thumb_path
-        except Exception:
-            pass  # Thumbnail failed, continue without it
+    await write_bytes(file_path, contents)
+    UPLOAD_BYTES.inc(file_size, "direct")
+    await run_io(_finish_upload, record, file_path)
     
     return {
         "success": True,
@@ -284,8 +418,27 @@ async def upload_file(
     }
 
 
+@router.post("/exists")
+def check_existing_names(
+    request: NameCheckRequest,
+    user: dict = Depends(get_current_user)
+):
+    """Check which names already exist in a folder (case-insensitive), in one call"""
+    existing = find_existing_names(request.folder_id, request.names)
+    
+    return {
+        "success": True,
+        "data": {
+            "existing": {
+                name: {"id": f["id"], "original_filename": f["original_filename"], "is_folder": f["is_folder"]}
+                for name, f in existing.items()
+            }
+        }
+    }
+
+
 @router.post("/folder")
-async def create_folder(
+def create_folder(
     request: CreateFolderRequest,
     user: dict = Depends(get_current_user)
 ):
@@ -305,16 +458,63 @@ async def create_folder(
     }
 
 
+def _content_search_items(query: str, file_type: Optional[str] = None) -> List[dict]:
+    """Full-text hits joined with live records, in rank order"""
+    hits = search_content(query)
+    if not hits:
+        return []
+    
+    records = {f["id"]: f for f in load_files_data()["files"]}
+    items = []
+    for hit in hits:
+        record = records.get(hit["file_id"])
+        if not record or record["is_deleted"]:
+            continue
+        if file_type and record["file_type"] != file_type:
+            continue
+        item = with_signed_urls(record)
+        item["snippet"] = hit["snippet"]
+        item["score"] = hit["score"]
+        items.append(item)
+    return items
+
+
 @router.get("")
-async def list_files(
+def list_files(
+    response: Response,
     folder_id: Optional[str] = None,
     search: Optional[str] = None,
+    content: Optional[str] = None,
     type: Optional[str] = None,
     sort: str = "name",
     order: str = "asc",
+    if_none_match: Optional[str] = Header(None),
     user: dict = Depends(get_current_user)
 ):
-    """List files in a folder"""
+    """List files in a folder (or search by name / content)"""
+    # Read the cursor first so a concurrent change is re-sent rather than missed
+    seq = get_current_seq()
+    
+    # Folder listings are versioned by their last change (and the signed URL
+    # expiry they carry), so revalidation is cheap
+    if not content and not search:
+        version = f"{get_folder_version(folder_id)}-{current_expiry()}"
+        tag = f'"folder-{folder_id or "root"}-{version}-{sort}-{order}-{type or ""}"'
+        headers = {"ETag": f"W/{tag}", "Cache-Control": REVALIDATE_CACHE_CONTROL}
+        if is_not_modified(tag, 0, if_none_match):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+    
+    if content:
+        return {
+            "success": True,
+            "data": {
+                "items": _content_search_items(content, type),
+                "current_folder": {"id": None, "name": "Search", "path": None},
+                "breadcrumb": get_breadcrumb(None)
+            }
+        }
+    
     if search:
         files = search_files(search)
     else:
@@ -325,27 +525,31 @@ async def list_files(
         files = [f for f in files if f["file_type"] == type]
     
     # Sort
-    if sort == "name":
-        files.sort(key=lambda x: x["original_filename"].lower(), reverse=(order == "desc"))
-    elif sort == "date":
-        files.sort(key=lambda x: x["modified_at"], reverse=(order == "desc"))
-    elif sort == "size":
-        files.sort(key=lambda x: x["file_size"] or 0, reverse=(order == "desc"))
-    elif sort == "type":
-        files.sort(key=lambda x: x["file_type"], reverse=(order == "desc"))
+    with span("sort"):
+        if sort == "name":
+            files.sort(key=lambda x: x["original_filename"].lower(), reverse=(order == "desc"))
+        elif sort == "date":
+            files.sort(key=lambda x: x["modified_at"], reverse=(order == "desc"))
+        elif sort == "size":
+            files.sort(key=lambda x: x["file_size"] or 0, reverse=(order == "desc"))
+        elif sort == "type":
+            files.sort(key=lambda x: x["file_type"], reverse=(order == "desc"))
     
     # Add item count for folders
     items = []
-    for f in files:
-        item = f.copy()
-        if f["is_folder"]:
-            item["item_count"] = get_folder_item_count(f["id"])
-        items.append(item)
+    with span("items"):
+        for f in files:
+            item = with_signed_urls(f)
+            if f["is_folder"]:
+                item["item_count"] = get_folder_item_count(f["id"])
+            items.append(item)
     
     # Get current folder info and breadcrumb
     current_folder = None
-    if folder_id:
-        current_folder = get_file_by_id(folder_id)
+    with span("breadcrumb"):
+        if folder_id:
+            current_folder = get_file_by_id(folder_id)
+        breadcrumb = get_breadcrumb(folder_id)
     
     return {
         "success": True,
@@ -356,13 +560,176 @@ async def list_files(
                 "name": current_folder["original_filename"] if current_folder else "My Files",
                 "path": "/" if not folder_id else None
             },
-            "breadcrumb": get_breadcrumb(folder_id)
+            "breadcrumb": breadcrumb,
+            "seq": seq
         }
     }
 
 
+@router.get("/changes")
+def list_changes(
+    since: int = Query(..., ge=0),
+    user: dict = Depends(get_current_user)
+):
+    """Get metadata changes after a sequence number (from a listing's "seq")"""
+    data = get_changes_since(since)
+    for change in data["changes"]:
+        change["record"] = with_signed_urls(change["record"])
+    
+    return {
+        "success": True,
+        "data": data
+    }
+
+
+@router.get("/tree")
+def folder_tree(
+    root: Optional[str] = None,
+    depth: Optional[int] = Query(None, ge=1),
+    user: dict = Depends(get_current_user)
+):
+    """Get the folder hierarchy in one call (depth-limited nodes can be expanded with ?root=)"""
+    return {
+        "success": True,
+        "data": {
+            "root": root,
+            "folders": get_folder_tree(root, depth)
+        }
+    }
+
+
+# ============ ZIP Archive Download ============
+
+def _archive_response(entries: List[dict], name: str) -> StreamingResponse:
+    """Stream entries as a ZIP download"""
+    filename = archive_filename(name)
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            "Cache-Control": "no-store"
+        }
+    )
+
+
+@router.post("/archive")
+def download_archive(
+    request: ArchiveRequest,
+    user: dict = Depends(get_current_user)
+):
+    """Download a selection of files and folders as a streamed ZIP"""
+    entries = get_archive_entries(request.file_ids)
+    
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No files found"
+        )
+    
+    return _archive_response(entries, request.name or "download")
+
+
+@router.get("/{file_id}/archive")
+def download_folder_archive(
+    file_id: str,
+    signed_exp: Optional[int] = Depends(media_access("archive"))
+):
+    """Download a folder as a streamed ZIP (signed URL or bearer token)"""
+    folder = get_file_by_id(file_id)
+    
+    if not folder or not folder["is_folder"] or folder["is_deleted"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Folder not found"
+        )
+    
+    return _archive_response(get_archive_entries([file_id]), folder["original_filename"])
+
+
+def _get_archive_index(file_id: str):
+    """Load (or build) the entry index for an archive file"""
+    file = get_file_by_id(file_id)
+    
+    if not file or file["is_folder"] or file["file_type"] != "archive":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archive not found"
+        )
+    
+    if not (FILES_DIR.parent / file["file_path"]).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on disk"
+        )
+    
+    index = load_archive_index(file)
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported or corrupt archive (zip, tar, tar.gz, tar.bz2, tar.xz)"
+        )
+    
+    return file, index
+
+
+@router.get("/{file_id}/archive/entries")
+def list_archive(
+    file_id: str,
+    prefix: str = "",
+    user: dict = Depends(get_current_user)
+):
+    """List entries inside a zip/tar archive without extracting it"""
+    file, index = _get_archive_index(file_id)
+    entries = list_archive_entries(index, prefix)
+    
+    return {
+        "success": True,
+        "data": {
+            "format": index["format"],
+            "total": len(entries),
+            "entries": entries
+        }
+    }
+
+
+@router.get("/{file_id}/archive/member")
+def download_archive_member(
+    file_id: str,
+    path: str = Query(...),
+    signed_exp: Optional[int] = Depends(media_access("member"))
+):
+    """Stream a single member out of an archive (signed URL or bearer token)"""
+    file, index = _get_archive_index(file_id)
+    entry = find_archive_entry(index, path)
+    
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Entry not found in archive"
+        )
+    
+    try:
+        body = stream_archive_member(file, index, entry)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    
+    filename = path.rstrip("/").rsplit("/", 1)[-1]
+    return StreamingResponse(
+        body,
+        media_type=get_mime_type(filename),
+        headers={
+            "Content-Length": str(entry["size"]),
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"
+        }
+    )
+
+
 @router.get("/{file_id}")
-async def get_file_info(
+def get_file_info(
     file_id: str,
     user: dict = Depends(get_current_user)
 ):
@@ -377,16 +744,25 @@ async def get_file_info(
     
     return {
         "success": True,
-        "data": file
+        "data": with_signed_urls(file)
     }
 
 
+def _media_cache_control(signed_exp: Optional[int]) -> str:
+    """Signed responses are shareable until expiry; token-authorized ones revalidate"""
+    return signed_cache_control(signed_exp) if signed_exp is not None else REVALIDATE_CACHE_CONTROL
+
+
 @router.get("/{file_id}/download")
-async def download_file(
+def download_file(
     file_id: str,
-    range: Optional[str] = Header(None)
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    signed_exp: Optional[int] = Depends(media_access("download"))
 ):
-    """Download a file with resume support (public for local use)"""
+    """Download a file with resume support (signed URL or bearer token)"""
     file = get_file_by_id(file_id)
     
     if not file or file["is_folder"]:
@@ -403,60 +779,66 @@ async def download_file(
             detail="File not found on disk"
         )
     
-    file_size = file_path.stat().st_size
-    
-    # Handle range requests for resume support
-    if range:
-        try:
-            range_start, range_end = range.replace("bytes=", "").split("-")
-            range_start = int(range_start) if range_start else 0
-            range_end = int(range_end) if range_end else file_size - 1
-            
-            if range_start >= file_size:
-                raise HTTPException(status_code=416, detail="Range not satisfiable")
-            
-            content_length = range_end - range_start + 1
-            
-            def iter_file():
-                with open(file_path, "rb") as f:
-                    f.seek(range_start)
-                    remaining = content_length
-                    while remaining > 0:
-                        chunk_size = min(8192, remaining)
-                        data = f.read(chunk_size)
-                        if not data:
-                            break
-                        remaining -= len(data)
-                        yield data
-            
-            headers = {
-                "Content-Range": f"bytes {range_start}-{range_end}/{file_size}",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(content_length),
-                "Content-Disposition": f'attachment; filename="{file["original_filename"]}"'
-            }
-            
-            return StreamingResponse(
-                iter_file(),
-                status_code=206,
-                headers=headers,
-                media_type=file["mime_type"]
-            )
-        except ValueError:
-            pass  # Invalid range, fall through to normal download
+    stat_result = file_path.stat()
+    file_size = stat_result.st_size
+    etag = build_etag(file["id"], stat_result)
+    last_modified = record_timestamp(file, stat_result)
+    headers = validator_headers(etag, last_modified, _media_cache_control(signed_exp))
+    
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return not_modified_response(headers)
+    
+    headers["Accept-Ranges"] = "bytes"
+    
+    # Handle range requests for resume support (only if the client's copy is still current)
+    byte_range = parse_range(range, file_size) if if_range_matches(if_range, etag, last_modified) else None
+    if byte_range:
+        range_start, range_end = byte_range
+        content_length = range_end - range_start + 1
+        
+        def iter_file():
+            with open(file_path, "rb") as f:
+                f.seek(range_start)
+                remaining = content_length
+                while remaining > 0:
+                    chunk_size = min(64 * 1024, remaining)
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield data
+        
+        headers.update({
+            "Content-Range": f"bytes {range_start}-{range_end}/{file_size}",
+            "Content-Length": str(content_length),
+            "Content-Disposition": f'attachment; filename="{file["original_filename"]}"'
+        })
+        
+        return StreamingResponse(
+            iter_file(),
+            status_code=206,
+            headers=headers,
+            media_type=file["mime_type"]
+        )
     
     # Normal full file download
     return FileResponse(
         path=file_path,
         filename=file["original_filename"],
         media_type=file["mime_type"],
-        headers={"Accept-Ranges": "bytes"}
+        headers=headers,
+        stat_result=stat_result
     )
 
 
 @router.get("/{file_id}/preview")
-async def preview_file(file_id: str):
-    """Get file for preview (public for local use)"""
+def preview_file(
+    file_id: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    signed_exp: Optional[int] = Depends(media_access("preview"))
+):
+    """Get file for preview (signed URL or bearer token)"""
     file = get_file_by_id(file_id)
     
     if not file or file["is_folder"]:
@@ -473,18 +855,71 @@ async def preview_file(file_id: str):
             detail="File not found on disk"
         )
     
+    stat_result = file_path.stat()
+    etag = build_etag(file["id"], stat_result)
+    last_modified = record_timestamp(file, stat_result)
+    headers = validator_headers(etag, last_modified, _media_cache_control(signed_exp))
+    
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return not_modified_response(headers)
+    
     return FileResponse(
         path=file_path,
-        media_type=file["mime_type"]
+        media_type=file["mime_type"],
+        headers=headers,
+        stat_result=stat_result
     )
 
 
-@router.get("/{file_id}/thumbnail")
-async def get_thumbnail(
+@router.get("/{file_id}/text")
+def preview_text(
     file_id: str,
+    line: int = 0,
+    count: int = Query(200, ge=1),
+    resume: Optional[int] = Query(None, ge=0),
+    offset: Optional[int] = Query(None, ge=0),
+    length: int = Query(64 * 1024, ge=1),
     user: dict = Depends(get_current_user)
 ):
-    """Get file thumbnail"""
+    """Paged text preview.
+
+    Line window: ?line=N&count=M (negative line = from the end, i.e. tail);
+    add &resume=<next_offset> to continue where the previous window stopped.
+    Byte window: ?offset=N&length=M (for files without line paging, e.g. utf-16).
+    """
+    file = get_file_by_id(file_id)
+    
+    if not file or file["is_folder"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    if not (FILES_DIR.parent / file["file_path"]).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on disk"
+        )
+    
+    if offset is not None:
+        data = read_bytes(file, offset, length)
+    else:
+        data = read_lines(file, line, count, resume)
+    
+    return {
+        "success": True,
+        "data": data
+    }
+
+
+@router.get("/{file_id}/thumbnail")
+def get_thumbnail(
+    file_id: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    signed_exp: Optional[int] = Depends(media_access("thumbnail"))
+):
+    """Get file thumbnail (signed URL or bearer token)"""
     file = get_file_by_id(file_id)
     
     if not file:
@@ -499,7 +934,6 @@ async def get_thumbnail(
             detail="No thumbnail available"
         )
     
-    from ..config import THUMBNAILS_DIR
     thumb_path = FILES_DIR.parent.parent / file["thumbnail_path"]
     
     if not thumb_path.exists():
@@ -508,14 +942,24 @@ async def get_thumbnail(
             detail="Thumbnail not found on disk"
         )
     
+    stat_result = thumb_path.stat()
+    etag = build_etag(f"{file['id']}-thumb", stat_result)
+    last_modified = stat_result.st_mtime
+    headers = validator_headers(etag, last_modified, _media_cache_control(signed_exp))
+    
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return not_modified_response(headers)
+    
     return FileResponse(
         path=thumb_path,
-        media_type="image/jpeg"
+        media_type="image/jpeg",
+        headers=headers,
+        stat_result=stat_result
     )
 
 
 @router.put("/{file_id}/rename")
-async def rename_file(
+def rename_file(
     file_id: str,
     request: RenameRequest,
     user: dict = Depends(get_current_user)
@@ -543,7 +987,7 @@ async def rename_file(
 
 
 @router.put("/{file_id}/move")
-async def move_file(
+def move_file(
     file_id: str,
     request: MoveRequest,
     user: dict = Depends(get_current_user)
@@ -570,7 +1014,7 @@ async def move_file(
 
 
 @router.post("/{file_id}/copy")
-async def copy_file(
+def copy_file(
     file_id: str,
     request: MoveRequest,  # Reuse MoveRequest for simplicity (destination_folder_id)
     user: dict = Depends(get_current_user)
@@ -602,6 +1046,7 @@ async def copy_file(
         dst_path = FILES_DIR / new_record['filename']
         if src_path.exists():
             shutil.copy2(src_path, dst_path)
+            schedule_content_index(new_record)
             
         # Copy thumbnail if exists
         if file.get('thumbnail_path'):
@@ -619,17 +1064,17 @@ async def copy_file(
 
 
 @router.delete("/{file_id}/permanent")
-async def permanent_delete_file(
+def permanent_delete_file(
     file_id: str,
     user: dict = Depends(get_current_user)
 ):
     """Permanently delete file (explicit endpoint)"""
     # Reuse existing delete logic with permanent=True
-    return await delete_file(file_id, permanent=True, user=user)
+    return delete_file(file_id, permanent=True, user=user)
 
 
 @router.delete("/{file_id}")
-async def delete_file(
+def delete_file(
     file_id: str,
     permanent: bool = False,
     user: dict = Depends(get_current_user)
@@ -646,6 +1091,7 @@ async def delete_file(
     if permanent or file["is_deleted"]:
         # Permanent delete
         delete_file_record(file_id)
+        schedule_content_removal(file_id)
         return {
             "success": True,
             "message": "File permanently deleted"
@@ -663,7 +1109,7 @@ async def delete_file(
 
 
 @router.post("/{file_id}/restore")
-async def restore_file(
+def restore_file(
     file_id: str,
     user: dict = Depends(get_current_user)
 ):
@@ -689,7 +1135,7 @@ async def restore_file(
 
 
 @router.post("/{file_id}/favorite")
-async def toggle_favorite(
+def toggle_favorite(
     file_id: str,
     user: dict = Depends(get_current_user)
 ):
@@ -714,17 +1160,17 @@ async def toggle_favorite(
 
 # Trash routes
 @router.get("/trash/list")
-async def list_trash(user: dict = Depends(get_current_user)):
+def list_trash(user: dict = Depends(get_current_user)):
     """List files in trash"""
     files = get_deleted_files()
     return {
         "success": True,
-        "data": files
+        "data": [with_signed_urls(f) for f in files]
     }
 
 
 @router.delete("/trash/empty")
-async def empty_trash(user: dict = Depends(get_current_user)):
+def empty_trash(user: dict = Depends(get_current_user)):
     """Permanently delete all files in trash"""
     deleted_files = get_deleted_files()
     deleted_count = 0
@@ -733,6 +1179,7 @@ async def empty_trash(user: dict = Depends(get_current_user)):
         try:
             # delete_file_record handles both physical file and record deletion
             if delete_file_record(file["id"]):
+                schedule_content_removal(file["id"])
                 deleted_count += 1
         except Exception as e:
             print(f"Error deleting file {file['id']}: {e}")
@@ -745,10 +1192,10 @@ async def empty_trash(user: dict = Depends(get_current_user)):
 
 # Favorites route
 @router.get("/favorites/list")
-async def list_favorites(user: dict = Depends(get_current_user)):
+def list_favorites(user: dict = Depends(get_current_user)):
     """List favorite files"""
     files = get_favorite_files()
     return {
         "success": True,
-        "data": files
+        "data": [with_signed_urls(f) for f in files]
     }
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 
 from ..auth import get_current_user
 from ..config import get_storage_quota, get_disk_usage
 from ..services.file_service import get_storage_stats
+from ..services.usage_index import get_usage_summary, get_folder_usage
 
 router = APIRouter(prefix="/api/storage", tags=["Storage"])
 
 
 @router.get("/quota")
-async def get_storage_quota_info(user: dict = Depends(get_current_user)):
+def get_storage_quota_info(user: dict = Depends(get_current_user)):
     """Get storage usage information"""
     stats = get_storage_stats()
     disk = get_disk_usage()
@@ -41,16 +44,44 @@ async def get_storage_quota_info(user: dict = Depends(get_current_user)):
 
 
 @router.get("/analysis")
-async def get_storage_analysis(user: dict = Depends(get_current_user)):
-    """Get detailed storage analysis"""
-    stats = get_storage_stats()
+def get_storage_analysis(
+    top: int = Query(10, ge=1, le=100),
+    user: dict = Depends(get_current_user)
+):
+    """Get detailed storage analysis (served from the incremental usage index)"""
+    usage = get_usage_summary(top)
     disk = get_disk_usage()
     
     return {
         "success": True,
         "data": {
-            "total_files": stats["total_files"],
-            "file_type_distribution": stats["breakdown"],
+            "total_files": usage["total_files"],
+            "root": usage["root"],
+            "file_type_distribution": usage["file_type_distribution"],
+            "trash": usage["trash"],
+            "largest_folders": usage["largest_folders"],
+            "largest_files": usage["largest_files"],
+            "age_distribution": usage["age_distribution"],
             "disk_info": disk
         }
     }
+
+
+@router.get("/analysis/folder")
+def get_folder_analysis(
+    folder_id: Optional[str] = None,
+    top: int = Query(20, ge=1, le=500),
+    user: dict = Depends(get_current_user)
+):
+    """Recursive size of a folder (root if omitted) and its largest subfolders"""
+    usage = get_folder_usage(folder_id, top)
+    if usage is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Folder not found"
+        )
+    
+    return {
+        "success": True,
+        "data": usage
+    }
@@ -0,0 +1,363 @@
+import os
+import bz2
+import gzip
+import json
+import lzma
+import struct
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from ..config import FILES_DIR, INDEX_DIR
+
+
+# Read size when copying blobs into the archive
+ARCHIVE_READ_SIZE = 1024 * 1024  # 1MB
+
+# Already-compressed formats are stored as-is (deflating them wastes CPU)
+STORED_TYPES = {"image", "video", "audio", "archive"}
+STORED_EXTENSIONS = {
+    "pdf", "docx", "xlsx", "pptx", "odt", "ods", "odp",
+    "apk", "jar", "epub", "woff", "woff2", "dmg", "msi"
+}
+# ...except a few image formats that are not compressed internally
+DEFLATE_EXTENSIONS = {"bmp", "svg", "tif", "tiff", "ico"}
+
+
+class _ZipStream:
+    """Write-only sink that lets zipfile stream into a generator.
+
+    zipfile treats objects without tell()/seek() as unseekable and falls back
+    to data descriptors, so nothing is ever rewritten and members never need
+    to be buffered.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type(record: dict) -> int:
+    """Pick stored or deflated for a file record"""
+    name = record["original_filename"]
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if ext in DEFLATE_EXTENSIONS:
+        return zipfile.ZIP_DEFLATED
+    if record["file_type"] in STORED_TYPES or ext in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _zip_date_time(record: dict) -> tuple:
+    """ZIP timestamp from modified_at (ZIP cannot represent dates before 1980)"""
+    try:
+        dt = datetime.fromisoformat(record["modified_at"])
+    except (KeyError, TypeError, ValueError):
+        dt = datetime.now()
+    if dt.year < 1980:
+        dt = datetime(1980, 1, 1)
+    return dt.timetuple()[:6]
+
+
+def stream_zip(entries: List[dict]) -> Iterator[bytes]:
+    """Stream a ZIP64 archive of entries from get_archive_entries().
+
+    Memory use is constant per member (one read buffer plus the central
+    directory records), so archive size is only bounded by disk.
+    """
+    for chunk in _iter_zip(entries):
+        if chunk:
+            yield chunk
+
+
+def _iter_zip(entries: List[dict]) -> Iterator[bytes]:
+    """Generate raw archive bytes (may yield empty chunks)"""
+    sink = _ZipStream()
+
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for entry in entries:
+            record = entry["record"]
+            zinfo = zipfile.ZipInfo(entry["path"], date_time=_zip_date_time(record))
+
+            if record["is_folder"]:
+                zinfo.external_attr = (0o40755 << 16) | 0x10
+                zf.writestr(zinfo, b"")
+                yield sink.drain()
+                continue
+
+            file_path = FILES_DIR.parent / record["file_path"]
+            if not file_path.exists():
+                continue  # Missing blob - skip rather than abort the whole archive
+
+            zinfo.compress_type = _compress_type(record)
+            zinfo.file_size = file_path.stat().st_size
+            zinfo.external_attr = 0o644 << 16
+
+            with open(file_path, "rb") as src, zf.open(zinfo, mode="w", force_zip64=True) as dst:
+                yield sink.drain()
+                while True:
+                    data = src.read(ARCHIVE_READ_SIZE)
+                    if not data:
+                        break
+                    dst.write(data)
+                    yield sink.drain()
+            yield sink.drain()
+
+    # Central directory and end records are written on close
+    yield sink.drain()
+
+
+def archive_filename(name: str) -> str:
+    """Download name for an archive"""
+    return f"{Path(name).name or 'download'}.zip"
+
+
+# ============ Archive Browsing ============
+
+# Bump when the sidecar layout changes so stale indexes get rebuilt
+ARCHIVE_INDEX_VERSION = 1
+
+# Parsed indexes kept in memory (file_id -> index), most recently used last
+ARCHIVE_INDEX_CACHE_SIZE = 16
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+_TAR_OPENERS = {
+    "tar.gz": gzip.open,
+    "tar.bz2": bz2.open,
+    "tar.xz": lzma.open,
+}
+
+
+def detect_archive_format(file_path: Path) -> Optional[str]:
+    """Sniff archive format from magic bytes (zip, tar, tar.gz, tar.bz2, tar.xz)"""
+    with open(file_path, "rb") as f:
+        head = f.read(512)
+
+    if head[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return "zip"
+    if head[:2] == b"\x1f\x8b":
+        return "tar.gz"
+    if head[:3] == b"BZh":
+        return "tar.bz2"
+    if head[:6] == b"\xfd7zXZ\x00":
+        return "tar.xz"
+    if head[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+def _zip_entries(file_path: Path) -> List[dict]:
+    """Index a zip from its central directory"""
+    entries = []
+    with zipfile.ZipFile(file_path) as zf:
+        for info in zf.infolist():
+            entries.append({
+                "path": info.filename,
+                "size": info.file_size,
+                "compressed_size": info.compress_size,
+                "is_dir": info.is_dir(),
+                "modified_at": datetime(*info.date_time).isoformat(),
+                # Location data for direct extraction
+                "offset": info.header_offset,
+                "method": info.compress_type,
+                "crc": info.CRC,
+                "flags": info.flag_bits,
+            })
+    return entries
+
+
+def _tar_entries(file_path: Path, archive_format: str) -> List[dict]:
+    """Index a tar; plain tars seek past member data, compressed ones stream once"""
+    entries = []
+    mode = "r:" if archive_format == "tar" else "r|*"
+    with tarfile.open(file_path, mode=mode) as tf:
+        for member in tf:
+            if not (member.isreg() or member.isdir()):
+                continue  # Links/devices cannot be extracted on their own
+            entries.append({
+                "path": member.name + ("/" if member.isdir() else ""),
+                "size": member.size if member.isreg() else 0,
+                "compressed_size": None,
+                "is_dir": member.isdir(),
+                "modified_at": datetime.fromtimestamp(member.mtime).isoformat(),
+                # Offset of member data within the (decompressed) tar stream
+                "offset": member.offset_data,
+            })
+    return entries
+
+
+def _index_path(file_id: str) -> Path:
+    return INDEX_DIR / f"{file_id}.archive.json"
+
+
+def _write_sidecar(sidecar: Path, index: dict):
+    """Atomic write so concurrent readers never see a partial index.
+
+    The temp name is per thread, since two requests may build the same index
+    at once. A failed write only costs a rebuild on the next open.
+    """
+    tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, sidecar)
+    except OSError as e:
+        print(f"Archive index write failed for {sidecar.name}: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def load_archive_index(record: dict) -> Optional[dict]:
+    """Get the archive index for a file record, building the sidecar if needed.
+
+    The index is keyed on blob size and mtime, so it is built once per blob
+    and reused until the blob changes. Returns None for unsupported formats.
+    """
+    file_path = FILES_DIR.parent / record["file_path"]
+    stat_result = file_path.stat()
+    key = (stat_result.st_size, stat_result.st_mtime_ns)
+
+    with _index_cache_lock:
+        cached = _index_cache.get(record["id"])
+        if cached and (cached["blob_size"], cached["blob_mtime_ns"]) == key:
+            _index_cache.move_to_end(record["id"])
+            return cached
+
+    index = None
+    sidecar = _index_path(record["id"])
+    if sidecar.exists():
+        try:
+            with open(sidecar, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if index and (
+            index.get("version") != ARCHIVE_INDEX_VERSION
+            or (index.get("blob_size"), index.get("blob_mtime_ns")) != key
+        ):
+            index = None
+
+    if index is None:
+        archive_format = detect_archive_format(file_path)
+        if archive_format is None:
+            return None
+
+        try:
+            if archive_format == "zip":
+                entries = _zip_entries(file_path)
+            else:
+                entries = _tar_entries(file_path, archive_format)
+        except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, lzma.LZMAError):
+            return None
+
+        index = {
+            "version": ARCHIVE_INDEX_VERSION,
+            "format": archive_format,
+            "blob_size": key[0],
+            "blob_mtime_ns": key[1],
+            "entries": entries,
+        }
+
+        _write_sidecar(sidecar, index)
+
+    with _index_cache_lock:
+        _index_cache[record["id"]] = index
+        _index_cache.move_to_end(record["id"])
+        while len(_index_cache) > ARCHIVE_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+    return index
+
+
+def list_archive_entries(index: dict, prefix: str = "") -> List[dict]:
+    """Public view of index entries, optionally filtered by path prefix"""
+    return [
+        {
+            "path": e["path"],
+            "size": e["size"],
+            "compressed_size": e["compressed_size"],
+            "is_dir": e["is_dir"],
+            "modified_at": e["modified_at"],
+        }
+        for e in index["entries"]
+        if e["path"].startswith(prefix)
+    ]
+
+
+def find_archive_entry(index: dict, path: str) -> Optional[dict]:
+    """Find a file entry by its path inside the archive"""
+    for e in index["entries"]:
+        if e["path"] == path and not e["is_dir"]:
+            return e
+    return None
+
+
+def _iter_zip_member(file_path: Path, entry: dict) -> Iterator[bytes]:
+    """Read one zip member by seeking straight to its local header"""
+    with open(file_path, "rb") as f:
+        f.seek(entry["offset"])
+        header = f.read(30)
+        if header[:4] != b"PK\x03\x04":
+            raise ValueError("Corrupt local file header")
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        f.seek(name_len + extra_len, os.SEEK_CUR)
+
+        zinfo = zipfile.ZipInfo(entry["path"])
+        zinfo.compress_type = entry["method"]
+        zinfo.compress_size = entry["compressed_size"]
+        zinfo.file_size = entry["size"]
+        zinfo.CRC = entry["crc"]
+        zinfo.flag_bits = entry["flags"]
+
+        with zipfile.ZipExtFile(f, "r", zinfo) as member:
+            while True:
+                data = member.read(ARCHIVE_READ_SIZE)
+                if not data:
+                    break
+                yield data
+
+
+def _iter_tar_member(file_path: Path, archive_format: str, entry: dict) -> Iterator[bytes]:
+    """Read one tar member from its data offset.
+
+    Plain tars seek directly. Compressed streams have no random access, so
+    they are decompressed up to the member and closed as soon as it ends.
+    """
+    opener = _TAR_OPENERS.get(archive_format, open)
+    with opener(file_path, "rb") as f:
+        f.seek(entry["offset"])
+        remaining = entry["size"]
+        while remaining > 0:
+            data = f.read(min(ARCHIVE_READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def stream_archive_member(record: dict, index: dict, entry: dict) -> Iterator[bytes]:
+    """Stream the bytes of a single archive member"""
+    file_path = FILES_DIR.parent / record["file_path"]
+    if index["format"] == "zip":
+        if entry["flags"] & 0x1:
+            raise ValueError("Encrypted zip members are not supported")
+        return _iter_zip_member(file_path, entry)
+    return _iter_tar_member(file_path, index["format"], entry)
@@ -0,0 +1,56 @@
+import os
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+import aiofiles
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+
+from ..config import IO_THREADS
+
+
+# Blocking work never runs on the event loop. Route handlers that only do
+# filesystem/metadata work are plain `def` (Starlette runs them on the worker
+# pool); handlers that must await (request bodies, SSE) use run_io() for the
+# blocking parts and aiofiles for straight reads/writes. Sync streaming bodies
+# (FileResponse, zip/tar generators) are iterated on the same pool.
+
+
+def configure_io_pool():
+    """Size the worker pool shared by sync handlers, run_io and streaming bodies.
+
+    Must be called from the running event loop (the limiter is per loop).
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = IO_THREADS
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking filesystem/metadata work on the worker pool"""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+async def read_json(path: Path) -> Any:
+    """Read a small JSON file without blocking the loop"""
+    async with aiofiles.open(path, "r") as f:
+        return json.loads(await f.read())
+
+
+async def write_json(path: Path, data: Any):
+    """Write a small JSON file without blocking the loop.
+
+    Written to a temp file and renamed over the target, so concurrent
+    readers see the old or the new document, never a truncated one.
+    Read-modify-write callers still need their own lock.
+    """
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    async with aiofiles.open(tmp_path, "w") as f:
+        await f.write(json.dumps(data))
+    await run_io(os.replace, tmp_path, path)
+
+
+async def write_bytes(path: Path, data: bytes):
+    """Write a blob without blocking the loop"""
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(data)
@@ -0,0 +1,272 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments, every worker indexes
+    fcntl = None
+
+from ..config import FILES_DIR, INDEX_DIR, CONTENT_INDEX_MAX_SIZE, CONTENT_INDEX_POLL_INTERVAL
+from .file_service import FILE_TYPE_EXTENSIONS, load_files_data
+from .text_service import detect_encoding
+from .metrics import Gauge
+
+
+# SQLite FTS5 index of file contents
+CONTENT_DB = INDEX_DIR / "content.db"
+
+# With several uvicorn workers only one of them is the indexer: it holds an
+# flock on INDEXER_LOCK, reconciles at startup and does every FTS write. The
+# others hand their uploads/deletes over through the `pending` table (a one-
+# row insert each) and keep trying the lock, so if the indexer's process
+# exits another worker takes over, reconcile included.
+INDEXER_LOCK = INDEX_DIR / "content.lock"
+
+# Writers wait this long for each other instead of failing with "database is locked"
+BUSY_TIMEOUT_MS = 30000
+
+# Text-like formats worth indexing (binary documents such as pdf/docx are skipped)
+CONTENT_INDEX_EXTENSIONS = set(FILE_TYPE_EXTENSIONS["code"]) | {"txt", "md", "csv", "log", "tsv"}
+
+# Markers placed around matched terms in snippets (escaped by the client)
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+_queue = queue.Queue()
+_queue_depth = Gauge(
+    "content_index_queue_depth",
+    "Files waiting to be (re)indexed for content search",
+    collect=_queue.qsize
+)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the index database (one connection per thread/call)"""
+    conn = sqlite3.connect(CONTENT_DB)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _init_db():
+    """Create index tables if missing"""
+    with _connect() as conn:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS content "
+            "USING fts5(file_id UNINDEXED, body, tokenize='unicode61 remove_diacritics 2')"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS indexed ("
+            "file_id TEXT PRIMARY KEY, blob_size INTEGER, blob_mtime_ns INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT, file_id TEXT)"
+        )
+
+
+def is_indexable(record: dict) -> bool:
+    """Check whether a record's content should be indexed"""
+    if record["is_folder"] or not record.get("file_path"):
+        return False
+    name = record["original_filename"]
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    return ext in CONTENT_INDEX_EXTENSIONS and (record["file_size"] or 0) <= CONTENT_INDEX_MAX_SIZE
+
+
+def _read_text(file_path: Path) -> Optional[str]:
+    """Read a blob as text, or None if it looks binary"""
+    with open(file_path, "rb") as f:
+        data = f.read(CONTENT_INDEX_MAX_SIZE + 1)
+    if len(data) > CONTENT_INDEX_MAX_SIZE:
+        return None
+    encoding = detect_encoding(data[:64 * 1024])
+    if encoding is None:
+        return None
+    return data.decode(encoding, errors="replace")
+
+
+def _index_record(conn: sqlite3.Connection, record: dict):
+    """(Re)index a single record if its blob changed since last time"""
+    file_path = FILES_DIR.parent / record["file_path"]
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        _remove_record(conn, record["id"])
+        return
+
+    row = conn.execute(
+        "SELECT blob_size, blob_mtime_ns FROM indexed WHERE file_id = ?", (record["id"],)
+    ).fetchone()
+    if row == (stat_result.st_size, stat_result.st_mtime_ns):
+        return  # Up to date
+
+    text = _read_text(file_path)
+    conn.execute("DELETE FROM content WHERE file_id = ?", (record["id"],))
+    if text:
+        conn.execute("INSERT INTO content (file_id, body) VALUES (?, ?)", (record["id"], text))
+    # Remember binary/oversized blobs too, so they are not re-read on every reconcile
+    conn.execute(
+        "INSERT OR REPLACE INTO indexed (file_id, blob_size, blob_mtime_ns) VALUES (?, ?, ?)",
+        (record["id"], stat_result.st_size, stat_result.st_mtime_ns)
+    )
+
+
+def _remove_record(conn: sqlite3.Connection, file_id: str):
+    conn.execute("DELETE FROM content WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM indexed WHERE file_id = ?", (file_id,))
+
+
+def _reconcile(conn: sqlite3.Connection):
+    """Catch up with uploads/deletes that happened while the indexer was down"""
+    data = load_files_data()
+    live = {f["id"]: f for f in data["files"] if is_indexable(f)}
+    known = {row[0] for row in conn.execute("SELECT file_id FROM indexed")}
+
+    for file_id in known - live.keys():
+        _remove_record(conn, file_id)
+    conn.commit()
+
+    for record in live.values():
+        _queue.put(("index", record))
+
+
+def _try_lock_indexer() -> Optional[int]:
+    """Become the indexer; returns the held lock fd (kept for the process lifetime), or None"""
+    if fcntl is None:
+        return -1
+    fd = os.open(INDEXER_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def _hand_over(conn: sqlite3.Connection, action: str, payload):
+    """Not the indexer: leave the work for it in the pending table"""
+    file_id = payload["id"] if action == "index" else payload
+    conn.execute("INSERT INTO pending (action, file_id) VALUES (?, ?)", (action, file_id))
+
+
+def _take_pending(conn: sqlite3.Connection):
+    """Indexer: move work handed over by other workers onto our queue"""
+    rows = conn.execute("SELECT id, action, file_id FROM pending ORDER BY id").fetchall()
+    if not rows:
+        return
+    conn.execute("DELETE FROM pending WHERE id <= ?", (rows[-1][0],))
+    conn.commit()
+
+    records = None
+    for _, action, file_id in rows:
+        if action == "remove":
+            _queue.put(("remove", file_id))
+            continue
+        if records is None:
+            records = {f["id"]: f for f in load_files_data()["files"]}
+        record = records.get(file_id)
+        if record is not None:
+            _queue.put(("index", record))
+
+
+def _run_worker():
+    """Background indexer loop: indexes if elected, otherwise hands work over"""
+    conn = _connect()
+    elected = False
+    reconciled = False
+    next_poll = 0.0
+
+    while True:
+        now = time.monotonic()
+        if now >= next_poll:
+            next_poll = now + CONTENT_INDEX_POLL_INTERVAL
+            try:
+                if not elected and _try_lock_indexer() is not None:
+                    elected = True
+                if elected and not reconciled:
+                    # Retried every poll until it succeeds: work missed while
+                    # no indexer was running is only found here
+                    _reconcile(conn)
+                    reconciled = True
+                if elected:
+                    _take_pending(conn)
+            except Exception as e:
+                conn.rollback()
+                print(f"Content index sync failed: {e}")
+
+        try:
+            action, payload = _queue.get(timeout=CONTENT_INDEX_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        try:
+            if not elected:
+                _hand_over(conn, action, payload)
+            elif action == "index":
+                _index_record(conn, payload)
+            elif action == "remove":
+                _remove_record(conn, payload)
+            # Batch commits while the queue is busy
+            if _queue.empty():
+                conn.commit()
+        except Exception as e:
+            print(f"Content index error ({action}): {e}")
+        finally:
+            _queue.task_done()
+
+
+def start_content_indexer():
+    """Start the background indexer thread (idempotent)"""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _init_db()
+        _worker = threading.Thread(target=_run_worker, name="content-indexer", daemon=True)
+        _worker.start()
+
+
+def schedule_content_index(record: dict):
+    """Queue a file for (re)indexing after its blob is written"""
+    if is_indexable(record):
+        _queue.put(("index", record))
+
+
+def schedule_content_removal(file_id: str):
+    """Queue a permanently deleted file for removal from the index"""
+    _queue.put(("remove", file_id))
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into a safe FTS5 query (every term, prefix match)"""
+    terms = [t.replace('"', '""') for t in query.split() if t.strip()]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_content(query: str, limit: int = 50) -> List[dict]:
+    """Ranked content matches: [{file_id, snippet, score}]"""
+    match = _fts_query(query)
+    if not match or not CONTENT_DB.exists():
+        return []
+
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT file_id, snippet(content, 1, ?, ?, '…', 16), bm25(content) "
+            "FROM content WHERE content MATCH ? ORDER BY bm25(content) LIMIT ?",
+            (SNIPPET_START, SNIPPET_END, match, limit)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+    return [{"file_id": r[0], "snippet": r[1], "score": -r[2]} for r in rows]
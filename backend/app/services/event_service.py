@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+from typing import Iterable, Optional
+
+
+# Pending events per connection before a slow client is told to resync
+EVENT_QUEUE_SIZE = 256
+
+# Seconds between keep-alive comments on idle streams
+EVENT_KEEPALIVE = 15
+
+# Seconds between checks for changes saved by other worker processes
+EVENT_POLL_INTERVAL = 2
+
+
+class Subscription:
+    """One SSE connection: a bounded queue of pre-encoded frames"""
+
+    def __init__(self, folder_id: Optional[str] = None, all_folders: bool = True):
+        self.folder_id = folder_id
+        self.all_folders = all_folders
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def wants(self, parents: Optional[Iterable]) -> bool:
+        if self.all_folders or parents is None:
+            return True
+        return self.folder_id in parents
+
+    def offer(self, frame: str):
+        """Queue a frame; on overflow drop the backlog and ask the client to resync"""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event("resync", {"reason": "overflow"}))
+
+
+def encode_event(event_type: str, data: dict) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventBroker:
+    """Fan-out of file events to SSE subscribers.
+
+    publish() may be called from any thread (routes, thread pool, indexer);
+    frames are encoded once by the caller and handed to the event loop.
+
+    Each worker process has its own broker, so mutations handled by other
+    workers are picked up from the shared change feed and passed to relay().
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()
+        self.cursor: Optional[int] = None  # Change seq subscribers have been sent up to
+        self._local_seqs = set()  # File events published here after the cursor
+
+    def subscribe(self, folder_id: Optional[str] = None, all_folders: bool = True) -> Subscription:
+        sub = Subscription(folder_id, all_folders)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict, parents: Optional[Iterable] = None):
+        """Send an event to subscribers watching any of the given folders"""
+        with self._lock:
+            if not self._subscribers or self._loop is None:
+                return
+            loop = self._loop
+            if event_type == "file":
+                self._local_seqs.add(data["seq"])
+
+        frame = encode_event(event_type, data)
+        parents = list(parents) if parents is not None else None
+        try:
+            loop.call_soon_threadsafe(self._dispatch, frame, parents)
+        except RuntimeError:
+            pass  # Loop closed (shutdown)
+
+    def relay(self, feed: dict):
+        """Send changes other workers saved since the cursor (a get_changes_since() result)"""
+        with self._lock:
+            loop = self._loop
+            if feed["resync_required"]:
+                frames = [(encode_event("resync", {"reason": "gap"}), None)]
+            else:
+                frames = [
+                    (encode_event("file", change), change["parents"])
+                    for change in feed["changes"] if change["seq"] not in self._local_seqs
+                ]
+            self.cursor = feed["seq"]
+            self._local_seqs = {seq for seq in self._local_seqs if seq > feed["seq"]}
+
+        if loop is None:
+            return
+        for frame, parents in frames:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, frame, parents)
+            except RuntimeError:
+                return  # Loop closed (shutdown)
+
+    def _dispatch(self, frame: str, parents: Optional[list]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if sub.wants(parents):
+                sub.offer(frame)
+
+
+broker = EventBroker()
@@ -1,16 +1,21 @@
-import json
 import uuid
 import shutil
+import threading
 import mimetypes
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List
 
-from ..config import DATA_DIR, FILES_DIR, THUMBNAILS_DIR
+from ..config import DATA_DIR, FILES_DIR, THUMBNAILS_DIR, INDEX_DIR
+from .event_service import broker
+from .json_store import JsonStore
+from .signed_urls import with_signed_urls
+from .tracing import span
 
 
-# Files metadata file
+# Files metadata file (shared safely between worker processes)
 FILES_FILE = DATA_DIR / "files.json"
+FILES_STORE = JsonStore(FILES_FILE, lambda: {"files": [], "next_id": 1}, indent=2, snapshot=True)
 
 # Known file type mappings (flexible, not restrictive)
 FILE_TYPE_EXTENSIONS = {
@@ -24,31 +29,136 @@ FILE_TYPE_EXTENSIONS = {
 }
 
 
-def init_files():
-    """Initialize files.json if not exists"""
-    if not FILES_FILE.exists():
-        save_files_data({"files": [], "next_id": 1})
-    return load_files_data()
+def init_files() -> str:
+    """Create files.json if missing and load it (from the snapshot when current)"""
+    if not FILES_STORE.exists():
+        # Re-check under the lock: several workers may start at once
+        with FILES_LOCK:
+            if not FILES_STORE.exists():
+                FILES_STORE.save({"files": [], "next_id": 1})
+    return FILES_STORE.warm()
+
+
+def save_files_snapshot():
+    """Refresh the files.json snapshot so the next start skips JSON parsing"""
+    FILES_STORE.refresh_snapshot()
 
 
 def load_files_data() -> dict:
-    """Load files metadata from JSON"""
-    if FILES_FILE.exists():
-        with open(FILES_FILE, "r") as f:
-            return json.load(f)
-    return {"files": [], "next_id": 1}
+    """Load files metadata (hot copy, reloaded only after a save; read-only)"""
+    with span("load_files_data"):
+        return FILES_STORE.load()
 
 
-import threading
+# Lock for thread and process safety (writers reload via FILES_STORE.load_for_update)
+FILES_LOCK = FILES_STORE.lock
+
+# Change feed: every metadata mutation bumps data["seq"] and is logged in
+# data["changes"], keeping only the newest CHANGE_LOG_SIZE entries
+CHANGE_LOG_SIZE = 5000
+
+
+def _folder_key(folder_id: Optional[str]) -> str:
+    """folder_seqs key ("" for the root: JSON object keys are strings)"""
+    return folder_id or ""
+
+
+def _record_change(data: dict, op: str, record: dict, old_parent_id: Optional[str] = None) -> dict:
+    """Stamp a mutation with the next sequence number (call under FILES_LOCK).
+    
+    Returns the live event; pass it to _publish_changes once the save has
+    succeeded, so SSE clients never see a seq that was not stored.
+    """
+    seq = data.get("seq", 0) + 1
+    data["seq"] = seq
+    record["seq"] = seq
+    
+    # Folders whose contents changed (both sides of a move)
+    parents = [record["parent_folder_id"]]
+    if old_parent_id != record["parent_folder_id"] and old_parent_id is not None:
+        parents.append(old_parent_id)
+    
+    changes = data.setdefault("changes", [])
+    changes.append({"seq": seq, "op": op, "id": record["id"], "parents": parents})
+    if len(changes) > CHANGE_LOG_SIZE:
+        del changes[:len(changes) - CHANGE_LOG_SIZE]
+    
+    # Last change per folder, kept apart from the bounded log so listing
+    # versions survive its rotation
+    if "folder_seqs" not in data:
+        # Changes from before per-folder tracking could have touched any folder
+        data["listing_base"] = seq - 1
+        data["folder_seqs"] = {}
+    folder_seqs = data["folder_seqs"]
+    for parent in parents:
+        folder_seqs[_folder_key(parent)] = seq
+    if op == "delete" and record["is_folder"]:
+        folder_seqs.pop(record["id"], None)
+    
+    # Same shape as /changes deltas
+    return {
+        "seq": seq,
+        "op": op,
+        "id": record["id"],
+        "parents": parents,
+        "record": None if op == "delete" else with_signed_urls(record)
+    }
+
+
+def _publish_changes(events: List[dict]):
+    """Push saved changes to live SSE clients (call under FILES_LOCK, after the save, to keep seq order)"""
+    for event in events:
+        broker.publish("file", event, event["parents"])
+
+
+def get_changes_since(since: int) -> dict:
+    """Get metadata deltas after a sequence number.
+
+    Multiple changes to one record collapse into its latest state. If the
+    cursor is older than the retained log, resync_required is set and the
+    client must reload full listings.
+    """
+    data = load_files_data()
+    current = data.get("seq", 0)
+    changes = data.get("changes", [])
+    
+    oldest = changes[0]["seq"] if changes else current + 1
+    if since > current or since < oldest - 1:
+        return {"seq": current, "resync_required": True, "changes": []}
+    
+    by_id = {f["id"]: f for f in data["files"]}
+    latest = {}
+    for change in changes:
+        if change["seq"] <= since:
+            continue
+        entry = latest.get(change["id"])
+        parents = change["parents"] if entry is None else list(dict.fromkeys(entry["parents"] + change["parents"]))
+        op = "create" if entry is not None and entry["op"] == "create" else change["op"]
+        latest[change["id"]] = dict(change, op=op, parents=parents)
+    
+    deltas = []
+    for change in sorted(latest.values(), key=lambda c: c["seq"]):
+        record = by_id.get(change["id"])
+        deltas.append({
+            "seq": change["seq"],
+            "op": "delete" if record is None else change["op"],
+            "id": change["id"],
+            "parents": change["parents"],
+            "record": record
+        })
+    
+    return {"seq": current, "resync_required": False, "changes": deltas}
+
+
+def get_current_seq() -> int:
+    """Current change-feed sequence number"""
+    return load_files_data().get("seq", 0)
 
-# Lock for thread safety
-FILES_LOCK = threading.Lock()
 
 def save_files_data(data: dict):
-    """Save files metadata to JSON with thread safety"""
+    """Save files metadata to JSON with thread and process safety"""
     with FILES_LOCK:
-        with open(FILES_FILE, "w") as f:
-            json.dump(data, f, indent=2, default=str)
+        FILES_STORE.save(data)
 
 
 def get_file_type(filename: str) -> str:
@@ -70,14 +180,58 @@ def get_mime_type(filename: str) -> str:
     return mime_type or "application/octet-stream"
 
 
+# Upload conflict policies (None = allow duplicate names, the legacy behavior)
+CONFLICT_POLICIES = ("fail", "rename", "replace", "skip")
+
+
+class NameConflictError(Exception):
+    """Raised when a name is taken and the policy is fail/skip (or the target can't be replaced)"""
+
+    def __init__(self, existing: dict):
+        super().__init__(f"Name already exists: {existing['original_filename']}")
+        self.existing = existing
+
+
+def normalize_name(name: str) -> str:
+    """Case-normalized name used for conflict checks"""
+    return name.strip().casefold()
+
+
+def _folder_names(files: List[dict], parent_folder_id: Optional[str]) -> dict:
+    """Map normalized name -> live record for one folder"""
+    return {
+        normalize_name(f["original_filename"]): f
+        for f in files
+        if f["parent_folder_id"] == parent_folder_id and not f["is_deleted"]
+    }
+
+
+def unique_name(name: str, taken) -> str:
+    """Generate 'name (n).ext' not present in taken (normalized names)"""
+    dot = name.rfind(".")
+    stem, ext = (name[:dot], name[dot:]) if dot > 0 else (name, "")
+    n = 1
+    while True:
+        candidate = f"{stem} ({n}){ext}"
+        if normalize_name(candidate) not in taken:
+            return candidate
+        n += 1
+
+
 def create_file_record(
     filename: str,
     original_filename: str,
     file_size: int,
     parent_folder_id: Optional[str] = None,
-    is_folder: bool = False
+    is_folder: bool = False,
+    conflict: Optional[str] = None
 ) -> dict:
-    """Create a new file record"""
+    """Create a new file record.
+
+    With a conflict policy the name check happens under FILES_LOCK together
+    with the insert: "rename" picks a free name, "replace" moves the existing
+    file to trash, "fail"/"skip" raise NameConflictError.
+    """
     data = load_files_data()
     
     file_id = str(uuid.uuid4())
@@ -108,10 +262,27 @@ def create_file_record(
     
     # Use atomic update to prevent race conditions
     with FILES_LOCK:
-        data = load_files_data()
+        data = FILES_STORE.load_for_update()
+        
+        events = []
+        if conflict:
+            names = _folder_names(data["files"], parent_folder_id)
+            existing = names.get(normalize_name(original_filename))
+            if existing:
+                if conflict == "rename":
+                    record["original_filename"] = unique_name(original_filename, names)
+                elif conflict == "replace" and not existing["is_folder"] and not is_folder:
+                    existing["is_deleted"] = True
+                    existing["deleted_at"] = now
+                    existing["modified_at"] = now
+                    events.append(_record_change(data, "update", existing))
+                else:
+                    raise NameConflictError(existing)
+        
         data["files"].append(record)
-        with open(FILES_FILE, "w") as f:
-            json.dump(data, f, indent=2, default=str)
+        events.append(_record_change(data, "create", record))
+        FILES_STORE.save(data)
+        _publish_changes(events)
     
     return record
 
@@ -156,21 +327,18 @@ def update_file(file_id: str, updates: dict) -> Optional[dict]:
     """Update file record"""
     # Use atomic update
     with FILES_LOCK:
-        data = load_files_data()
+        data = FILES_STORE.load_for_update()
         
         for i, f in enumerate(data["files"]):
             if f["id"] == file_id:
+                old_parent_id = f["parent_folder_id"]
                 data["files"][i].update(updates)
                 data["files"][i]["modified_at"] = datetime.now().isoformat()
+                event = _record_change(data, "update", data["files"][i], old_parent_id)
                 
-                # Write directly to avoid double locking if save_files_data is also locked
-                # Or just use the locked context. 
-                # Since save_files_data has a lock, calling it from here (which has a lock) needs RLock or carefulness.
-                # threading.Lock is NOT reentrant! We used Lock, not RLock.
-                # So we must NOT call save_files_data from within a locked block if save_files_data also acquires lock.
-                # Instead, let's duplicate write logic or use RLock.
-                with open(FILES_FILE, "w") as f2:
-                    json.dump(data, f2, indent=2, default=str)
+                # Save directly: FILES_LOCK is not reentrant, so save_files_data can't be used here
+                FILES_STORE.save(data)
+                _publish_changes([event])
                 return data["files"][i]
     
     return None
@@ -179,7 +347,7 @@ def update_file(file_id: str, updates: dict) -> Optional[dict]:
 def delete_file_record(file_id: str) -> bool:
     """Permanently delete file record and associated files"""
     with FILES_LOCK:
-        data = load_files_data()
+        data = FILES_STORE.load_for_update()
         
         for i, f in enumerate(data["files"]):
             if f["id"] == file_id:
@@ -195,17 +363,43 @@ def delete_file_record(file_id: str) -> bool:
                     if thumb_path.exists():
                         thumb_path.unlink()
                 
+                # Delete sidecar indexes ({id}.<kind>.json)
+                for index_path in INDEX_DIR.glob(f"{file_id}.*"):
+                    index_path.unlink()
+                
                 # Remove from list
                 data["files"].pop(i)
+                event = _record_change(data, "delete", f)
                 
                 # Write directly
-                with open(FILES_FILE, "w") as f2:
-                    json.dump(data, f2, indent=2, default=str)
+                FILES_STORE.save(data)
+                _publish_changes([event])
                 return True
     
     return False
 
 
+def clear_missing_thumbnails(file_ids: List[str]) -> int:
+    """Drop thumbnail_path from records whose thumbnail file is gone (one save)"""
+    wanted = set(file_ids)
+    events = []
+    with FILES_LOCK:
+        data = FILES_STORE.load_for_update()
+        
+        for f in data["files"]:
+            if f["id"] in wanted and f.get("thumbnail_path"):
+                if (THUMBNAILS_DIR / f"{f['id']}.jpg").exists():
+                    continue  # Regenerated since the scan
+                f["thumbnail_path"] = None
+                f["modified_at"] = datetime.now().isoformat()
+                events.append(_record_change(data, "update", f))
+        
+        if events:
+            FILES_STORE.save(data)
+            _publish_changes(events)
+    return len(events)
+
+
 def get_folder_path(folder_id: Optional[str]) -> str:
     """Get full path string for a folder"""
     if folder_id is None:
@@ -249,6 +443,190 @@ def get_breadcrumb(folder_id: Optional[str]) -> List[dict]:
     return breadcrumb
 
 
+# Parent -> child folder index, rebuilt only when files.json changes
+_folder_index = {"version": None, "children": {}}
+_folder_index_lock = threading.Lock()
+
+
+def _files_version() -> tuple:
+    """Cheap version stamp of the metadata file (changes on every save, in any worker)"""
+    return FILES_STORE.stamp()
+
+
+def _get_folder_children() -> dict:
+    """Get {parent_id: [folder, ...]} for live folders, cached per metadata version"""
+    version = _files_version()
+    with _folder_index_lock:
+        if _folder_index["version"] == version:
+            return _folder_index["children"]
+    
+    children = {}
+    for f in load_files_data()["files"]:
+        if f["is_folder"] and not f["is_deleted"]:
+            children.setdefault(f["parent_folder_id"], []).append({
+                "id": f["id"],
+                "name": f["original_filename"],
+                "parent_folder_id": f["parent_folder_id"]
+            })
+    for folders in children.values():
+        folders.sort(key=lambda x: x["name"].lower())
+    
+    with _folder_index_lock:
+        _folder_index["version"] = version
+        _folder_index["children"] = children
+    return children
+
+
+# Per-folder normalized name index, rebuilt only when files.json changes
+_name_index = {"version": None, "folders": {}}
+_name_index_lock = threading.Lock()
+
+
+def find_existing_names(folder_id: Optional[str], names: List[str]) -> dict:
+    """Check which of the given names already exist in a folder (case-insensitive).
+
+    Returns {requested name: existing record}.
+    """
+    version = _files_version()
+    with _name_index_lock:
+        if _name_index["version"] != version:
+            folders = {}
+            for f in load_files_data()["files"]:
+                if not f["is_deleted"]:
+                    folders.setdefault(f["parent_folder_id"], {})[normalize_name(f["original_filename"])] = f
+            _name_index["version"] = version
+            _name_index["folders"] = folders
+        in_folder = _name_index["folders"].get(folder_id, {})
+    
+    return {name: in_folder[normalize_name(name)] for name in names if normalize_name(name) in in_folder}
+
+
+# Per-version lookup for listing versions: folder_seqs plus each folder's parent and own seq
+_listing_index = {"version": None, "base": 0, "folders": {}, "self": {}, "parents": {}}
+_listing_index_lock = threading.Lock()
+
+
+def _get_listing_index() -> dict:
+    """Folder parents and change seqs, cached per metadata version"""
+    version = _files_version()
+    with _listing_index_lock:
+        if _listing_index["version"] == version:
+            return _listing_index
+    
+    data = load_files_data()
+    parent_of = {}
+    own = {}
+    for f in data["files"]:
+        if f["is_folder"]:
+            parent_of[f["id"]] = f["parent_folder_id"]
+            own[f["id"]] = f.get("seq", 0)
+    
+    if "folder_seqs" in data:
+        base = data.get("listing_base", 0)
+    else:
+        base = data.get("seq", 0)  # Untracked history: any change may matter
+    
+    with _listing_index_lock:
+        _listing_index.update(
+            version=version, base=base, folders=data.get("folder_seqs", {}), self=own, parents=parent_of
+        )
+        return _listing_index
+
+
+def get_folder_version(folder_id: Optional[str]) -> int:
+    """Seq of the last change that can alter a folder listing.
+    
+    Covers the folder's children, its subfolders' item counts and renames or
+    moves of the folder and its ancestors (breadcrumb).
+    """
+    index = _get_listing_index()
+    folders = index["folders"]
+    version = max(index["base"], folders.get(_folder_key(folder_id), 0))
+    for sub in _get_folder_children().get(folder_id, []):
+        version = max(version, folders.get(sub["id"], 0))
+    
+    seen = set()
+    current = folder_id
+    while current is not None and current not in seen:
+        seen.add(current)
+        version = max(version, index["self"].get(current, 0))
+        current = index["parents"].get(current)
+    return version
+
+
+def get_folder_tree(root_id: Optional[str] = None, depth: Optional[int] = None) -> List[dict]:
+    """Get the folder-only hierarchy below root_id.
+    
+    With a depth limit, folders at the boundary come back with children=None
+    and has_children set, so clients can expand them lazily.
+    """
+    children = _get_folder_children()
+    
+    def build(parent_id: Optional[str], level: int) -> List[dict]:
+        nodes = []
+        for folder in children.get(parent_id, []):
+            has_children = folder["id"] in children
+            node = dict(folder, has_children=has_children, children=[])
+            if has_children:
+                if depth is not None and level >= depth:
+                    node["children"] = None
+                else:
+                    node["children"] = build(folder["id"], level + 1)
+            nodes.append(node)
+        return nodes
+    
+    return build(root_id, 1)
+
+
+def get_archive_entries(file_ids: List[str]) -> List[dict]:
+    """Resolve files/folders into (path, record) entries for a ZIP download.
+
+    Folders are expanded recursively from a single metadata load; empty
+    folders are kept as directory entries and duplicate names are suffixed.
+    """
+    data = load_files_data()
+    by_id = {}
+    children = {}
+    for f in data["files"]:
+        if f["is_deleted"]:
+            continue
+        by_id[f["id"]] = f
+        children.setdefault(f["parent_folder_id"], []).append(f)
+    
+    entries = []
+    used_paths = set()
+    
+    def unique_path(path: str) -> str:
+        if path.lower() not in used_paths:
+            used_paths.add(path.lower())
+            return path
+        stem, dot, ext = path.rpartition(".") if "." in path.rsplit("/", 1)[-1] else (path, "", "")
+        n = 1
+        while True:
+            candidate = f"{stem} ({n}){dot}{ext}"
+            if candidate.lower() not in used_paths:
+                used_paths.add(candidate.lower())
+                return candidate
+            n += 1
+    
+    def add(record: dict, prefix: str):
+        path = unique_path(prefix + record["original_filename"].replace("/", "_"))
+        if record["is_folder"]:
+            entries.append({"path": path + "/", "record": record})
+            kids = sorted(children.get(record["id"], []), key=lambda x: x["original_filename"].lower())
+            for child in kids:
+                add(child, path + "/")
+        else:
+            entries.append({"path": path, "record": record})
+    
+    for file_id in file_ids:
+        record = by_id.get(file_id)
+        if record:
+            add(record, "")
+    
+    return entries
+
+
 def get_folder_item_count(folder_id: str) -> int:
     """Get number of items in a folder"""
     data = load_files_data()
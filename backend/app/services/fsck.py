@@ -0,0 +1,431 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments, the in-process guard suffices
+    fcntl = None
+
+from ..config import (
+    FILES_DIR, THUMBNAILS_DIR, INDEX_DIR, FSCK_DIR, QUARANTINE_DIR,
+    FSCK_WORKERS, FSCK_GRACE
+)
+from .file_service import load_files_data, clear_missing_thumbnails
+
+
+# Crash windows leave two kinds of damage: blobs no record points at (a
+# crash after the blob write, or midway through delete_file_record) and
+# records whose blob is gone ("File not found on disk" on download). The
+# scanner lists storage/ with os.scandir (d_type only, no per-file stat)
+# and cross-checks it against files.json; size and hash verification fan
+# out over a private thread pool so a scan never starves request handlers.
+#
+# Records carry no content hash, so "hash" mode keeps its own manifest
+# (id -> size, mtime_ns, sha256). A blob whose digest changed while its
+# size and mtime did not was modified behind our back: it is "corrupt".
+
+VERIFY_MODES = ("none", "size", "hash")
+HASH_MANIFEST = FSCK_DIR / "digests.json"
+# Held for a whole scan + repair, by any worker or the CLI
+FSCK_LOCK = FSCK_DIR / ".fsck.lock"
+VERIFY_BATCH = 256
+HASH_BLOCK = 1024 * 1024
+
+# Repair fixes these; the rest are lost or damaged blobs that need a human
+REPAIRABLE = ("orphan_blob", "orphan_thumbnail", "orphan_sidecar", "missing_thumbnail")
+ISSUE_KINDS = ("missing_blob", "size_mismatch", "corrupt", "unreadable") + REPAIRABLE
+
+
+def _list_files(directory: Path) -> List[str]:
+    """Names of regular files in a directory (dotfiles like .gitkeep skipped)"""
+    if not directory.exists():
+        return []
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.is_file() and not entry.name.startswith(".")]
+
+
+def _is_recent(record: dict, cutoff: datetime) -> bool:
+    stamp = record.get("modified_at") or record.get("created_at")
+    return stamp is not None and datetime.fromisoformat(stamp) > cutoff
+
+
+def _old_orphans(directory: Path, names: List[str], now: float) -> List[dict]:
+    """Stat orphan candidates, keeping those older than FSCK_GRACE"""
+    orphans = []
+    for name in names:
+        try:
+            st = os.stat(directory / name)
+        except FileNotFoundError:
+            continue
+        if now - st.st_mtime > FSCK_GRACE:
+            orphans.append({"name": name, "size": st.st_size})
+    return orphans
+
+
+def _verify_batch(batch: List[tuple], hash_blobs: bool) -> List[tuple]:
+    """(id, name) -> (id, size, mtime_ns, sha256 or None, error or None)"""
+    results = []
+    for file_id, name in batch:
+        path = FILES_DIR / name
+        try:
+            st = os.stat(path)
+            digest = None
+            if hash_blobs:
+                sha = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                        sha.update(block)
+                digest = sha.hexdigest()
+            results.append((file_id, st.st_size, st.st_mtime_ns, digest, None))
+        except FileNotFoundError:
+            continue  # Deleted since listing
+        except OSError as e:
+            results.append((file_id, None, None, None, str(e)))
+    return results
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(HASH_MANIFEST, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest: dict):
+    FSCK_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = HASH_MANIFEST.with_name(f"{HASH_MANIFEST.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(tmp_path, HASH_MANIFEST)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def try_lock_fsck() -> Optional[int]:
+    """One scan at a time across workers and the CLI; returns the held lock fd, or None if busy"""
+    if fcntl is None:
+        return -1
+    FSCK_DIR.mkdir(parents=True, exist_ok=True)
+    fd = os.open(FSCK_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def unlock_fsck(fd: int):
+    if fd >= 0:
+        os.close(fd)  # Closing releases the flock
+
+
+def scan(
+    verify: str = "none",
+    workers: int = FSCK_WORKERS,
+    progress: Optional[Callable[[str, int, int], None]] = None
+) -> dict:
+    """Cross-check storage against files.json and return a report"""
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"verify must be one of {', '.join(VERIFY_MODES)}")
+    progress = progress or (lambda phase, done, total: None)
+    started = time.perf_counter()
+    started_at = datetime.now()
+    now = time.time()
+    cutoff = started_at - timedelta(seconds=FSCK_GRACE)
+    issues: Dict[str, list] = {kind: [] for kind in ISSUE_KINDS}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fsck") as pool:
+        progress("listing", 0, 0)
+        # The three listings are independent directory walks
+        listings = [pool.submit(_list_files, d) for d in (FILES_DIR, THUMBNAILS_DIR, INDEX_DIR)]
+        records = load_files_data()["files"]
+        blobs, thumbnails, sidecars = (set(future.result()) for future in listings)
+
+        ids = set()
+        expected_blobs = set()
+        present = []
+        for record in records:
+            ids.add(record["id"])
+            if record.get("thumbnail_path"):
+                thumb_name = os.path.basename(record["thumbnail_path"])
+                if thumb_name not in thumbnails:
+                    issues["missing_thumbnail"].append({"id": record["id"], "name": thumb_name})
+            if not record.get("file_path"):
+                continue
+            name = os.path.basename(record["file_path"])
+            expected_blobs.add(name)
+            if name in blobs:
+                present.append((record["id"], name))
+            elif not _is_recent(record, cutoff):
+                issues["missing_blob"].append({
+                    "id": record["id"],
+                    "name": name,
+                    "original_filename": record["original_filename"],
+                    "is_deleted": record["is_deleted"]
+                })
+
+        issues["orphan_blob"] = _old_orphans(FILES_DIR, sorted(blobs - expected_blobs), now)
+        issues["orphan_thumbnail"] = _old_orphans(
+            THUMBNAILS_DIR, sorted(n for n in thumbnails if n.rsplit(".", 1)[0] not in ids), now
+        )
+        # Sidecar indexes are {id}.<kind>.json; content.db and friends are not per-file
+        issues["orphan_sidecar"] = _old_orphans(
+            INDEX_DIR, sorted(n for n in sidecars if n.endswith(".json") and n.split(".", 1)[0] not in ids), now
+        )
+
+        if verify != "none":
+            by_id = {record["id"]: record for record in records}
+            batches = [present[i:i + VERIFY_BATCH] for i in range(0, len(present), VERIFY_BATCH)]
+            futures = [pool.submit(_verify_batch, batch, verify == "hash") for batch in batches]
+            manifest = _load_manifest() if verify == "hash" else None
+            new_manifest = {}
+            done = 0
+            progress("verifying", 0, len(present))
+
+            for future in as_completed(futures):
+                results = future.result()
+                done += len(results)
+                progress("verifying", done, len(present))
+                for file_id, size, mtime_ns, digest, error in results:
+                    record = by_id[file_id]
+                    if error is not None:
+                        issues["unreadable"].append({"id": file_id, "error": error})
+                        continue
+                    if size != record["file_size"] and not _is_recent(record, cutoff):
+                        issues["size_mismatch"].append({
+                            "id": file_id,
+                            "name": os.path.basename(record["file_path"]),
+                            "expected": record["file_size"],
+                            "actual": size
+                        })
+                    if manifest is None:
+                        continue
+                    previous = manifest.get(file_id)
+                    if previous and previous[0] == size and previous[1] == mtime_ns and previous[2] != digest:
+                        issues["corrupt"].append({
+                            "id": file_id,
+                            "name": os.path.basename(record["file_path"]),
+                            "expected_sha256": previous[2],
+                            "actual_sha256": digest
+                        })
+                        new_manifest[file_id] = previous  # Keep flagging until resolved
+                    else:
+                        new_manifest[file_id] = [size, mtime_ns, digest]
+
+            if manifest is not None:
+                _save_manifest(new_manifest)
+
+    return {
+        "id": f"fsck-{started_at.strftime('%Y%m%d-%H%M%S')}-{started_at.microsecond // 1000:03d}",
+        "started_at": started_at.isoformat(),
+        "seconds": round(time.perf_counter() - started, 3),
+        "verify": verify,
+        "scanned": {
+            "records": len(records),
+            "blobs": len(blobs),
+            "thumbnails": len(thumbnails),
+            "index_files": len(sidecars),
+            "verified": len(present) if verify != "none" else 0
+        },
+        "counts": {kind: len(found) for kind, found in issues.items()},
+        "issues": issues
+    }
+
+
+def repair(report: dict) -> dict:
+    """Fix what is safely fixable in a report, re-checking each item first.
+
+    Orphan blobs are moved to QUARANTINE_DIR/<report id>/ (nothing user
+    uploaded is deleted); orphan thumbnails and sidecars are derived data
+    and are deleted; dangling thumbnail paths are cleared in one save.
+    Missing, truncated or corrupt blobs are left for a human.
+    """
+    records = load_files_data()["files"]
+    ids = {record["id"] for record in records}
+    referenced = {os.path.basename(record["file_path"]) for record in records if record.get("file_path")}
+    result = {kind: 0 for kind in REPAIRABLE}
+    issues = report["issues"]
+
+    quarantine = QUARANTINE_DIR / report["id"]
+    for orphan in issues["orphan_blob"]:
+        if orphan["name"] in referenced:
+            continue  # Claimed by a record since the scan
+        quarantine.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(FILES_DIR / orphan["name"], quarantine / orphan["name"])
+        except FileNotFoundError:
+            continue
+        result["orphan_blob"] += 1
+
+    for kind, directory in (("orphan_thumbnail", THUMBNAILS_DIR), ("orphan_sidecar", INDEX_DIR)):
+        for orphan in issues[kind]:
+            if orphan["name"].split(".", 1)[0] in ids:
+                continue
+            try:
+                (directory / orphan["name"]).unlink()
+            except FileNotFoundError:
+                continue
+            result[kind] += 1
+
+    if issues["missing_thumbnail"]:
+        result["missing_thumbnail"] = clear_missing_thumbnails([item["id"] for item in issues["missing_thumbnail"]])
+
+    if result["orphan_blob"]:
+        result["quarantine"] = str(quarantine)
+    return result
+
+
+def save_report(report: dict) -> Path:
+    FSCK_DIR.mkdir(parents=True, exist_ok=True)
+    path = FSCK_DIR / f"{report['id']}.json"
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def report_summary(report: dict) -> dict:
+    """A report without its per-item issue lists"""
+    return {key: value for key, value in report.items() if key != "issues"}
+
+
+def list_reports() -> List[str]:
+    """Saved report names, newest first"""
+    if not FSCK_DIR.exists():
+        return []
+    return sorted((p.name for p in FSCK_DIR.glob("fsck-*.json")), reverse=True)
+
+
+def get_report_path(name: str) -> Optional[Path]:
+    """Path of a saved report (None for unknown or unsafe names)"""
+    if name != os.path.basename(name) or not name.startswith("fsck-") or not name.endswith(".json"):
+        return None
+    path = FSCK_DIR / name
+    return path if path.is_file() else None
+
+
+class FsckJob:
+    """One scan at a time in a background thread, for the admin API"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._phase = None
+        self._done = 0
+        self._total = 0
+        self.last_report: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    def start(self, verify: str, repair_issues: bool, workers: int = FSCK_WORKERS) -> bool:
+        """Start a scan; False if one is already running (here, in another worker or the CLI)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            lock_fd = try_lock_fsck()
+            if lock_fd is None:
+                return False
+            self._phase, self._done, self._total = "starting", 0, 0
+            self._thread = threading.Thread(
+                target=self._run, args=(verify, repair_issues, workers, lock_fd), name="fsck", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def status(self) -> dict:
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            return {
+                "running": running,
+                "phase": self._phase if running else None,
+                "done": self._done,
+                "total": self._total,
+                "last_report": report_summary(self.last_report) if self.last_report else None,
+                "last_error": self.last_error
+            }
+
+    def _progress(self, phase: str, done: int, total: int):
+        with self._lock:
+            self._phase, self._done, self._total = phase, done, total
+
+    def _run(self, verify: str, repair_issues: bool, workers: int, lock_fd: int):
+        try:
+            report = scan(verify, workers, self._progress)
+            if repair_issues:
+                self._progress("repairing", 0, 0)
+                report["repair"] = repair(report)
+            save_report(report)
+            with self._lock:
+                self.last_report = report
+                self.last_error = None
+        except Exception as e:
+            print(f"Storage scan failed: {e}")
+            with self._lock:
+                self.last_error = str(e)
+        finally:
+            unlock_fsck(lock_fd)
+
+
+fsck_job = FsckJob()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check storage against files.json")
+    parser.add_argument("--verify", choices=VERIFY_MODES, default="none",
+                        help="size: stat every blob; hash: also sha256 it against the manifest")
+    parser.add_argument("--repair", action="store_true",
+                        help="Quarantine orphan blobs, delete orphan thumbnails/sidecars, clear dead thumbnail paths")
+    parser.add_argument("--workers", type=int, default=FSCK_WORKERS)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    def show_progress(phase, done, total):
+        if total:
+            print(f"\r{phase} {done}/{total}", end="", file=sys.stderr)
+
+    lock_fd = try_lock_fsck()
+    if lock_fd is None:
+        print("A storage scan is already running", file=sys.stderr)
+        return 2
+    try:
+        report = scan(args.verify, args.workers, show_progress)
+        print(file=sys.stderr)
+        if args.repair:
+            report["repair"] = repair(report)
+        path = save_report(report)
+    finally:
+        unlock_fsck(lock_fd)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        scanned = report["scanned"]
+        print(f"Scanned {scanned['records']} records, {scanned['blobs']} blobs, "
+              f"{scanned['thumbnails']} thumbnails, {scanned['index_files']} index files in {report['seconds']:.2f}s")
+        for kind, count in report["counts"].items():
+            if count:
+                print(f"  {kind:<18} {count}")
+        if "repair" in report:
+            print(f"Repaired: {json.dumps(report['repair'])}")
+        print(f"Report: {path}")
+
+    unresolved = sum(count for kind, count in report["counts"].items() if kind not in REPAIRABLE or not args.repair)
+    return 1 if unresolved else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
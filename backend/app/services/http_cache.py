@@ -0,0 +1,143 @@
+import os
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+
+# Blobs and thumbnails are stored as {id}.{ext} and never rewritten in place,
+# so they can always be revalidated cheaply.
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def build_etag(file_id: str, stat_result: os.stat_result) -> str:
+    """Build a strong ETag from the record id and the blob's size/mtime"""
+    return f'"{file_id}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def record_timestamp(file: dict, stat_result: os.stat_result) -> float:
+    """Get Last-Modified timestamp from modified_at (falls back to blob mtime)"""
+    try:
+        return datetime.fromisoformat(file["modified_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return stat_result.st_mtime
+
+
+def http_date(timestamp: float) -> str:
+    """Format a timestamp as an HTTP date"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    """Parse an HTTP date header, returning None if invalid"""
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _etag_list(header: str) -> list:
+    """Split an If-None-Match style header into opaque tags (weakness stripped)"""
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: float,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[str] = None
+) -> bool:
+    """Check conditional GET headers (If-None-Match wins over If-Modified-Since)"""
+    if if_none_match:
+        tags = _etag_list(if_none_match)
+        return "*" in tags or etag in tags
+
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            return int(last_modified) <= int(since)
+
+    return False
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: float) -> bool:
+    """Check If-Range: the range is only honored if the validator still matches"""
+    if not if_range:
+        return True
+
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison only - weak tags never match for ranges
+        return if_range == etag
+
+    since = _parse_http_date(if_range)
+    return since is not None and int(last_modified) == int(since)
+
+
+def parse_range(range_header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single byte range into (start, end) inclusive.
+
+    Returns None when the header is absent or invalid, e.g. bytes=5-2 (serve
+    the full file, RFC 9110 14.2) and raises 416 only when the range starts
+    past the end of the file.
+    """
+    if not range_header or not range_header.strip().startswith("bytes="):
+        return None
+
+    spec = range_header.strip()[len("bytes="):]
+    if "," in spec:
+        return None  # Multipart ranges not supported, send whole file
+
+    try:
+        start_str, end_str = spec.split("-", 1)
+        if start_str.strip() == "":
+            # Suffix range: last N bytes
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise ValueError
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        else:
+            start = int(start_str)
+            if end_str.strip():
+                end = int(end_str)
+                if end < start:
+                    return None  # Invalid range: ignore it
+                end = min(end, file_size - 1)
+            else:
+                end = file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+
+    return start, end
+
+
+def validator_headers(etag: str, last_modified: float, cache_control: str) -> dict:
+    """Headers shared by 200, 206 and 304 responses"""
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control,
+    }
+
+
+def not_modified_response(headers: dict) -> Response:
+    """Empty 304 response carrying the validators"""
+    return Response(status_code=304, headers=headers)
+
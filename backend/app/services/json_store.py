@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import marshal
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from .metrics import (
+    METADATA_LOAD_SECONDS, METADATA_CACHE_HITS, METADATA_SAVE_SECONDS,
+    METADATA_SIZE_BYTES, METADATA_LOCK_WAIT_SECONDS, METADATA_LOCK_HOLD_SECONDS,
+)
+from .tracing import span, record_span
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+
+class StoreLock:
+    """Exclusive lock for one JSON document, across threads and processes.
+
+    A thread lock serializes writers inside a worker; flock on a sidecar
+    .lock file serializes workers. Not reentrant.
+
+    The descriptor is per process: a forked child sharing its parent's open
+    file would share the flock too, so it opens its own.
+    """
+
+    def __init__(self, lock_path: Path, name: str = ""):
+        self._lock_path = lock_path
+        self._name = name or lock_path.name
+        self._acquired_at = 0.0
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._fd_pid = None
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                if self._fd is None or self._fd_pid != os.getpid():
+                    self._fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                    self._fd_pid = os.getpid()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._acquired_at = time.perf_counter()
+        METADATA_LOCK_WAIT_SECONDS.observe(self._acquired_at - start, self._name)
+        record_span(f"{self._name}-lock-wait", self._acquired_at - start)
+        return self
+
+    def __exit__(self, *exc):
+        METADATA_LOCK_HOLD_SECONDS.observe(time.perf_counter() - self._acquired_at, self._name)
+        try:
+            if fcntl is not None and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+# Bumped when the snapshot layout changes; marshal itself is per Python version
+SNAPSHOT_FORMAT = 1
+
+
+class JsonStore:
+    """A JSON document shared by worker processes.
+
+    Each process keeps a hot parsed copy and re-reads the file only when its
+    stat stamp (inode, mtime, size) changes. Every save is an atomic
+    tmp + rename, so the stamp changes on each write and readers never see a
+    partial file.
+
+    With snapshot=True a marshal copy tagged with the file's stamp is kept
+    next to it; startup loads that instead of parsing JSON while it is
+    current.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        default: Callable[[], dict],
+        indent: Optional[int] = None,
+        snapshot: bool = False
+    ):
+        self.path = path
+        self.name = path.name
+        self.lock = StoreLock(path.with_name(path.name + ".lock"), self.name)
+        self._default = default
+        self._indent = indent
+        self._snapshot_path = path.with_name(path.name + ".snapshot") if snapshot else None
+        self._cache = None
+        self._cache_stamp = None
+        self._cache_lock = threading.Lock()
+
+    def stamp(self) -> tuple:
+        """Cheap version of the file on disk (changes on every save, in any process)"""
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return (0, 0, 0)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _read(self) -> dict:
+        try:
+            with METADATA_LOAD_SECONDS.time(self.name), span(f"{self.name}-read"):
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                    METADATA_SIZE_BYTES.set(os.fstat(f.fileno()).st_size, self.name)
+                    return data
+        except FileNotFoundError:
+            return self._default()
+
+    def load(self) -> dict:
+        """Shared hot copy - treat as read-only (use load_for_update to mutate)"""
+        stamp = self.stamp()
+        with self._cache_lock:
+            if self._cache is not None and self._cache_stamp == stamp:
+                METADATA_CACHE_HITS.inc(1, self.name)
+                return self._cache
+
+        data = self._read()
+        with self._cache_lock:
+            self._cache = data
+            self._cache_stamp = stamp
+        return data
+
+    def load_for_update(self) -> dict:
+        """Private copy for read-modify-write (call while holding self.lock)"""
+        return self._read()
+
+    def save(self, data: dict):
+        """Atomically replace the document (call while holding self.lock)"""
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with METADATA_SAVE_SECONDS.time(self.name), span(f"{self.name}-save"):
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=self._indent, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+                METADATA_SIZE_BYTES.set(os.fstat(f.fileno()).st_size, self.name)
+            os.replace(tmp_path, self.path)
+
+        # The caller may keep mutating its object, so the next load re-reads
+        with self._cache_lock:
+            self._cache = None
+            self._cache_stamp = None
+
+    def warm(self) -> str:
+        """Fill the hot copy at startup: "cached", "snapshot" or "parsed".
+
+        After a JSON parse the snapshot is rewritten for the next start.
+        """
+        stamp = self.stamp()
+        with self._cache_lock:
+            if self._cache is not None and self._cache_stamp == stamp:
+                return "cached"
+
+        data = self._read_snapshot(stamp)
+        source = "snapshot"
+        if data is None:
+            data = self._read()
+            source = "parsed"
+            if self.stamp() != stamp:
+                return source  # Saved meanwhile; the next load() re-reads
+
+        with self._cache_lock:
+            self._cache = data
+            self._cache_stamp = stamp
+        if source == "parsed":
+            self._write_snapshot(data, stamp)
+        return source
+
+    def refresh_snapshot(self):
+        """Bring the snapshot up to date with the file (e.g. at shutdown)"""
+        if self._snapshot_path is None or not self.exists():
+            return
+        stamp = self.stamp()
+        if self._snapshot_header(stamp) == self._read_snapshot_header():
+            return
+        data = self.load()
+        if self.stamp() == stamp:
+            self._write_snapshot(data, stamp)
+
+    def _snapshot_header(self, stamp: tuple) -> tuple:
+        return (SNAPSHOT_FORMAT, tuple(sys.version_info[:2]), tuple(stamp))
+
+    def _read_snapshot_header(self) -> Optional[tuple]:
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def _read_snapshot(self, stamp: tuple) -> Optional[dict]:
+        """Snapshot contents if it was taken from this exact file version"""
+        if self._snapshot_path is None or stamp == (0, 0, 0):
+            return None
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                if marshal.load(f) != self._snapshot_header(stamp):
+                    return None
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def _write_snapshot(self, data: dict, stamp: tuple):
+        tmp_path = self._snapshot_path.with_name(f"{self._snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                marshal.dump(self._snapshot_header(stamp), f)
+                marshal.dump(data, f)
+            os.replace(tmp_path, self._snapshot_path)
+        except (OSError, ValueError) as e:
+            print(f"Could not write {self._snapshot_path.name}: {e}")
+
+    @contextmanager
+    def transaction(self):
+        """Locked read-modify-write: yields a private copy, saved on clean exit"""
+        with self.lock:
+            data = self.load_for_update()
+            yield data
+            self.save(data)
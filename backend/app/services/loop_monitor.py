@@ -0,0 +1,104 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from typing import Optional
+
+from ..config import LOOP_LAG_INTERVAL, LOOP_BLOCK_DEBUG, LOOP_BLOCK_THRESHOLD
+from .metrics import Counter, Gauge, Histogram
+
+
+# Lag is how late the loop wakes a sleeping task: anything that holds the
+# loop (sync disk work, bcrypt, Pillow, big json.dumps in an async route)
+# delays every other request by the same amount.
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between a scheduled wake-up of the monitor task and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_LAG_LAST = Gauge(
+    "event_loop_lag_last_seconds",
+    "Most recent event loop lag sample"
+)
+LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Times the loop was held longer than LOOP_BLOCK_THRESHOLD (debug mode only)"
+)
+
+_task: Optional[asyncio.Task] = None
+_watchdog: Optional["_Watchdog"] = None
+_max_lag = 0.0
+
+
+async def _monitor(watchdog: Optional["_Watchdog"]):
+    """Sleep for a fixed interval and record how late each wake-up is"""
+    global _max_lag
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        now = time.perf_counter()
+        lag = max(now - start - LOOP_LAG_INTERVAL, 0.0)
+        LOOP_LAG_SECONDS.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+        if lag > _max_lag:
+            _max_lag = lag
+        if watchdog is not None:
+            watchdog.heartbeat = now
+
+
+class _Watchdog(threading.Thread):
+    """Debug mode: dump the loop thread's stack when it stops heart-beating.
+
+    The monitor task beats every LOOP_LAG_INTERVAL; if a beat is more than
+    LOOP_BLOCK_THRESHOLD late, whatever is on the loop thread's stack right
+    now is the code holding it. One report per stall.
+    """
+
+    def __init__(self, loop_thread_id: int):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.heartbeat = time.perf_counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        reported_beat = None
+        while not self.stopped.wait(LOOP_BLOCK_THRESHOLD / 2):
+            beat = self.heartbeat
+            stalled = time.perf_counter() - beat - LOOP_LAG_INTERVAL
+            if stalled < LOOP_BLOCK_THRESHOLD or beat == reported_beat:
+                continue
+            reported_beat = beat
+            LOOP_BLOCKED.inc()
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "  (no frame)\n"
+            print(f"Event loop blocked for {stalled:.3f}s+, loop thread stack:\n{stack}")
+
+
+def take_max_lag() -> float:
+    """Largest lag sampled since the previous call (and reset it)"""
+    global _max_lag
+    peak, _max_lag = _max_lag, 0.0
+    return peak
+
+
+def start_loop_monitor():
+    """Start measuring loop lag (call from the running loop, e.g. startup)"""
+    global _task, _watchdog
+    if _task is not None and not _task.done():
+        return
+    if LOOP_BLOCK_DEBUG:
+        _watchdog = _Watchdog(threading.get_ident())
+        _watchdog.start()
+    _task = asyncio.get_running_loop().create_task(_monitor(_watchdog))
+
+
+def stop_loop_monitor():
+    """Stop the monitor task and watchdog (shutdown)"""
+    global _task, _watchdog
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    if _watchdog is not None:
+        _watchdog.stopped.set()
+        _watchdog = None
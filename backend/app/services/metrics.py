@@ -0,0 +1,296 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Minimal Prometheus text-format registry (no client library needed).
+# Each metric guards its own samples with one short lock held only for a
+# dict update, so instrumenting hot paths costs about a microsecond.
+# Values are per worker process; scrape each worker (or run one) for totals.
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+# Request latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metadata and lock timings are usually far below a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic total"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is computed at scrape time by `collect`"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, *labels: str):
+        self.inc(-amount, *labels)
+
+    def track(self, *labels: str) -> "_InProgress":
+        """Context manager counting work in flight"""
+        return _InProgress(self, labels)
+
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            try:
+                return [f"{self.name} {_format_value(self._collect())}"]
+            except Exception:
+                return []
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class _InProgress:
+    __slots__ = ("gauge", "labels")
+
+    def __init__(self, gauge: Gauge, labels: Sequence[str]):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self):
+        self.gauge.inc(1, *self.labels)
+        return self
+
+    def __exit__(self, *exc):
+        self.gauge.dec(1, *self.labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (cumulative buckets are built at scrape time)"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Sequence[str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def render_metrics() -> str:
+    """Current values of every registered metric in Prometheus text format"""
+    return "\n".join(metric.render() for metric in list(_registry)) + "\n"
+
+
+# ============ HTTP ============
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last response byte, by route template",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    ("method",)
+)
+HTTP_REQUEST_BYTES = Counter(
+    "http_request_body_bytes_total",
+    "Request body bytes received (uploads), by route template",
+    ("route",)
+)
+HTTP_RESPONSE_BYTES = Counter(
+    "http_response_body_bytes_total",
+    "Response body bytes sent (downloads, previews, listings), by route template",
+    ("route",)
+)
+
+# ============ Uploads ============
+
+UPLOAD_BYTES = Counter(
+    "upload_bytes_total",
+    "File bytes written by uploads",
+    ("mode",)
+)
+
+# ============ Thumbnails ============
+
+THUMBNAIL_SECONDS = Histogram(
+    "thumbnail_generation_seconds",
+    "Time spent generating image thumbnails"
+)
+THUMBNAILS_IN_PROGRESS = Gauge(
+    "thumbnail_jobs_in_progress",
+    "Thumbnails being generated right now (upload requests waiting on Pillow)"
+)
+
+# ============ Metadata (files.json / users.json) ============
+
+METADATA_LOAD_SECONDS = Histogram(
+    "metadata_load_seconds",
+    "Time spent reading and parsing a metadata file from disk",
+    ("store",),
+    FAST_BUCKETS
+)
+METADATA_CACHE_HITS = Counter(
+    "metadata_cache_hits_total",
+    "Metadata loads answered from the in-process copy",
+    ("store",)
+)
+METADATA_SAVE_SECONDS = Histogram(
+    "metadata_save_seconds",
+    "Time spent serializing and atomically replacing a metadata file",
+    ("store",),
+    FAST_BUCKETS
+)
+METADATA_SIZE_BYTES = Gauge(
+    "metadata_size_bytes",
+    "Size of a metadata file at its last load or save",
+    ("store",)
+)
+METADATA_LOCK_WAIT_SECONDS = Histogram(
+    "metadata_lock_wait_seconds",
+    "Time spent waiting to acquire a metadata lock (FILES_LOCK for files.json)",
+    ("store",),
+    FAST_BUCKETS
+)
+METADATA_LOCK_HOLD_SECONDS = Histogram(
+    "metadata_lock_hold_seconds",
+    "Time a metadata lock was held",
+    ("store",),
+    FAST_BUCKETS
+)
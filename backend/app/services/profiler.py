@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from ..config import PROFILES_DIR, PROFILE_INTERVAL, PROFILE_MAX_REQUESTS
+
+
+# Leaf frames of threads that are parked, not working (idle pool workers,
+# the event loop waiting in select). Samples ending here are dropped.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures pool blocked on its queue
+}
+
+
+def _collapse(frame) -> Optional[str]:
+    """One stack in folded format (root first, ';'-separated), None if idle"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack while armed requests are in flight.
+
+    An admin arms it for the next N requests; a sampler thread polls
+    sys._current_frames() every PROFILE_INTERVAL seconds while any of those
+    requests is running, and the result is written as folded stacks
+    ("a;b;c count" lines) that flamegraph.pl, speedscope and inferno read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._active = 0
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._thread = None
+        self.last_profile: Optional[str] = None
+
+    def arm(self, requests: int):
+        """Profile the next `requests` requests (replaces an unfinished run)"""
+        requests = max(1, min(requests, PROFILE_MAX_REQUESTS))
+        with self._lock:
+            self._remaining = requests
+            self._stacks = Counter()
+            self._samples = 0
+            self._started_at = datetime.now()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "armed": self._remaining > 0 or self._active > 0,
+                "remaining_requests": self._remaining,
+                "active_requests": self._active,
+                "samples": self._samples,
+                "last_profile": self.last_profile
+            }
+
+    def request_started(self) -> bool:
+        """Claim the current request for profiling; True if it is profiled"""
+        if not self._remaining:  # Unlocked fast path: nothing armed
+            return False
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            self._active += 1
+            return True
+
+    def request_finished(self):
+        with self._lock:
+            self._active -= 1
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(PROFILE_INTERVAL)
+            with self._lock:
+                if self._active == 0:
+                    if self._remaining == 0:
+                        self._finish()
+                        self._thread = None
+                        return
+                    continue
+            frames = sys._current_frames()
+            stacks = [_collapse(frame) for ident, frame in frames.items() if ident != me]
+            with self._lock:
+                self._samples += 1
+                self._stacks.update(stack for stack in stacks if stack)
+
+    def _finish(self):
+        """Write the collected stacks (called with the lock held)"""
+        if not self._stacks:
+            return
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILES_DIR / f"profile-{self._started_at.strftime('%Y%m%d-%H%M%S')}.folded"
+        with open(path, "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.last_profile = path.name
+        self._stacks = Counter()
+
+
+def list_profiles() -> List[str]:
+    """Saved profile names, newest first"""
+    if not PROFILES_DIR.exists():
+        return []
+    return sorted((p.name for p in PROFILES_DIR.glob("*.folded")), reverse=True)
+
+
+def get_profile_path(name: str) -> Optional[Path]:
+    """Path of a saved profile (None for unknown or unsafe names)"""
+    if name != os.path.basename(name) or not name.endswith(".folded"):
+        return None
+    path = PROFILES_DIR / name
+    return path if path.is_file() else None
+
+
+profiler = SamplingProfiler()
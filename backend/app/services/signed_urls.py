@@ -0,0 +1,75 @@
+import hmac
+import time
+import base64
+import hashlib
+from typing import Optional
+
+from ..config import SECRET_KEY, SIGNED_URL_TTL, SIGNED_URL_BUCKET
+
+
+# Media routes that accept signed URLs
+SIGNED_VARIANTS = ("preview", "thumbnail", "download", "archive", "member")
+
+# Route path under /api/files/{id}/ where it differs from the variant name
+SIGNED_PATHS = {"member": "archive/member"}
+
+# Separate key so a URL signature can never double as a JWT signature
+_SIGNING_KEY = hmac.new(SECRET_KEY.encode("utf-8"), b"signed-url", hashlib.sha256).digest()
+
+
+def _signature(file_id: str, variant: str, exp: int) -> str:
+    mac = hmac.new(_SIGNING_KEY, f"{file_id}:{variant}:{exp}".encode("utf-8"), hashlib.sha256)
+    return base64.urlsafe_b64encode(mac.digest()).rstrip(b"=").decode("ascii")
+
+
+def current_expiry() -> int:
+    """Expiry for newly issued URLs.
+
+    Rounded up to a bucket boundary so every listing within a bucket issues
+    the same URL, which keeps browser and proxy caches warm.
+    """
+    now = int(time.time())
+    return (now // SIGNED_URL_BUCKET + 1) * SIGNED_URL_BUCKET + SIGNED_URL_TTL
+
+
+def sign_url(file_id: str, variant: str, exp: Optional[int] = None) -> str:
+    """Signed path for a media variant of a file"""
+    exp = exp or current_expiry()
+    path = SIGNED_PATHS.get(variant, variant)
+    return f"/api/files/{file_id}/{path}?exp={exp}&sig={_signature(file_id, variant, exp)}"
+
+
+def verify_signature(file_id: str, variant: str, exp: int, sig: str) -> bool:
+    """Check a signed URL (pure HMAC, no disk or user lookup)"""
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(_signature(file_id, variant, exp), sig)
+
+
+def signed_urls(record: dict) -> dict:
+    """Signed media URLs for a file record (a ZIP download for folders)"""
+    exp = current_expiry()
+    if record["is_folder"]:
+        return {"archive": sign_url(record["id"], "archive", exp)}
+    urls = {
+        "preview": sign_url(record["id"], "preview", exp),
+        "download": sign_url(record["id"], "download", exp),
+    }
+    if record.get("thumbnail_path"):
+        urls["thumbnail"] = sign_url(record["id"], "thumbnail", exp)
+    if record.get("file_type") == "archive":
+        # Append &path=<member> to pick the entry
+        urls["member"] = sign_url(record["id"], "member", exp)
+    return urls
+
+
+def with_signed_urls(record: Optional[dict]) -> Optional[dict]:
+    """Copy of a record with its "urls" filled in"""
+    if record is None:
+        return None
+    return dict(record, urls=signed_urls(record))
+
+
+def signed_cache_control(exp: int) -> str:
+    """Cache-Control for a signed response: shared caches may keep it until the URL expires"""
+    return f"public, max-age={max(int(exp - time.time()), 0)}, immutable"
@@ -0,0 +1,294 @@
+import os
+import bisect
+import codecs
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ..config import FILES_DIR, INDEX_DIR
+
+
+# Bytes sniffed for encoding detection
+SNIFF_SIZE = 64 * 1024
+
+# One checkpoint per block: jumping to any line reads at most ~one block
+LINE_INDEX_BLOCK = 1024 * 1024  # 1MB
+LINE_INDEX_VERSION = 1
+
+# Window limits
+MAX_LINES = 5000
+MAX_WINDOW_BYTES = 1024 * 1024  # 1MB
+
+LINE_INDEX_CACHE_SIZE = 32
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def detect_encoding(sample: bytes) -> Optional[str]:
+    """Guess text encoding from a sample (None = looks binary)"""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if b"\x00" in sample:
+        return None
+
+    try:
+        # A multibyte char may be cut at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def _blob_path(record: dict) -> Path:
+    return FILES_DIR.parent / record["file_path"]
+
+
+def _sniff(file_path: Path) -> Optional[str]:
+    with open(file_path, "rb") as f:
+        return detect_encoding(f.read(SNIFF_SIZE))
+
+
+def _build_line_index(file_path: Path) -> dict:
+    """Scan the file once, recording (byte offset, line number) per block.
+
+    Each checkpoint is the start of the first line beginning inside a block,
+    so counting uses bytes.count and only one find per block.
+    """
+    offsets = [0]
+    line_numbers = [0]
+    lines = 0
+    position = 0
+    last_byte = b"\n"
+
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(LINE_INDEX_BLOCK)
+            if not block:
+                break
+
+            if position > 0:
+                if last_byte == b"\n":
+                    start = 0
+                else:
+                    newline = block.find(b"\n")
+                    start = newline + 1 if newline != -1 else -1
+                if start != -1 and start < len(block):
+                    offsets.append(position + start)
+                    line_numbers.append(lines + block.count(b"\n", 0, start))
+
+            lines += block.count(b"\n")
+            position += len(block)
+            last_byte = block[-1:]
+
+    # A final line without trailing newline still counts
+    if position > 0 and last_byte != b"\n":
+        lines += 1
+
+    return {"offsets": offsets, "line_numbers": line_numbers, "total_lines": lines}
+
+
+def _write_sidecar(sidecar: Path, index: dict):
+    """Atomic write through a per-thread temp file (requests may build one index at once)"""
+    tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, sidecar)
+    except OSError as e:
+        print(f"Line index write failed for {sidecar.name}: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def load_line_index(record: dict) -> dict:
+    """Get the line index for a file, building the sidecar on first use"""
+    file_path = _blob_path(record)
+    stat_result = file_path.stat()
+    key = (stat_result.st_size, stat_result.st_mtime_ns)
+
+    with _index_cache_lock:
+        cached = _index_cache.get(record["id"])
+        if cached and (cached["blob_size"], cached["blob_mtime_ns"]) == key:
+            _index_cache.move_to_end(record["id"])
+            return cached
+
+    index = None
+    sidecar = INDEX_DIR / f"{record['id']}.lines.json"
+    if sidecar.exists():
+        try:
+            with open(sidecar, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if index and (
+            index.get("version") != LINE_INDEX_VERSION
+            or (index.get("blob_size"), index.get("blob_mtime_ns")) != key
+        ):
+            index = None
+
+    if index is None:
+        index = _build_line_index(file_path)
+        index.update({
+            "version": LINE_INDEX_VERSION,
+            "blob_size": key[0],
+            "blob_mtime_ns": key[1],
+        })
+        _write_sidecar(sidecar, index)
+
+    with _index_cache_lock:
+        _index_cache[record["id"]] = index
+        _index_cache.move_to_end(record["id"])
+        while len(_index_cache) > LINE_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+    return index
+
+
+def _seek_line(f, index: Optional[dict], line: int):
+    """Position f at the start of a line (nearest checkpoint, then skip forward)"""
+    if index is None or line == 0:
+        f.seek(0)
+        current = 0
+    else:
+        i = bisect.bisect_right(index["line_numbers"], line) - 1
+        f.seek(index["offsets"][i])
+        current = index["line_numbers"][i]
+
+    while current < line:
+        if not f.readline():
+            break
+        current += 1
+
+
+def _trim_partial_char(data: bytes, encoding: str) -> bytes:
+    """Drop a UTF-8 character cut off at the end of data"""
+    if not encoding.startswith("utf-8"):
+        return data
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    decoder.decode(data, final=False)
+    pending = len(decoder.getstate()[0])
+    return data[:len(data) - pending] if 0 < pending < len(data) else data
+
+
+def read_lines(record: dict, line: int = 0, count: int = 200, resume: Optional[int] = None) -> dict:
+    """Read a window of lines; a negative line counts back from the end (tail).
+
+    Line 0 is served straight from the start of the file; anything else uses
+    the cached line index so deep jumps are a seek rather than a scan. With
+    resume (a previous window's next_offset, passed with its next_line) the
+    read continues at that byte, no index needed. A line longer than the
+    window's byte budget comes back cut with truncated set; next_line then
+    still points at it and resuming returns the rest as the first line.
+    """
+    file_path = _blob_path(record)
+    encoding = _sniff(file_path)
+    count = max(1, min(count, MAX_LINES))
+
+    result = {
+        "encoding": encoding,
+        "is_binary": encoding is None,
+        "line_paging": encoding is not None and encoding != "utf-16",
+        "file_size": file_path.stat().st_size,
+        "total_lines": None,
+        "start_line": line,
+        "lines": [],
+        "next_line": None,
+        "next_offset": None,
+        "truncated": False,
+        "has_more": False,
+    }
+    if not result["line_paging"]:
+        return result  # Lines are split on b"\n": utf-16 text is read by byte window instead
+
+    index = None
+    if line != 0 and resume is None:
+        index = load_line_index(record)
+        result["total_lines"] = index["total_lines"]
+        if line < 0:
+            line = max(index["total_lines"] + line, 0)
+        result["start_line"] = line
+
+    lines = []
+    truncated = False
+    budget = MAX_WINDOW_BYTES
+    with open(file_path, "rb") as f:
+        if resume is not None:
+            f.seek(resume)
+        else:
+            _seek_line(f, index, line)
+        while len(lines) < count and budget > 0:
+            raw = f.readline(budget)
+            if not raw:
+                break
+            if not raw.endswith(b"\n") and len(raw) == budget:
+                # Cut by the budget: stop at a whole character and resume from there
+                keep = _trim_partial_char(raw, encoding)
+                f.seek(len(keep) - len(raw), os.SEEK_CUR)
+                raw = keep
+                truncated = True
+            budget -= len(raw)
+            lines.append(raw.rstrip(b"\r\n").decode(encoding, errors="replace"))
+        next_offset = f.tell()
+        has_more = bool(f.read(1))
+
+    result["lines"] = lines
+    result["has_more"] = has_more
+    if has_more:
+        result["truncated"] = truncated
+        result["next_line"] = line + len(lines) - (1 if truncated else 0)
+        result["next_offset"] = next_offset
+    return result
+
+
+def read_bytes(record: dict, offset: int = 0, length: int = 64 * 1024) -> dict:
+    """Read a byte window decoded as text, trimmed to whole characters"""
+    file_path = _blob_path(record)
+    file_size = file_path.stat().st_size
+    detected = _sniff(file_path)
+    encoding = detected or "cp1252"
+    offset = max(0, offset)
+    codec = encoding
+    if encoding == "utf-16":
+        offset -= offset % 2
+        if offset > 0:
+            # No BOM mid-file: decode in the byte order the file starts with
+            with open(file_path, "rb") as f:
+                codec = "utf-16-be" if f.read(2) == codecs.BOM_UTF16_BE else "utf-16-le"
+    length = max(1, min(length, MAX_WINDOW_BYTES))
+
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+
+    start = 0
+    if encoding.startswith("utf-8"):
+        # Skip continuation bytes of a char that started before the window
+        while start < len(data) and start < 3 and 0x80 <= data[start] <= 0xBF:
+            start += 1
+
+    decoder = codecs.getincrementaldecoder(codec)(errors="replace")
+    final = offset + len(data) >= file_size
+    text = decoder.decode(data[start:], final=final)
+    pending = len(decoder.getstate()[0])
+    next_offset = offset + len(data) - pending
+
+    return {
+        "encoding": encoding,
+        "is_binary": detected is None,
+        "file_size": file_size,
+        "offset": offset + start,
+        "text": text,
+        "next_offset": next_offset if next_offset < file_size else None,
+    }
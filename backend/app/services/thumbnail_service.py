@@ -1,12 +1,21 @@
 from pathlib import Path
-from PIL import Image
 import io
 
 from ..config import THUMBNAILS_DIR, THUMBNAIL_SIZE
+from .metrics import THUMBNAIL_SECONDS, THUMBNAILS_IN_PROGRESS
+from .tracing import span
 
 
 def generate_image_thumbnail(file_path: Path, file_id: str) -> str:
     """Generate thumbnail for image file only if needed"""
+    with THUMBNAILS_IN_PROGRESS.track(), THUMBNAIL_SECONDS.time(), span("thumbnail"):
+        return _generate_image_thumbnail(file_path, file_id)
+
+
+def _generate_image_thumbnail(file_path: Path, file_id: str) -> str:
+    # Imported lazily: Pillow is only loaded by workers that actually thumbnail
+    from PIL import Image
+    
     try:
         with Image.open(file_path) as img:
             original_size = img.size
@@ -40,6 +49,8 @@ def generate_image_thumbnail(file_path: Path, file_id: str) -> str:
 
 def get_image_dimensions(file_path: Path) -> tuple:
     """Get image dimensions"""
+    from PIL import Image
+    
     try:
         with Image.open(file_path) as img:
             return img.size
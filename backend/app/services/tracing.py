@@ -0,0 +1,77 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+
+# Per-request phase timings. TimingMiddleware opens a RequestTrace; code on
+# the hot path wraps its phases in span(...). The trace lives in a context
+# variable, which Starlette copies into worker threads, so spans in sync
+# handlers and run_io() calls land on the right request. Outside a request
+# a span costs two perf_counter() calls.
+
+
+class RequestTrace:
+    """Accumulated span timings for one request: name -> [seconds, calls]"""
+
+    __slots__ = ("start", "spans")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, list] = {}
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def breakdown(self) -> List[str]:
+        """Spans slowest first, e.g. "load_files_data=1.204s x12" """
+        ordered = sorted(self.spans.items(), key=lambda item: item[1][0], reverse=True)
+        return [f"{name}={seconds:.3f}s x{calls}" for name, (seconds, calls) in ordered]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in ms, visible in browser devtools)"""
+        parts = [f'{name};dur={seconds * 1000:.1f};desc="x{calls}"' for name, (seconds, calls) in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Begin tracing the current request"""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def record_span(name: str, seconds: float):
+    """Add an already measured phase to the current request, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class span:
+    """Time a block as a named phase of the current request (no-op outside one)"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.name, time.perf_counter() - self.start)
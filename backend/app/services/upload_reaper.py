@@ -0,0 +1,226 @@
+import os
+import shutil
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker reaps (deletes are idempotent)
+    fcntl = None
+
+from ..config import (
+    CHUNKS_DIR, UPLOAD_SESSION_TTL, UPLOAD_REAPER_INTERVAL,
+    UPLOAD_REAPER_BYTES_PER_SEC, UPLOAD_EXPIRED_RETENTION
+)
+from .async_io import run_io
+from .metrics import Counter, Gauge
+from .upload_sessions import session_lock, read_metadata, write_metadata
+
+
+# Chunked upload sessions idle longer than UPLOAD_SESSION_TTL are expired:
+# their chunks are deleted (throttled to UPLOAD_REAPER_BYTES_PER_SEC so a
+# big reclaim doesn't starve uploads of disk bandwidth) and metadata.json
+# stays behind as a tombstone with status "expired", so /upload/status can
+# say what happened. Tombstones go after UPLOAD_EXPIRED_RETENTION.
+
+UPLOAD_SESSIONS = Gauge(
+    "chunked_upload_sessions",
+    "Chunked upload sessions on disk at the last reaper pass",
+    ("state",)
+)
+UPLOAD_SESSION_BYTES = Gauge(
+    "chunked_upload_bytes",
+    "Bytes of uploaded chunks on disk at the last reaper pass",
+    ("state",)
+)
+SESSIONS_EXPIRED = Counter(
+    "upload_sessions_expired_total",
+    "Chunked upload sessions expired by the reaper"
+)
+BYTES_RECLAIMED = Counter(
+    "upload_bytes_reclaimed_total",
+    "Chunk bytes deleted by the reaper"
+)
+
+_task: Optional[asyncio.Task] = None
+
+
+def last_activity(metadata: dict) -> datetime:
+    """When a session last made progress (last chunk, else creation)"""
+    return datetime.fromisoformat(metadata.get("updated_at") or metadata["created_at"])
+
+
+def session_expires_at(metadata: dict) -> datetime:
+    return last_activity(metadata) + timedelta(seconds=UPLOAD_SESSION_TTL)
+
+
+class _Session:
+    __slots__ = ("upload_id", "path", "metadata", "chunks", "bytes", "idle_since")
+
+    def __init__(self, path: Path):
+        self.upload_id = path.name
+        self.path = path
+        self.metadata = None
+        self.chunks = []
+        self.bytes = 0
+        try:
+            self.metadata = read_metadata(path)
+            self.idle_since = last_activity(self.metadata)
+        except (OSError, ValueError, KeyError):
+            # Missing or corrupt metadata: fall back to the directory's mtime
+            self.idle_since = datetime.fromtimestamp(path.stat().st_mtime)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("chunk_"):
+                    size = entry.stat().st_size
+                    self.chunks.append((entry.path, size))
+                    self.bytes += size
+
+    @property
+    def state(self) -> str:
+        if self.metadata is None:
+            return "orphaned"
+        return "expired" if self.metadata.get("status") == "expired" else "active"
+
+
+def _scan_sessions() -> List[_Session]:
+    sessions = []
+    if not CHUNKS_DIR.exists():
+        return sessions
+    with os.scandir(CHUNKS_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                try:
+                    sessions.append(_Session(Path(entry.path)))
+                except FileNotFoundError:
+                    pass  # Completed or cancelled while scanning
+    return sessions
+
+
+def _mark_expired(session: _Session) -> bool:
+    """Flip a session to "expired" unless it made progress since the scan"""
+    try:
+        with session_lock(session.path):
+            metadata = read_metadata(session.path)
+            if metadata["status"] == "expired" or last_activity(metadata) != session.idle_since:
+                return False
+            
+            metadata.update(
+                status="expired",
+                expired_at=datetime.now().isoformat(),
+                uploaded_chunks=[],
+                reclaimed_bytes=session.bytes
+            )
+            write_metadata(session.path, metadata)
+            return True
+    except FileNotFoundError:
+        return False
+
+
+def _try_lock_reaper():
+    """One worker reaps per pass; returns the held lock fd, or None if busy"""
+    if fcntl is None:
+        return -1
+    fd = os.open(CHUNKS_DIR / ".reaper.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def _unlock_reaper(fd: int):
+    if fd >= 0:
+        os.close(fd)  # Closing releases the flock
+
+
+async def _delete_throttled(paths: List[tuple]):
+    """Delete chunk files at no more than UPLOAD_REAPER_BYTES_PER_SEC"""
+    for path, size in paths:
+        try:
+            await run_io(os.unlink, path)
+        except FileNotFoundError:
+            continue
+        BYTES_RECLAIMED.inc(size)
+        await asyncio.sleep(size / UPLOAD_REAPER_BYTES_PER_SEC)
+
+
+async def _expire(session: _Session) -> bool:
+    """Expire one idle session; False if it made progress since the scan"""
+    if session.state == "orphaned":
+        # No metadata to keep as a tombstone, remove the whole directory
+        await _delete_throttled(session.chunks)
+        await run_io(shutil.rmtree, session.path, True)
+        return True
+    if not await run_io(_mark_expired, session):
+        return False
+    await _delete_throttled(session.chunks)
+    session.metadata["status"] = "expired"
+    session.bytes = 0
+    return True
+
+
+async def reap_uploads() -> dict:
+    """One reaper pass: expire idle sessions, drop old tombstones, update gauges"""
+    lock_fd = await run_io(_try_lock_reaper)
+    if lock_fd is None:
+        return {"skipped": True}
+    
+    try:
+        sessions = await run_io(_scan_sessions)
+        now = datetime.now()
+        ttl = timedelta(seconds=UPLOAD_SESSION_TTL)
+        retention = timedelta(seconds=UPLOAD_EXPIRED_RETENTION)
+        expired = 0
+        counts = {"active": [0, 0], "expired": [0, 0]}
+        
+        for session in sessions:
+            if session.state == "expired":
+                if session.chunks:
+                    await _delete_throttled(session.chunks)  # A previous pass was interrupted
+                    session.bytes = 0
+                expired_at = datetime.fromisoformat(session.metadata.get("expired_at") or session.metadata["created_at"])
+                if now - expired_at > retention:
+                    await run_io(shutil.rmtree, session.path, True)
+                    continue
+            elif now - session.idle_since > ttl and await _expire(session):
+                SESSIONS_EXPIRED.inc()
+                expired += 1
+            
+            if session.state != "orphaned":
+                counts[session.state][0] += 1
+                counts[session.state][1] += session.bytes
+        
+        for state, (count, size) in counts.items():
+            UPLOAD_SESSIONS.set(count, state)
+            UPLOAD_SESSION_BYTES.set(size, state)
+        
+        return {"skipped": False, "scanned": len(sessions), "expired": expired}
+    finally:
+        await run_io(_unlock_reaper, lock_fd)
+
+
+async def _reaper_loop():
+    while True:
+        try:
+            await reap_uploads()
+        except Exception as e:
+            print(f"Upload reaper failed: {e}")
+        await asyncio.sleep(UPLOAD_REAPER_INTERVAL)
+
+
+def start_upload_reaper():
+    """Start the periodic reaper (call from the running loop, e.g. startup)"""
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.get_running_loop().create_task(_reaper_loop())
+
+
+def stop_upload_reaper():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
@@ -0,0 +1,72 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+
+# A chunked upload's metadata.json is read-modify-written by concurrent
+# chunk requests (possibly in different workers), by complete and by the
+# reaper. Every update holds the session lock - flock on <session>/.lock,
+# opened per acquisition so threads of one worker exclude each other too -
+# and replaces the file atomically, so readers never see a partial document.
+
+METADATA_FILE = "metadata.json"
+
+_fallback_lock = threading.Lock()
+
+
+@contextmanager
+def session_lock(upload_dir: Path):
+    """Exclusive lock on one upload session (FileNotFoundError once it is removed)"""
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+    fd = os.open(upload_dir / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Closing releases the flock
+
+
+def read_metadata(upload_dir: Path) -> dict:
+    with open(upload_dir / METADATA_FILE, "r") as f:
+        return json.load(f)
+
+
+def write_metadata(upload_dir: Path, metadata: dict):
+    """Replace metadata.json atomically (call under session_lock once the session exists)"""
+    tmp_path = upload_dir / f"{METADATA_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metadata, f)
+    os.replace(tmp_path, upload_dir / METADATA_FILE)
+
+
+def record_chunk(upload_dir: Path, chunk_index: int, part_path: Path) -> dict:
+    """Move a received chunk into place and mark it uploaded, under the session lock.
+
+    The metadata is re-read under the lock, so concurrent chunks never drop
+    each other's indexes. If the session stopped being in progress while the
+    chunk was being written (cancelled, expired, completing) the part file is
+    discarded and the metadata returned unchanged for the caller to report.
+    """
+    with session_lock(upload_dir):
+        metadata = read_metadata(upload_dir)
+        if metadata["status"] != "in_progress":
+            part_path.unlink()
+            return metadata
+
+        os.replace(part_path, upload_dir / f"chunk_{chunk_index}")
+        if chunk_index not in metadata["uploaded_chunks"]:
+            metadata["uploaded_chunks"].append(chunk_index)
+        metadata["updated_at"] = datetime.now().isoformat()
+        write_metadata(upload_dir, metadata)
+        return metadata
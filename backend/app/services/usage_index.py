@@ -0,0 +1,332 @@
+import heapq
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+
+from .file_service import FILES_STORE, load_files_data
+from .tracing import span
+
+
+# Recursive per-folder usage, kept in step with files.json through the
+# change feed: after a save only the records named in the new change-log
+# entries are re-applied (each moves its bytes up its ancestor chain),
+# and a full rebuild happens only on first use or when the log has a gap.
+#
+# Folder totals count what is visible in the folder: files not in trash
+# under subfolders not in trash. Trashed items and everything inside a
+# trashed folder count towards the trash instead, so the root total plus
+# the trash is every stored byte. Type, age and largest-file figures cover
+# files not trashed themselves, like get_storage_stats().
+
+TYPE_KEYS = ("image", "video", "audio", "document", "archive", "code", "other")
+
+# (upper bound in days, label); older files go to "older"
+AGE_BANDS = ((7, "last_week"), (30, "last_month"), (90, "last_quarter"), (365, "last_year"))
+
+# Entry tuple fields
+PARENT, IS_FOLDER, IS_DELETED, SIZE, FILE_TYPE, DAY, NAME = range(7)
+
+
+def _entry(record: dict) -> tuple:
+    file_type = record["file_type"] if record["file_type"] in TYPE_KEYS else "other"
+    return (
+        record["parent_folder_id"],
+        record["is_folder"],
+        record["is_deleted"],
+        0 if record["is_folder"] else record["file_size"] or 0,
+        file_type,
+        (record.get("created_at") or "")[:10],
+        record["original_filename"]
+    )
+
+
+class UsageIndex:
+    """Folder rollups, trash size and file statistics for one files.json version"""
+
+    def __init__(self):
+        self.version = None
+        self.seq = 0
+        self.entries: Dict[str, tuple] = {}
+        self.tree: Dict[Optional[str], list] = {None: [0, 0]}  # folder -> [bytes, files]
+        self.subfolders: Dict[Optional[str], set] = {}
+        self.trash = [0, 0]
+        self.types = {key: [0, 0] for key in TYPE_KEYS}
+        self.days: Dict[str, list] = {}
+        self.size_buckets: Dict[int, set] = {}  # bit_length(size) -> file ids
+        self.summaries: Dict[int, dict] = {}  # top -> cached summary for this version
+
+    # ---- maintenance ----
+
+    def rebuild(self, files: List[dict]):
+        self.__init__()
+        entries = self.entries
+        for f in files:
+            entry = entries[f["id"]] = _entry(f)
+            if entry[IS_FOLDER]:
+                self.subfolders.setdefault(entry[PARENT], set()).add(f["id"])
+                self.tree.setdefault(f["id"], [0, 0])
+                continue
+            self._count_file(f["id"], entry, 1)
+            if entry[IS_DELETED]:
+                self.trash[0] += entry[SIZE]
+                self.trash[1] += 1
+            else:
+                totals = self.tree.setdefault(entry[PARENT], [0, 0])
+                totals[0] += entry[SIZE]
+                totals[1] += 1
+
+        # Fold folders into their parents deepest first, so each total is complete when added
+        depths = {}
+        for folder_id in self.tree:
+            if folder_id is not None:
+                self._depth(folder_id, depths)
+        for folder_id in sorted(depths, key=depths.get, reverse=True):
+            entry = entries.get(folder_id)
+            if entry is None:
+                continue  # Parent of orphans: its records are gone
+            totals = self.tree[folder_id]
+            if entry[IS_DELETED]:
+                self.trash[0] += totals[0]
+                self.trash[1] += totals[1]
+            else:
+                parent = self.tree.setdefault(entry[PARENT], [0, 0])
+                parent[0] += totals[0]
+                parent[1] += totals[1]
+
+    def _depth(self, folder_id: str, depths: dict) -> int:
+        chain = []
+        current = folder_id
+        while current is not None and current not in depths and current in self.entries:
+            if len(chain) > len(self.entries):
+                break  # Parent cycle
+            chain.append(current)
+            current = self.entries[current][PARENT]
+        depth = depths.get(current, 0)
+        for node in reversed(chain):
+            depth += 1
+            depths[node] = depth
+        return depths.get(folder_id, 0)
+
+    def apply(self, file_id: str, record: Optional[dict]):
+        """Replace one record's contribution (record None: it was deleted)"""
+        old = self.entries.pop(file_id, None)
+        if old is not None:
+            self._contribute(file_id, old, -1)
+        if record is not None:
+            entry = self.entries[file_id] = _entry(record)
+            self._contribute(file_id, entry, 1)
+
+    def _contribute(self, file_id: str, entry: tuple, sign: int):
+        if entry[IS_FOLDER]:
+            siblings = self.subfolders.setdefault(entry[PARENT], set())
+            if sign > 0:
+                siblings.add(file_id)
+            else:
+                siblings.discard(file_id)
+            totals = self.tree.setdefault(file_id, [0, 0])
+            delta_bytes, delta_files = sign * totals[0], sign * totals[1]
+        else:
+            self._count_file(file_id, entry, sign)
+            delta_bytes, delta_files = sign * entry[SIZE], sign
+
+        if entry[IS_DELETED]:
+            self.trash[0] += delta_bytes
+            self.trash[1] += delta_files
+        else:
+            self._propagate(entry[PARENT], delta_bytes, delta_files)
+
+    def _propagate(self, folder_id: Optional[str], delta_bytes: int, delta_files: int):
+        """Add a delta to a folder and its ancestors, up to the root or a trashed folder"""
+        steps = 0
+        while True:
+            totals = self.tree.setdefault(folder_id, [0, 0])
+            totals[0] += delta_bytes
+            totals[1] += delta_files
+            entry = self.entries.get(folder_id) if folder_id is not None else None
+            if entry is None:
+                return
+            if entry[IS_DELETED]:
+                self.trash[0] += delta_bytes
+                self.trash[1] += delta_files
+                return
+            folder_id = entry[PARENT]
+            steps += 1
+            if steps > len(self.entries):
+                return  # Parent cycle
+
+    def _count_file(self, file_id: str, entry: tuple, sign: int):
+        """Type, age and size-bucket counts for files not trashed themselves"""
+        if entry[IS_DELETED]:
+            return
+        size = entry[SIZE]
+        for totals in (self.types[entry[FILE_TYPE]], self.days.setdefault(entry[DAY], [0, 0])):
+            totals[0] += sign
+            totals[1] += sign * size
+        bucket = self.size_buckets.setdefault(size.bit_length(), set())
+        if sign > 0:
+            bucket.add(file_id)
+        else:
+            bucket.discard(file_id)
+
+    # ---- queries ----
+
+    def in_trash(self, file_id: str) -> bool:
+        """Whether a record or any of its ancestors is trashed"""
+        return self._reaches_root(file_id) is False
+
+    def _reaches_root(self, file_id: str) -> Optional[bool]:
+        """True if nothing on the way to the root is trashed, False at a
+        trashed ancestor, None if the chain ends at a missing folder"""
+        steps = 0
+        current = file_id
+        while current is not None and steps <= len(self.entries):
+            entry = self.entries.get(current)
+            if entry is None:
+                return None
+            if entry[IS_DELETED]:
+                return False
+            current = entry[PARENT]
+            steps += 1
+        return True if current is None else None
+
+    def folder_totals(self, folder_id: Optional[str]) -> dict:
+        totals = self.tree.get(folder_id, [0, 0])
+        return {"size": totals[0], "file_count": totals[1]}
+
+    def _folder_item(self, folder_id: str) -> dict:
+        entry = self.entries[folder_id]
+        return dict(
+            {"id": folder_id, "name": entry[NAME], "parent_folder_id": entry[PARENT]},
+            **self.folder_totals(folder_id)
+        )
+
+    def largest_folders(self, top: int) -> List[dict]:
+        """Largest folders reachable from the root without passing through trash"""
+        ranked = sorted(
+            (i for i, e in self.entries.items() if e[IS_FOLDER] and not e[IS_DELETED]),
+            key=lambda i: self.tree.get(i, (0,))[0], reverse=True
+        )
+        folders = []
+        for folder_id in ranked:
+            if len(folders) == top:
+                break
+            if self._reaches_root(folder_id):
+                folders.append(self._folder_item(folder_id))
+        return folders
+
+    def subfolder_usage(self, parent_id: Optional[str]) -> List[dict]:
+        """Untrashed direct subfolders of a folder, largest first"""
+        folders = [
+            self._folder_item(i) for i in self.subfolders.get(parent_id, ())
+            if not self.entries[i][IS_DELETED]
+        ]
+        folders.sort(key=lambda f: f["size"], reverse=True)
+        return folders
+
+    def largest_files(self, top: int) -> List[dict]:
+        """Largest files, read from the size buckets downwards"""
+        candidates = []
+        for bucket in sorted(self.size_buckets, reverse=True):
+            candidates.extend(self.size_buckets[bucket])
+            if len(candidates) >= top:
+                break
+        files = []
+        for file_id in heapq.nlargest(top, candidates, key=lambda i: self.entries[i][SIZE]):
+            entry = self.entries[file_id]
+            files.append({
+                "id": file_id,
+                "name": entry[NAME],
+                "parent_folder_id": entry[PARENT],
+                "size": entry[SIZE],
+                "file_type": entry[FILE_TYPE],
+                "in_trash": self.in_trash(file_id)
+            })
+        return files
+
+    def age_distribution(self) -> List[dict]:
+        bands = [[label, 0, 0] for _, label in AGE_BANDS] + [["older", 0, 0]]
+        today = date.today()
+        for day, (count, size) in self.days.items():
+            try:
+                age = (today - date.fromisoformat(day)).days
+            except ValueError:
+                age = None  # Records without a usable created_at
+            index = len(AGE_BANDS)
+            if age is not None:
+                index = next((n for n, (days, _) in enumerate(AGE_BANDS) if age < days), index)
+            bands[index][1] += count
+            bands[index][2] += size
+        return [{"age": label, "count": count, "size": size} for label, count, size in bands]
+
+    def type_distribution(self) -> dict:
+        return {key: {"count": count, "size": size} for key, (count, size) in self.types.items()}
+
+
+_index = UsageIndex()
+_index_lock = threading.Lock()
+
+
+def _refresh():
+    """Bring the index up to the current files.json version (call under _index_lock)"""
+    version = FILES_STORE.stamp()
+    if _index.version == version:
+        return
+
+    data = load_files_data()
+    seq = data.get("seq", 0)
+    changes = data.get("changes", [])
+    # Incremental only if every change since our seq is still in the log
+    covered = bool(changes) and changes[0]["seq"] <= _index.seq + 1
+    with span("usage_index"):
+        if _index.version is None or seq <= _index.seq or not covered:
+            _index.rebuild(data["files"])
+        else:
+            changed = {c["id"] for c in changes if c["seq"] > _index.seq}
+            records = {f["id"]: f for f in data["files"] if f["id"] in changed}
+            for file_id in changed:
+                _index.apply(file_id, records.get(file_id))
+            _index.summaries = {}
+    _index.version = version
+    _index.seq = seq
+
+
+def get_usage_summary(top: int = 10) -> dict:
+    """Totals, trash, largest folders/files and age and type distributions"""
+    with _index_lock:
+        _refresh()
+        summary = _index.summaries.get(top)
+        if summary is None:
+            types = _index.type_distribution()
+            summary = _index.summaries[top] = {
+                "total_files": sum(t["count"] for t in types.values()),
+                "root": _index.folder_totals(None),
+                "trash": {"size": _index.trash[0], "file_count": _index.trash[1]},
+                "largest_folders": _index.largest_folders(top),
+                "largest_files": _index.largest_files(top),
+                "age_distribution": _index.age_distribution(),
+                "file_type_distribution": types
+            }
+        return summary
+
+
+def get_folder_usage(folder_id: Optional[str], top: int = 20) -> Optional[dict]:
+    """Drill-down for one folder (None = root); None if it is not a folder"""
+    with _index_lock:
+        _refresh()
+        if folder_id is not None:
+            entry = _index.entries.get(folder_id)
+            if entry is None or not entry[IS_FOLDER]:
+                return None
+
+        totals = _index.folder_totals(folder_id)
+        subfolders = _index.subfolder_usage(folder_id)
+        direct_size = totals["size"] - sum(f["size"] for f in subfolders)
+        direct_files = totals["file_count"] - sum(f["file_count"] for f in subfolders)
+        return dict(
+            totals,
+            id=folder_id,
+            name=_index.entries[folder_id][NAME] if folder_id is not None else None,
+            in_trash=_index.in_trash(folder_id) if folder_id is not None else False,
+            direct={"size": direct_size, "file_count": direct_files},
+            subfolders=subfolders[:top]
+        )
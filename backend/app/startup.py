@@ -0,0 +1,44 @@
+import time
+from typing import Callable, Dict, Tuple
+
+from .config import ensure_directories
+from .auth import init_users, flush_last_logins
+from .services.file_service import init_files, save_files_snapshot
+from .services.content_index import start_content_indexer
+from .services.metrics import Gauge
+
+
+STARTUP_SECONDS = Gauge(
+    "startup_seconds",
+    "Time this worker spent in each startup phase",
+    ("phase",)
+)
+
+
+def _timed(timings: Dict[str, float], phase: str, func: Callable):
+    start = time.perf_counter()
+    result = func()
+    timings[phase] = time.perf_counter() - start
+    STARTUP_SECONDS.set(timings[phase], phase)
+    return result
+
+
+def initialize() -> Tuple[Dict[str, float], str]:
+    """The one initialization path: directories, users, file metadata, indexer.
+
+    Nothing runs at import time; startup calls this once per worker on the
+    I/O pool (it may hash the default password or parse files.json).
+    Returns seconds per phase and where files.json was loaded from.
+    """
+    timings = {}
+    _timed(timings, "directories", ensure_directories)
+    _timed(timings, "users", init_users)
+    files_source = _timed(timings, "files", init_files)
+    _timed(timings, "content_index", start_content_indexer)
+    return timings, files_source
+
+
+def finalize():
+    """Write state batched in memory and refresh the files.json snapshot"""
+    flush_last_logins()
+    save_files_snapshot()
@@ -0,0 +1,4 @@
+"""Benchmark and load-test tools (not part of the app, not tests).
+
+Run from backend/:  python -m benchmarks.run --help
+"""
@@ -0,0 +1,372 @@
+"""Concurrent load test against a running server.
+
+    cd backend
+    uvicorn app.main:app --port 8000            # in another terminal
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --duration 30 \
+        --users upload=4,download=8,browse=16,login=4
+
+Virtual users of each scenario loop until the deadline:
+
+    upload    chunked uploads (/upload/init, /upload/chunk, /upload/complete)
+    download  resumed downloads: consecutive Range requests with If-Range
+    browse    folder listing followed by the page's thumbnails, like the grid
+    login     back-to-back logins (bcrypt pool and login throttling)
+
+The report gives throughput, latency percentiles and errors per operation,
+plus the change in the server's /metrics over the run: files.json lock wait
+(FILES_LOCK contention) and event loop lag / blocked-loop counts.
+Everything the test creates lives in one folder that is deleted afterwards.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from .run import summarize
+
+
+DEFAULT_USERS = "upload=4,download=8,browse=16,login=4"
+
+# /metrics series compared before and after the run
+WATCHED_METRICS = {
+    "files_lock_wait": ('metadata_lock_wait_seconds_sum{store="files.json"}',
+                        'metadata_lock_wait_seconds_count{store="files.json"}'),
+    "files_lock_hold": ('metadata_lock_hold_seconds_sum{store="files.json"}',
+                        'metadata_lock_hold_seconds_count{store="files.json"}'),
+    "files_json_save": ('metadata_save_seconds_sum{store="files.json"}',
+                        'metadata_save_seconds_count{store="files.json"}'),
+    "event_loop_lag": ("event_loop_lag_seconds_sum", "event_loop_lag_seconds_count"),
+}
+
+
+class Recorder:
+    """Latency samples and failures per operation"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def timed(self, op: str, request, *ok_status: int) -> Optional[httpx.Response]:
+        """Await a request, recording its latency or the reason it failed"""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError as e:
+            self.errors[op][type(e).__name__] += 1
+            return None
+        if response.status_code not in ok_status:
+            self.errors[op][str(response.status_code)] += 1
+            return None
+        self.samples[op].append(time.perf_counter() - start)
+        return response
+
+    def report(self, duration: float) -> dict:
+        result = {}
+        for op in sorted(set(self.samples) | set(self.errors)):
+            errors = dict(self.errors.get(op, {}))
+            stats = summarize(self.samples.get(op, []), sum(errors.values()))
+            total = stats["count"] + stats["errors"]
+            stats["throughput_per_sec"] = round(stats["count"] / duration, 2)
+            stats["error_rate"] = round(stats["errors"] / total, 4) if total else 0.0
+            stats["errors_by_reason"] = errors
+            del stats["ops_per_sec"]  # Sequential rate; meaningless under concurrency
+            result[op] = stats
+        return result
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.recorder = Recorder()
+        self.rng = random.Random(args.seed)
+        self.headers: Dict[str, str] = {}
+        self.folder_id: Optional[str] = None
+        self.created: List[str] = []
+        self.folders: List[Optional[str]] = []
+        self.blob: Optional[dict] = None
+        self.chunk_size = 0
+        self.chunk = b""
+
+    # ============ Setup / teardown ============
+
+    async def login(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/api/auth/login", json={
+            "username": self.args.username, "password": self.args.password
+        })
+
+    async def upload(self, client: httpx.AsyncClient, name: str, content: bytes, folder_id: Optional[str]) -> dict:
+        data = {"conflict": "rename"}
+        if folder_id:
+            data["folder_id"] = folder_id
+        response = await client.post("/api/files/upload", files={"file": (name, content)}, data=data, headers=self.headers)
+        response.raise_for_status()
+        record = response.json()["data"]
+        self.created.append(record["id"])
+        return record
+
+    async def setup(self, client: httpx.AsyncClient):
+        response = await self.login(client)
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['data']['token']}"}
+
+        name = f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        response = await client.post("/api/files/folder", json={"name": name}, headers=self.headers)
+        response.raise_for_status()
+        self.folder_id = response.json()["data"]["id"]
+        self.folders = [self.folder_id]
+
+        for i in range(self.args.folders):
+            response = await client.post(
+                "/api/files/folder", json={"name": f"album-{i}", "parent_id": self.folder_id}, headers=self.headers
+            )
+            response.raise_for_status()
+            self.folders.append(response.json()["data"]["id"])
+            self.created.append(self.folders[-1])
+
+        # A photo grid per folder (thumbnails are generated on upload)
+        images = [self._image_bytes(seed) for seed in range(4)]
+        for folder_id in self.folders:
+            for i in range(self.args.images):
+                await self.upload(client, f"photo-{i}.jpg", images[i % len(images)], folder_id)
+
+        self.blob = await self.upload(client, "blob.bin", os.urandom(self.args.blob_size), self.folder_id)
+
+        # The server decides the chunk size; ask with a throwaway session
+        response = await client.post("/api/files/upload/init", json={
+            "filename": "probe.bin", "file_size": 1, "total_chunks": 1, "folder_id": self.folder_id
+        }, headers=self.headers)
+        response.raise_for_status()
+        probe = response.json()["data"]
+        await client.delete(f"/api/files/upload/cancel/{probe['upload_id']}", headers=self.headers)
+        self.chunk_size = probe["chunk_size"]
+        self.chunk = os.urandom(self.chunk_size)
+
+    async def teardown(self, client: httpx.AsyncClient):
+        # Children first: permanent delete does not recurse into folders
+        for file_id in reversed(self.created):
+            await client.delete(f"/api/files/{file_id}", params={"permanent": "true"}, headers=self.headers)
+        if self.folder_id:
+            await client.delete(f"/api/files/{self.folder_id}", params={"permanent": "true"}, headers=self.headers)
+
+    def _image_bytes(self, seed: int) -> bytes:
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.effect_noise((1600, 1200), 48 + seed).convert("RGB").save(buffer, "JPEG", quality=85)
+        return buffer.getvalue()
+
+    # ============ Scenarios ============
+
+    async def scenario_upload(self, client: httpx.AsyncClient, deadline: float):
+        size = self.args.upload_size
+        total = -(-size // self.chunk_size)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await self.recorder.timed("upload.init", client.post("/api/files/upload/init", json={
+                "filename": f"load-{self.rng.getrandbits(32):08x}.bin",
+                "file_size": size,
+                "total_chunks": total,
+                "folder_id": self.rng.choice(self.folders),
+                "conflict": "rename"
+            }, headers=self.headers), 200)
+            if response is None:
+                continue
+            upload_id = response.json()["data"]["upload_id"]
+
+            failed = False
+            for index in range(total):
+                length = min(self.chunk_size, size - index * self.chunk_size)
+                response = await self.recorder.timed("upload.chunk", client.post(
+                    f"/api/files/upload/chunk/{upload_id}",
+                    data={"chunk_index": str(index)},
+                    files={"chunk": ("chunk", self.chunk[:length])},
+                    headers=self.headers
+                ), 200)
+                if response is None:
+                    failed = True
+                    break
+            if failed:
+                await client.delete(f"/api/files/upload/cancel/{upload_id}", headers=self.headers)
+                continue
+
+            response = await self.recorder.timed(
+                "upload.complete", client.post(f"/api/files/upload/complete/{upload_id}", headers=self.headers), 200
+            )
+            if response is not None:
+                self.created.append(response.json()["data"]["id"])
+                self.recorder.samples["upload.total"].append(time.perf_counter() - start)
+
+    async def scenario_download(self, client: httpx.AsyncClient, deadline: float):
+        size = self.blob["file_size"]
+        piece = self.args.range_size
+        url = f"/api/files/{self.blob['id']}/download"
+        while time.perf_counter() < deadline:
+            # Resume from a random offset, a few consecutive pieces
+            offset = self.rng.randrange(max(size - piece, 1))
+            etag = None
+            for _ in range(4):
+                if offset >= size:
+                    break
+                headers = dict(self.headers, Range=f"bytes={offset}-{min(offset + piece, size) - 1}")
+                if etag:
+                    headers["If-Range"] = etag
+                response = await self.recorder.timed("download.range", client.get(url, headers=headers), 206)
+                if response is None:
+                    break
+                etag = response.headers.get("ETag")
+                offset += piece
+
+    async def scenario_browse(self, client: httpx.AsyncClient, deadline: float):
+        while time.perf_counter() < deadline:
+            params = {"folder_id": self.rng.choice(self.folders)}
+            response = await self.recorder.timed(
+                "browse.list", client.get("/api/files", params=params, headers=self.headers), 200
+            )
+            if response is None:
+                continue
+            thumbs = [item["urls"]["thumbnail"] for item in response.json()["data"]["items"]
+                      if item.get("urls", {}).get("thumbnail")]
+            # The grid loads visible thumbnails in parallel (browser: ~6 per host)
+            for i in range(0, len(thumbs), 6):
+                await asyncio.gather(*(
+                    self.recorder.timed("browse.thumbnail", client.get(url), 200) for url in thumbs[i:i + 6]
+                ))
+
+    async def scenario_login(self, client: httpx.AsyncClient, deadline: float):
+        while time.perf_counter() < deadline:
+            await self.recorder.timed("login", self.login(client), 200)
+
+    # ============ Run ============
+
+    async def scrape_metrics(self, client: httpx.AsyncClient) -> Dict[str, float]:
+        try:
+            response = await client.get("/metrics", headers=self.headers)
+        except httpx.HTTPError:
+            return {}
+        if response.status_code != 200:
+            return {}  # Not the admin account
+        values = {}
+        for line in response.text.splitlines():
+            if line and not line.startswith("#"):
+                series, _, value = line.rpartition(" ")
+                try:
+                    values[series] = float(value)
+                except ValueError:
+                    pass
+        return values
+
+    def metrics_delta(self, before: Dict[str, float], after: Dict[str, float]) -> dict:
+        delta = {}
+        for name, (sum_series, count_series) in WATCHED_METRICS.items():
+            total = after.get(sum_series, 0.0) - before.get(sum_series, 0.0)
+            count = after.get(count_series, 0.0) - before.get(count_series, 0.0)
+            delta[name] = {
+                "count": int(count),
+                "total_seconds": round(total, 4),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0
+            }
+        blocked = "event_loop_blocked_total"
+        delta["event_loop_blocked"] = int(after.get(blocked, 0.0) - before.get(blocked, 0.0))
+        return delta
+
+    async def run(self) -> dict:
+        users = parse_users(self.args.users)
+        limits = httpx.Limits(max_connections=sum(users.values()) * 6 + 8)
+        async with httpx.AsyncClient(base_url=self.args.url, timeout=self.args.timeout, limits=limits) as client:
+            await self.setup(client)
+            try:
+                before = await self.scrape_metrics(client)
+                start = time.perf_counter()
+                deadline = start + self.args.duration
+                tasks = []
+                for scenario, count in users.items():
+                    fn = getattr(self, f"scenario_{scenario}")
+                    tasks.extend(asyncio.ensure_future(fn(client, deadline)) for _ in range(count))
+                await asyncio.gather(*tasks)
+                duration = time.perf_counter() - start
+                after = await self.scrape_metrics(client)
+            finally:
+                if not self.args.keep:
+                    await self.teardown(client)
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "url": self.args.url,
+                "duration_seconds": round(duration, 2),
+                "users": users
+            },
+            "operations": self.recorder.report(duration),
+            "server": self.metrics_delta(before, after) if before else None
+        }
+
+
+def parse_users(value: str) -> Dict[str, int]:
+    users = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, count = part.partition("=")
+        name = name.strip()
+        if not hasattr(LoadTest, f"scenario_{name}"):
+            raise SystemExit(f"Unknown scenario: {name}")
+        users[name] = int(count or 1)
+    return users
+
+
+def print_report(report: dict):
+    print(f"{'operation':<18} {'ok':>7} {'err %':>7} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+          file=sys.stderr)
+    for op, stats in report["operations"].items():
+        print(f"{op:<18} {stats['count']:>7} {stats['error_rate'] * 100:>6.1f}% {stats['throughput_per_sec']:>8.1f}"
+              f" {stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}",
+              file=sys.stderr)
+    server = report.get("server")
+    if server:
+        for name, value in server.items():
+            if isinstance(value, dict):
+                print(f"server {name:<18} n={value['count']:<8} total {value['total_seconds']:.3f}s"
+                      f"  mean {value['mean_ms']:.3f} ms", file=sys.stderr)
+        print(f"server event_loop_blocked  {server['event_loop_blocked']} (LOOP_BLOCK_DEBUG only)", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CloudDrive concurrent load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--users", default=DEFAULT_USERS, help="Virtual users per scenario, e.g. " + DEFAULT_USERS)
+    parser.add_argument("--upload-size", type=int, default=12 * 1024 * 1024, help="Bytes per chunked upload")
+    parser.add_argument("--blob-size", type=int, default=32 * 1024 * 1024, help="Size of the file downloaded")
+    parser.add_argument("--range-size", type=int, default=1024 * 1024, help="Bytes per Range request")
+    parser.add_argument("--folders", type=int, default=4, help="Subfolders to browse")
+    parser.add_argument("--images", type=int, default=12, help="Photos per folder")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--keep", action="store_true", help="Leave the test folder in place")
+    parser.add_argument("--output", default=None, help="Write the JSON report here (default stdout)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Benchmark the API in-process against synthetic libraries.
+
+    cd backend
+    python -m benchmarks.run --sizes 10k,100k --shapes wide,deep \
+        --output bench.json --baseline benchmarks/baseline.json
+
+Each dataset is generated into a scratch workspace (real data is never
+touched) and every scenario is timed through the full ASGI stack with
+Starlette's TestClient. Results are written as JSON; with --baseline the
+run is compared scenario by scenario and regressions are listed (and fail
+the run with --fail-on-regression).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from .workspace import isolate, cleanup
+
+
+SIZE_SUFFIXES = {"k": 1000, "m": 1000 * 1000}
+
+# Changes smaller than this are noise whatever the ratio
+NOISE_FLOOR_MS = 0.2
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float], errors: int) -> dict:
+    """Latency stats in milliseconds plus sequential throughput"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "ops_per_sec": round(len(ordered) / total, 2) if total else 0.0
+    }
+
+
+def measure(fn, ctx, iterations: int, warmup: int) -> dict:
+    """Run a scenario: warmup calls are not recorded, failures are counted"""
+    for _ in range(warmup):
+        try:
+            fn(ctx)
+        except Exception:
+            pass
+
+    samples, errors, last_error = [], 0, None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            fn(ctx)
+        except Exception as e:
+            errors += 1
+            last_error = str(e)
+            continue
+        samples.append(time.perf_counter() - start)
+
+    result = summarize(samples, errors)
+    if last_error:
+        result["last_error"] = last_error
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, cwd=Path(__file__).parent
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args) -> dict:
+    root = isolate(args.workspace)
+
+    # Imported after isolate(): these modules bind the data paths at import
+    from app import config
+    if not args.verbose:
+        config.SLOW_REQUEST_THRESHOLD = float("inf")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.file_service import FILES_FILE, load_files_data
+    from .synthetic import generate_library, clear_blobs
+    from .scenarios import SCENARIOS, Context
+
+    selected = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (have {', '.join(SCENARIOS)})")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "write_iterations": args.write_iterations
+        },
+        "datasets": {}
+    }
+
+    try:
+        with TestClient(app) as client:
+            login = client.post("/api/auth/login", json={"username": args.username, "password": args.password})
+            if login.status_code != 200:
+                raise SystemExit(f"Login failed: {login.status_code} {login.text}")
+            headers = {"Authorization": f"Bearer {login.json()['data']['token']}"}
+
+            for size in args.sizes:
+                for shape in args.shapes:
+                    name = f"{size}-{shape}"
+                    print(f"== {name}: generating", file=sys.stderr)
+                    clear_blobs()
+                    start = time.perf_counter()
+                    library = generate_library(
+                        parse_size(size), shape, seed=args.seed,
+                        blob_count=args.blobs, blob_size=args.blob_size
+                    )
+                    generate_seconds = time.perf_counter() - start
+
+                    # First load after a write parses files.json from disk
+                    start = time.perf_counter()
+                    load_files_data()
+                    cold_load_seconds = time.perf_counter() - start
+
+                    ctx = Context(client, headers, library, seed=args.seed)
+                    results = {}
+                    for scenario in selected:
+                        fn, writes = SCENARIOS[scenario]
+                        iterations = args.write_iterations if writes else args.iterations
+                        results[scenario] = measure(fn, ctx, iterations, args.warmup)
+                        stats = results[scenario]
+                        print(f"   {scenario:<22} p50 {stats['p50_ms']:>9.2f} ms  p99 {stats['p99_ms']:>9.2f} ms"
+                              f"  {stats['ops_per_sec']:>8.1f} op/s  errors {stats['errors']}", file=sys.stderr)
+
+                    report["datasets"][name] = {
+                        "records": library.count,
+                        "shape": shape,
+                        "files_json_bytes": FILES_FILE.stat().st_size,
+                        "generate_seconds": round(generate_seconds, 3),
+                        "cold_load_ms": round(cold_load_seconds * 1000, 3),
+                        "scenarios": results
+                    }
+    finally:
+        if not args.keep_workspace:
+            cleanup(root)
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[dict]:
+    """Per-scenario p50/p90 change against a baseline; flags regressions"""
+    rows = []
+    for dataset, current in report["datasets"].items():
+        previous = baseline.get("datasets", {}).get(dataset)
+        if previous is None:
+            continue
+        for scenario, stats in current["scenarios"].items():
+            before = previous["scenarios"].get(scenario)
+            if before is None:
+                continue
+            row = {"dataset": dataset, "scenario": scenario, "regression": False}
+            for key in ("p50_ms", "p90_ms"):
+                old, new = before[key], stats[key]
+                change = (new - old) / old if old else 0.0
+                row[key] = {"baseline": old, "current": new, "change": round(change, 4)}
+                if change > threshold and new - old > NOISE_FLOOR_MS:
+                    row["regression"] = True
+            rows.append(row)
+    return rows
+
+
+def print_comparison(rows: List[dict]):
+    print(f"{'dataset':<14} {'scenario':<22} {'p50 base':>9} {'p50 now':>9} {'change':>8}"
+          f" {'p90 base':>9} {'p90 now':>9} {'change':>8}", file=sys.stderr)
+    for row in rows:
+        cells = []
+        for key in ("p50_ms", "p90_ms"):
+            stat = row[key]
+            cells.append(f"{stat['baseline']:>9.2f} {stat['current']:>9.2f} {stat['change'] * 100:>7.1f}%")
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['dataset']:<14} {row['scenario']:<22} {' '.join(cells)}{flag}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CloudDrive in-process benchmarks")
+    parser.add_argument("--sizes", default="10k", help="Comma-separated record counts, e.g. 10k,100k,1m")
+    parser.add_argument("--shapes", default="wide,deep", help="Comma-separated tree shapes: wide, deep")
+    parser.add_argument("--scenarios", default=None, help="Comma-separated subset of scenarios (default all)")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per read scenario")
+    parser.add_argument("--write-iterations", type=int, default=10, help="Timed calls per write scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed calls before each scenario")
+    parser.add_argument("--blobs", type=int, default=8, help="Files with real bytes (download scenarios)")
+    parser.add_argument("--blob-size", type=int, default=4 * 1024 * 1024, help="Bytes per blob")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the JSON report here (default stdout)")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON report")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite --baseline with this run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Regression threshold as a fraction (0.15 = 15%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 when a regression is found")
+    parser.add_argument("--workspace", default=None, help="Scratch directory (default: a new temp dir)")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's slow-request log on")
+    args = parser.parse_args(argv)
+    args.sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    args.shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+
+    # The app prints (startup banner, logs); keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    regressions = []
+    if args.baseline and Path(args.baseline).exists() and not args.update_baseline:
+        with open(args.baseline) as f:
+            rows = compare(report, json.load(f), args.threshold)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        print_comparison(rows)
+        regressions = [row for row in rows if row["regression"]]
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    if args.baseline and args.update_baseline:
+        Path(args.baseline).write_text(text)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
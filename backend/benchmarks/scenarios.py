@@ -0,0 +1,179 @@
+import io
+import random
+from typing import Callable, Dict, List
+
+from .synthetic import Library, WORDS
+
+
+class Context:
+    """State shared by scenarios for one dataset"""
+
+    def __init__(self, client, headers: dict, library: Library, seed: int = 7):
+        self.client = client
+        self.headers = headers
+        self.library = library
+        self.rng = random.Random(seed)
+        self.live_files = [
+            r for r in library.records
+            if not r["is_folder"] and not r["is_deleted"] and r not in library.blobs
+        ]
+        self.images: List[dict] = []
+
+    def pick_file(self) -> dict:
+        return self.rng.choice(self.live_files)
+
+
+def _check(response, *expected: int):
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} -> {response.status_code}")
+    return response
+
+
+def _image_bytes(size=(1600, 1200)) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# ============ Read paths ============
+
+def list_root(ctx: Context):
+    _check(ctx.client.get("/api/files", headers=ctx.headers), 200)
+
+
+def list_largest_folder(ctx: Context):
+    _check(ctx.client.get("/api/files", params={"folder_id": ctx.library.largest_folder}, headers=ctx.headers), 200)
+
+
+def list_sorted_by_size(ctx: Context):
+    params = {"folder_id": ctx.library.largest_folder, "sort": "size", "order": "desc"}
+    _check(ctx.client.get("/api/files", params=params, headers=ctx.headers), 200)
+
+
+def breadcrumb_deepest(ctx: Context):
+    _check(ctx.client.get("/api/files", params={"folder_id": ctx.library.deepest_folder}, headers=ctx.headers), 200)
+
+
+def search_name(ctx: Context):
+    _check(ctx.client.get("/api/files", params={"search": ctx.rng.choice(WORDS)}, headers=ctx.headers), 200)
+
+
+def storage_stats(ctx: Context):
+    _check(ctx.client.get("/api/storage/quota", headers=ctx.headers), 200)
+
+
+def storage_analysis(ctx: Context):
+    _check(ctx.client.get("/api/storage/analysis", headers=ctx.headers), 200)
+
+
+def folder_usage(ctx: Context):
+    _check(ctx.client.get("/api/storage/analysis/folder", params={"folder_id": ctx.library.largest_folder}, headers=ctx.headers), 200)
+
+
+def file_info(ctx: Context):
+    _check(ctx.client.get(f"/api/files/{ctx.pick_file()['id']}", headers=ctx.headers), 200)
+
+
+def download_full(ctx: Context):
+    blob = ctx.rng.choice(ctx.library.blobs)
+    _check(ctx.client.get(f"/api/files/{blob['id']}/download", headers=ctx.headers), 200)
+
+
+def download_range(ctx: Context):
+    """256KB at a random offset, like a resumed download or video seek"""
+    blob = ctx.rng.choice(ctx.library.blobs)
+    start = ctx.rng.randrange(max(blob["file_size"] - 256 * 1024, 1))
+    headers = dict(ctx.headers, Range=f"bytes={start}-{start + 256 * 1024 - 1}")
+    _check(ctx.client.get(f"/api/files/{blob['id']}/download", headers=headers), 206)
+
+
+def thumbnail_fetch(ctx: Context):
+    if not ctx.images:
+        upload_image(ctx)
+    image = ctx.rng.choice(ctx.images)
+    _check(ctx.client.get(image["urls"]["thumbnail"]), 200)
+
+
+# ============ Write paths ============
+
+def mutation_favorite(ctx: Context):
+    _check(ctx.client.post(f"/api/files/{ctx.pick_file()['id']}/favorite", headers=ctx.headers), 200)
+
+
+def mutation_rename(ctx: Context):
+    record = ctx.pick_file()
+    new_name = f"renamed-{ctx.rng.getrandbits(32):08x}-{record['original_filename']}"
+    _check(ctx.client.put(f"/api/files/{record['id']}/rename", json={"new_name": new_name}, headers=ctx.headers), 200)
+
+
+def mutation_move(ctx: Context):
+    record = ctx.pick_file()
+    body = {"destination_folder_id": ctx.rng.choice(ctx.library.folders)}
+    _check(ctx.client.put(f"/api/files/{record['id']}/move", json=body, headers=ctx.headers), 200)
+
+
+def upload_simple(ctx: Context, size: int = 256 * 1024):
+    files = {"file": (f"simple-{ctx.rng.getrandbits(32):08x}.bin", bytes(size), "application/octet-stream")}
+    _check(ctx.client.post("/api/files/upload", files=files, data={"conflict": "rename"}, headers=ctx.headers), 200)
+
+
+def upload_chunked(ctx: Context, size: int = 6 * 1024 * 1024):
+    from app.config import CHUNK_SIZE
+
+    total = -(-size // CHUNK_SIZE)
+    init = _check(ctx.client.post("/api/files/upload/init", json={
+        "filename": f"chunked-{ctx.rng.getrandbits(32):08x}.bin",
+        "file_size": size,
+        "total_chunks": total,
+        "conflict": "rename"
+    }, headers=ctx.headers), 200).json()["data"]
+    chunk = bytes(CHUNK_SIZE)
+    for index in range(total):
+        _check(ctx.client.post(
+            f"/api/files/upload/chunk/{init['upload_id']}",
+            data={"chunk_index": str(index)},
+            files={"chunk": ("chunk", chunk[:min(CHUNK_SIZE, size - index * CHUNK_SIZE)], "application/octet-stream")},
+            headers=ctx.headers
+        ), 200)
+    _check(ctx.client.post(f"/api/files/upload/complete/{init['upload_id']}", headers=ctx.headers), 200)
+
+
+def upload_image(ctx: Context):
+    """Upload of a 1600x1200 JPEG, dominated by thumbnail generation"""
+    if not hasattr(ctx, "image_bytes"):
+        ctx.image_bytes = _image_bytes()
+    files = {"file": (f"photo-{ctx.rng.getrandbits(32):08x}.jpg", ctx.image_bytes, "image/jpeg")}
+    record = _check(ctx.client.post("/api/files/upload", files=files, headers=ctx.headers), 200).json()["data"]
+    info = _check(ctx.client.get(f"/api/files/{record['id']}", headers=ctx.headers), 200).json()["data"]
+    if "thumbnail" in info.get("urls", {}):
+        ctx.images.append(info)
+
+
+# name -> (function, writes). Write scenarios rewrite files.json per call and
+# run fewer iterations.
+SCENARIOS: Dict[str, tuple] = {
+    "list_root": (list_root, False),
+    "list_largest_folder": (list_largest_folder, False),
+    "list_sorted_by_size": (list_sorted_by_size, False),
+    "breadcrumb_deepest": (breadcrumb_deepest, False),
+    "search_name": (search_name, False),
+    "storage_stats": (storage_stats, False),
+    "storage_analysis": (storage_analysis, False),
+    "folder_usage": (folder_usage, False),
+    "file_info": (file_info, False),
+    "download_full": (download_full, False),
+    "download_range": (download_range, False),
+    "thumbnail_fetch": (thumbnail_fetch, False),
+    "mutation_favorite": (mutation_favorite, True),
+    "mutation_rename": (mutation_rename, True),
+    "mutation_move": (mutation_move, True),
+    "upload_simple": (upload_simple, True),
+    "upload_chunked": (upload_chunked, True),
+    "upload_image": (upload_image, True),
+}
+
+
+def get_scenario(name: str) -> Callable:
+    return SCENARIOS[name][0]
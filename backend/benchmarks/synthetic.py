@@ -0,0 +1,142 @@
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from app.services.file_service import FILES_STORE, FILE_TYPE_EXTENSIONS, get_file_type, get_mime_type
+
+
+# Extensions drawn for synthetic files (weighted towards common types)
+EXTENSIONS = (
+    ["jpg"] * 6 + ["png"] * 3 + ["pdf"] * 4 + ["docx"] * 2 + ["txt"] * 2 + ["mp4"] * 2
+    + ["mp3"] * 2 + ["zip", "xlsx", "csv", "md"] + list(FILE_TYPE_EXTENSIONS["code"][:6]) + ["bin", "dat"]
+)
+WORDS = (
+    "report invoice holiday photo backup draft final scan notes project budget meeting "
+    "summary archive export family design contract receipt chapter lecture"
+).split()
+
+SHAPES = ("wide", "deep")
+
+
+class Library:
+    """What was generated, for scenarios to pick targets from"""
+
+    def __init__(self):
+        self.count = 0
+        self.records: List[dict] = []
+        self.folders: List[str] = []
+        self.largest_folder: Optional[str] = None
+        self.deepest_folder: Optional[str] = None
+        self.blobs: List[dict] = []
+
+
+def _record(rng: random.Random, name: str, parent_id: Optional[str], is_folder: bool, when: datetime) -> dict:
+    file_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    ext = name.rsplit(".", 1)[-1] if "." in name else ""
+    stored = f"{file_id}.{ext}" if ext else file_id
+    stamp = when.isoformat()
+    deleted = not is_folder and rng.random() < 0.05
+    return {
+        "id": file_id,
+        "filename": stored,
+        "original_filename": name,
+        "file_path": None if is_folder else f"files/{stored}",
+        "file_size": 0 if is_folder else int(rng.paretovariate(1.2) * 20000),
+        "file_type": "folder" if is_folder else get_file_type(name),
+        "mime_type": None if is_folder else get_mime_type(name),
+        "thumbnail_path": None,
+        "parent_folder_id": parent_id,
+        "is_folder": is_folder,
+        "is_favorite": rng.random() < 0.02,
+        "is_deleted": deleted,
+        "created_at": stamp,
+        "modified_at": stamp,
+        "deleted_at": stamp if deleted else None
+    }
+
+
+def _file_name(rng: random.Random, index: int) -> str:
+    return f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{index}.{rng.choice(EXTENSIONS)}"
+
+
+def generate_library(
+    count: int,
+    shape: str = "wide",
+    seed: int = 42,
+    blob_count: int = 8,
+    blob_size: int = 4 * 1024 * 1024
+) -> Library:
+    """Write a synthetic files.json (and a few real blobs) into the app's data dir.
+
+    wide: 20 top-level folders of 10 subfolders each, files spread across
+    them with a heavy first folder. deep: a single chain 50 folders deep
+    with files at every level. Only blob_count files get bytes on disk;
+    the rest are metadata-only, which is all listing/search/stats read.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"shape must be one of {SHAPES}")
+
+    from app.config import FILES_DIR
+
+    rng = random.Random(seed)
+    base = datetime(2023, 1, 1)
+    span_seconds = 3 * 365 * 24 * 3600
+    library = Library()
+    records = library.records
+
+    def when() -> datetime:
+        return base + timedelta(seconds=rng.randrange(span_seconds))
+
+    if shape == "wide":
+        for i in range(20):
+            top = _record(rng, f"folder-{i:02d}", None, True, when())
+            records.append(top)
+            library.folders.append(top["id"])
+            for j in range(10):
+                sub = _record(rng, f"sub-{i:02d}-{j}", top["id"], True, when())
+                records.append(sub)
+                library.folders.append(sub["id"])
+        library.largest_folder = library.folders[0]
+        library.deepest_folder = library.folders[1]
+        # Half the files land in the first folder, the rest spread out
+        parents = [library.folders[0]] * len(library.folders) + library.folders + [None]
+    else:
+        parent = None
+        for depth in range(50):
+            folder = _record(rng, f"level-{depth:02d}", parent, True, when())
+            records.append(folder)
+            library.folders.append(folder["id"])
+            parent = folder["id"]
+        library.largest_folder = library.folders[-1]
+        library.deepest_folder = library.folders[-1]
+        parents = library.folders + [None]
+
+    # Real blobs for download/range scenarios, live in the root folder
+    for i in range(blob_count):
+        record = _record(rng, f"blob-{i}.bin", None, False, when())
+        record.update(file_size=blob_size, is_deleted=False, deleted_at=None)
+        with open(FILES_DIR / record["filename"], "wb") as f:
+            f.write(os.urandom(blob_size))
+        records.append(record)
+        library.blobs.append(record)
+
+    for i in range(max(count - len(records), 0)):
+        records.append(_record(rng, _file_name(rng, i), rng.choice(parents), False, when()))
+
+    library.count = len(records)
+    with FILES_STORE.lock:
+        FILES_STORE.save({"files": records, "next_id": 1, "seq": 0, "changes": []})
+    return library
+
+
+def clear_blobs():
+    """Remove blobs, thumbnails and chunk sessions left by the previous dataset"""
+    from app.config import FILES_DIR, THUMBNAILS_DIR, CHUNKS_DIR
+    import shutil
+
+    for directory in (FILES_DIR, THUMBNAILS_DIR, CHUNKS_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,34 @@
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def isolate(root: Path = None) -> Path:
+    """Point the app's data and storage directories at a scratch workspace.
+
+    Must run before anything imports app.main (modules copy the paths from
+    app.config at import time), so a benchmark never touches real data.
+    """
+    if "app.main" in sys.modules:
+        raise RuntimeError("isolate() must be called before the app is imported")
+
+    root = Path(root or tempfile.mkdtemp(prefix="clouddrive-bench-"))
+
+    from app import config
+    config.DATA_DIR = root / "data"
+    config.INDEX_DIR = config.DATA_DIR / "index"
+    config.PROFILES_DIR = config.DATA_DIR / "profiles"
+    config.STORAGE_DIR = root / "storage"
+    config.FILES_DIR = config.STORAGE_DIR / "files"
+    config.THUMBNAILS_DIR = config.STORAGE_DIR / "thumbnails"
+    config.CHUNKS_DIR = config.STORAGE_DIR / "chunks"
+    config.FSCK_DIR = config.DATA_DIR / "fsck"
+    config.QUARANTINE_DIR = config.STORAGE_DIR / "quarantine"
+    for path in (config.INDEX_DIR, config.FILES_DIR, config.THUMBNAILS_DIR, config.CHUNKS_DIR):
+        path.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def cleanup(root: Path):
+    shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.workspace import isolate, cleanup
+
+# Before anything imports the app: tests run against a scratch workspace
+WORKSPACE = isolate()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    cleanup(WORKSPACE)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def headers(client):
+    from app.config import DEFAULT_ADMIN
+
+    login = client.post("/api/auth/login", json={
+        "username": DEFAULT_ADMIN["username"],
+        "password": DEFAULT_ADMIN["password"]
+    })
+    assert login.status_code == 200, login.text
+    return {"Authorization": f"Bearer {login.json()['data']['token']}"}
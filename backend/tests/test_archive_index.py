@@ -0,0 +1,47 @@
+import json
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import FILES_DIR, INDEX_DIR
+from app.services import archive_service
+from app.services.archive_service import load_archive_index, list_archive_entries
+
+
+def make_zip(members: int = 200) -> dict:
+    file_id = str(uuid.uuid4())
+    with zipfile.ZipFile(FILES_DIR / f"{file_id}.zip", "w") as archive:
+        for i in range(members):
+            archive.writestr(f"dir/member-{i}.txt", f"member {i}\n" * 10)
+    return {"id": file_id, "file_path": f"files/{file_id}.zip", "original_filename": "test.zip"}
+
+
+def test_concurrent_builds_of_one_index():
+    record = make_zip()
+    archive_service._index_cache.clear()
+
+    def build(_):
+        archive_service._index_cache.pop(record["id"], None)  # Force every call to the sidecar path
+        return load_archive_index(record)
+
+    with ThreadPoolExecutor(8) as pool:
+        indexes = list(pool.map(build, range(32)))
+
+    assert all(len(index["entries"]) == 200 for index in indexes)
+    with open(INDEX_DIR / f"{record['id']}.archive.json") as f:
+        assert len(json.load(f)["entries"]) == 200
+    assert not list(INDEX_DIR.glob(f"{record['id']}.*.tmp"))
+
+
+def test_failed_sidecar_write_still_serves_the_listing(monkeypatch):
+    record = make_zip(3)
+    archive_service._index_cache.clear()
+
+    def refuse(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archive_service.os, "replace", refuse)
+    index = load_archive_index(record)
+
+    assert [e["path"] for e in list_archive_entries(index)] == [f"dir/member-{i}.txt" for i in range(3)]
+    assert not list(INDEX_DIR.glob(f"{record['id']}.*"))
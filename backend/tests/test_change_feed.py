@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+
+from app.services import file_service
+from app.services.file_service import get_changes_since, get_current_seq
+
+
+# Listing ETags and the /changes feed, with the change log capped at a few
+# entries so rotation happens within a test.
+
+LOG_SIZE = 10
+
+
+@pytest.fixture(autouse=True)
+def small_change_log(monkeypatch):
+    monkeypatch.setattr(file_service, "CHANGE_LOG_SIZE", LOG_SIZE)
+
+
+def make_folder(client, headers, parent_id=None) -> str:
+    response = client.post("/api/files/folder", json={
+        "name": f"folder-{uuid.uuid4().hex[:8]}", "parent_id": parent_id
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["id"]
+
+
+def listing(client, headers, folder_id, etag=None):
+    request_headers = dict(headers, **({"If-None-Match": etag} if etag else {}))
+    return client.get("/api/files", params={"folder_id": folder_id}, headers=request_headers)
+
+
+def test_unrelated_changes_keep_listing_etag_after_log_rotation(client, headers):
+    watched = make_folder(client, headers)
+    elsewhere = make_folder(client, headers)
+    etag = listing(client, headers, watched).headers["ETag"]
+
+    for _ in range(LOG_SIZE * 2):
+        make_folder(client, headers, elsewhere)
+    assert listing(client, headers, watched, etag).status_code == 304
+
+
+def test_listing_etag_follows_children_and_subfolder_counts(client, headers):
+    watched = make_folder(client, headers)
+    sub = make_folder(client, headers, watched)
+    etag = listing(client, headers, watched).headers["ETag"]
+
+    # A new item in a subfolder changes the item count shown in the listing
+    make_folder(client, headers, sub)
+    response = listing(client, headers, watched, etag)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    assert client.put(f"/api/files/{sub}/rename", json={"new_name": "renamed"}, headers=headers).status_code == 200
+    assert listing(client, headers, watched, etag).status_code == 200
+
+
+def test_changes_since_within_log(client, headers):
+    since = get_current_seq()
+    folder_id = make_folder(client, headers)
+
+    feed = get_changes_since(since)
+    assert not feed["resync_required"]
+    assert [c["id"] for c in feed["changes"]] == [folder_id]
+    assert feed["changes"][0]["op"] == "create"
+    assert get_changes_since(feed["seq"])["changes"] == []
+
+
+def test_changes_since_rotated_cursor_requires_resync(client, headers):
+    since = get_current_seq()
+    parent = make_folder(client, headers)
+    for _ in range(LOG_SIZE + 1):
+        make_folder(client, headers, parent)
+
+    feed = get_changes_since(since)
+    assert feed["resync_required"]
+    assert feed["changes"] == []
+    # A cursor from the future (e.g. after a restore from backup) too
+    assert get_changes_since(feed["seq"] + 1)["resync_required"]
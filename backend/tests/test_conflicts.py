@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+
+
+def make_folder(client, headers) -> str:
+    response = client.post("/api/files/folder", json={"name": f"conflicts-{uuid.uuid4().hex[:8]}"}, headers=headers)
+    return response.json()["data"]["id"]
+
+
+def upload(client, headers, folder_id, name, content=b"data", conflict=None):
+    data = {"folder_id": folder_id}
+    if conflict:
+        data["conflict"] = conflict
+    return client.post("/api/files/upload", files={"file": (name, content)}, data=data, headers=headers)
+
+
+def names_in(client, headers, folder_id) -> list:
+    items = client.get("/api/files", params={"folder_id": folder_id}, headers=headers).json()["data"]["items"]
+    return sorted(f["original_filename"] for f in items)
+
+
+@pytest.fixture
+def folder(client, headers):
+    folder_id = make_folder(client, headers)
+    assert upload(client, headers, folder_id, "Report.txt").status_code == 200
+    return folder_id
+
+
+def test_rename_picks_a_free_name(client, headers, folder):
+    upload(client, headers, folder, "report (1).txt", conflict="rename")  # Taken, case-insensitively
+    response = upload(client, headers, folder, "REPORT.txt", conflict="rename")
+    assert response.json()["data"]["original_filename"] == "REPORT (2).txt"
+    assert names_in(client, headers, folder) == ["REPORT (2).txt", "Report.txt", "report (1).txt"]
+
+
+def test_replace_moves_the_existing_file_to_trash(client, headers, folder):
+    response = upload(client, headers, folder, "report.txt", b"new", conflict="replace")
+    assert response.status_code == 200
+    assert names_in(client, headers, folder) == ["report.txt"]
+    trash = client.get("/api/files/trash/list", headers=headers).json()["data"]
+    assert any(f["original_filename"] == "Report.txt" and f["parent_folder_id"] == folder for f in trash)
+
+
+def test_fail_and_skip_keep_the_existing_file(client, headers, folder):
+    assert upload(client, headers, folder, "report.TXT", conflict="fail").status_code == 409
+    skipped = upload(client, headers, folder, "report.txt", conflict="skip").json()
+    assert skipped["data"]["skipped"] and skipped["data"]["existing"]["original_filename"] == "Report.txt"
+    assert names_in(client, headers, folder) == ["Report.txt"]
+
+
+def test_no_policy_allows_duplicates_and_bad_policy_is_rejected(client, headers, folder):
+    assert upload(client, headers, folder, "Report.txt").status_code == 200
+    assert names_in(client, headers, folder) == ["Report.txt", "Report.txt"]
+    assert upload(client, headers, folder, "x.txt", conflict="overwrite").status_code == 400
+
+
+def test_exists_checks_names_in_one_call(client, headers, folder):
+    response = client.post("/api/files/exists", json={
+        "folder_id": folder, "names": ["REPORT.txt", "other.txt"]
+    }, headers=headers)
+    assert list(response.json()["data"]["existing"]) == ["REPORT.txt"]
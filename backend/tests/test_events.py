@@ -0,0 +1,36 @@
+import asyncio
+
+from app.services.event_service import EventBroker
+
+
+def change(seq: int) -> dict:
+    return {"seq": seq, "op": "create", "id": f"file-{seq}", "parents": [None], "record": None}
+
+
+def drain(sub) -> list:
+    frames = []
+    while not sub.queue.empty():
+        frames.append(sub.queue.get_nowait())
+    return frames
+
+
+def test_relay_forwards_other_workers_changes_once():
+    async def run():
+        broker = EventBroker()
+        sub = broker.subscribe()
+        broker.cursor = 0
+
+        broker.publish("file", change(2), [None])  # Saved by this worker
+        broker.relay({"seq": 3, "resync_required": False, "changes": [change(1), change(2), change(3)]})
+        await asyncio.sleep(0)
+
+        frames = drain(sub)
+        assert [f.count('"seq": 2') for f in frames] == [1, 0, 0]
+        assert ['"seq": 1' in f for f in frames] == [False, True, False]
+        assert broker.cursor == 3
+
+        broker.relay({"seq": 9, "resync_required": True, "changes": []})
+        await asyncio.sleep(0)
+        assert [f.split("\n")[0] for f in drain(sub)] == ["event: resync"]
+
+    asyncio.run(run())
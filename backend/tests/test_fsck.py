@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import FILES_DIR, THUMBNAILS_DIR, INDEX_DIR, FSCK_GRACE
+from app.services import fsck
+from app.services.file_service import FILES_STORE, create_file_record, get_file_by_id
+
+
+# Everything is created older than FSCK_GRACE, and assertions look only at
+# this test's own items: other tests share the workspace.
+
+OLD = time.time() - FSCK_GRACE - 60
+
+
+def old_file(path, content: bytes = b"data"):
+    path.write_bytes(content)
+    os.utime(path, (OLD, OLD))
+    return path.name
+
+
+def make_record(content: bytes = None, size: int = None, **fields) -> dict:
+    name = f"{uuid.uuid4().hex[:8]}.bin"
+    record = create_file_record(name, name, size if size is not None else len(content or b""))
+    if content is not None:
+        (FILES_DIR / record["filename"]).write_bytes(content)
+    stamp = (datetime.now() - timedelta(seconds=FSCK_GRACE + 60)).isoformat()
+    with FILES_STORE.lock:
+        data = FILES_STORE.load_for_update()
+        for f in data["files"]:
+            if f["id"] == record["id"]:
+                f.update(fields, created_at=stamp, modified_at=stamp)
+                record = f
+        FILES_STORE.save(data)
+    return record
+
+
+def found(report: dict, kind: str, key: str = "name") -> set:
+    return {item[key] for item in report["issues"][kind]}
+
+
+def test_scan_finds_and_repair_fixes_orphans():
+    orphan_blob = old_file(FILES_DIR / f"{uuid.uuid4()}.bin")
+    orphan_thumb = old_file(THUMBNAILS_DIR / f"{uuid.uuid4()}.jpg")
+    orphan_sidecar = old_file(INDEX_DIR / f"{uuid.uuid4()}.lines.json", b"{}")
+    recent_blob = FILES_DIR / f"{uuid.uuid4()}.bin"
+    recent_blob.write_bytes(b"uploading")
+    dead_thumb = make_record(b"image", thumbnail_path=f"thumbnails/{uuid.uuid4()}.jpg")
+    lost = make_record(size=10)
+
+    report = fsck.scan()
+    assert orphan_blob in found(report, "orphan_blob")
+    assert recent_blob.name not in found(report, "orphan_blob")  # Inside the grace period
+    assert orphan_thumb in found(report, "orphan_thumbnail")
+    assert orphan_sidecar in found(report, "orphan_sidecar")
+    assert dead_thumb["id"] in found(report, "missing_thumbnail", "id")
+    assert lost["id"] in found(report, "missing_blob", "id")
+
+    result = fsck.repair(report)
+    assert (fsck.QUARANTINE_DIR / report["id"] / orphan_blob).exists()
+    assert not (FILES_DIR / orphan_blob).exists()
+    assert not (THUMBNAILS_DIR / orphan_thumb).exists()
+    assert not (INDEX_DIR / orphan_sidecar).exists()
+    assert get_file_by_id(dead_thumb["id"])["thumbnail_path"] is None
+    assert result["missing_thumbnail"] >= 1
+
+    # Lost blobs are left for a human
+    assert lost["id"] in found(fsck.scan(), "missing_blob", "id")
+
+
+def test_verify_size_and_hash():
+    truncated = make_record(b"12345", size=10)
+    changed = make_record(b"original")
+
+    report = fsck.scan("size")
+    assert truncated["id"] in found(report, "size_mismatch", "id")
+
+    fsck.scan("hash")  # Records digests in the manifest
+    path = FILES_DIR / changed["filename"]
+    st = path.stat()
+    path.write_bytes(b"tampered")  # Same size, mtime put back
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    report = fsck.scan("hash")
+    assert changed["id"] in found(report, "corrupt", "id")
+    assert not list(fsck.FSCK_DIR.glob("digests.json.*"))
+
+
+def test_one_scan_at_a_time_across_processes():
+    held = fsck.try_lock_fsck()  # As another worker or the CLI would
+    assert held is not None
+    try:
+        assert not fsck.fsck_job.start("none", False)
+        assert fsck.main(["--verify", "none"]) == 2
+    finally:
+        fsck.unlock_fsck(held)
+
+    assert fsck.fsck_job.start("none", False)
+    fsck.fsck_job._thread.join(30)
+    assert fsck.fsck_job.status()["last_error"] is None
+
+
+def test_scan_rejects_unknown_verify_mode():
+    with pytest.raises(ValueError):
+        fsck.scan("bogus")
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services.http_cache import parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),  # End clamped to the file
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),  # Suffix longer than the file
+    ("bytes=5-5", (5, 5)),
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=5-2",  # Syntactically invalid: serve the full file, not 416
+    "bytes=-0",
+    "bytes=abc-",
+    "bytes=0-10,20-30",  # Multiple ranges are not supported
+    "bytes=--5",
+])
+def test_ignored_ranges(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-2000", 1000),
+    ("bytes=0-", 0),
+    ("bytes=-10", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(HTTPException) as error:
+        parse_range(header, size)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == f"bytes */{size}"
@@ -0,0 +1,82 @@
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import FILES_DIR, INDEX_DIR
+from app.services import text_service
+from app.services.text_service import load_line_index, read_lines, read_bytes
+
+
+def make_text(content: bytes) -> dict:
+    file_id = str(uuid.uuid4())
+    (FILES_DIR / f"{file_id}.txt").write_bytes(content)
+    return {"id": file_id, "file_path": f"files/{file_id}.txt", "original_filename": "test.txt"}
+
+
+def page_lines(record: dict, count: int = 3) -> list:
+    """Page through a file the way the viewer does, joining cut lines"""
+    lines = []
+    page = read_lines(record, 0, count)
+    cut = False
+    while True:
+        assert page["next_line"] is None or page["next_line"] == page["start_line"] + len(page["lines"]) - page["truncated"]
+        rest = page["lines"]
+        if cut:
+            lines[-1] += rest[0]
+            rest = rest[1:]
+        lines.extend(rest)
+        if page["next_line"] is None:
+            return lines
+        cut = page["truncated"]
+        page = read_lines(record, page["next_line"], count, page["next_offset"])
+
+
+def test_concurrent_builds_of_one_line_index():
+    record = make_text(b"line\n" * 100000)
+
+    def build(_):
+        text_service._index_cache.pop(record["id"], None)  # Force every call to the sidecar path
+        return load_line_index(record)
+
+    with ThreadPoolExecutor(8) as pool:
+        indexes = list(pool.map(build, range(32)))
+
+    assert all(index["total_lines"] == 100000 for index in indexes)
+    with open(INDEX_DIR / f"{record['id']}.lines.json") as f:
+        assert json.load(f)["total_lines"] == 100000
+    assert not list(INDEX_DIR.glob(f"{record['id']}.*.tmp"))
+
+
+def test_line_longer_than_window_is_continued(monkeypatch):
+    monkeypatch.setattr(text_service, "MAX_WINDOW_BYTES", 10)
+    expected = ["short", "é" * 12 + "x", "", "tail"]
+    record = make_text("\n".join(expected).encode("utf-8") + b"\n")
+
+    first = read_lines(record, 0, 10)
+    assert first["lines"] == ["short", "é" * 2]  # Cut at a whole character
+    assert first["truncated"] and first["next_line"] == 1
+
+    assert page_lines(record) == expected
+
+
+def test_lines_without_trailing_newline():
+    record = make_text(b"a\r\nb\r\nc")
+    assert page_lines(record, 2) == ["a", "b", "c"]
+    assert read_lines(record, -1)["lines"] == ["c"]
+
+
+def test_utf16_is_paged_by_bytes(monkeypatch):
+    text = "first line\nsecond ✓ line\n" * 50
+    for encoding in ("utf-16-le", "utf-16-be"):
+        bom = b"\xff\xfe" if encoding.endswith("le") else b"\xfe\xff"
+        record = make_text(bom + text.encode(encoding))
+
+        page = read_lines(record)
+        assert not page["is_binary"] and not page["line_paging"] and page["lines"] == []
+
+        chunks, offset = [], 0
+        while offset is not None:
+            window = read_bytes(record, offset, 101)  # Odd length: windows end mid-character
+            chunks.append(window["text"])
+            offset = window["next_offset"]
+        assert "".join(chunks) == text
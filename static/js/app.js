@@ -36,6 +36,7 @@ import { loadFiles, loadFavorites, loadTrash, loadRecent, refreshCurrentView, se
 import { loadStorageInfo } from './modules/storage.js';
 import { setActiveNav } from './modules/utils.js';
 import { toggleViewMode } from './modules/render.js';
+import { connectEvents } from './modules/events.js';
 
 // Import side-effect modules (they register global functions)
 import './modules/preview.js';
@@ -50,6 +51,7 @@ document.addEventListener('DOMContentLoaded', () => {
         showDashboard();
         loadFiles(null);
         loadStorageInfo();
+        connectEvents();
     } else {
         showLogin();
     }
@@ -82,6 +84,7 @@ document.addEventListener('DOMContentLoaded', () => {
 window.addEventListener('auth:loggedIn', () => {
     loadFiles(null);
     loadStorageInfo();
+    connectEvents();
 });
 
 // Listen for view change events
@@ -17,8 +17,13 @@ export async function downloadFile(fileId) {
         const fileData = await fileRes.json();
         if (!fileData.success) throw new Error('File not found');
 
+        if (fileData.data.is_folder) {
+            saveFromUrl(fileData.data.urls.archive);
+            return;
+        }
+
         const filename = fileData.data.original_filename;
-        const res = await fetch(`${state.API_URL}/api/files/${fileId}/download`);
+        const res = await fetch(`${state.API_URL}${fileData.data.urls.download}`);
         if (!res.ok) throw new Error('Download failed');
 
         const blob = await res.blob();
@@ -43,6 +48,31 @@ export async function downloadFile(fileId) {
     }
 }
 
+// Let the browser save a signed URL directly (streamed responses are not buffered)
+function saveFromUrl(path) {
+    const a = document.createElement('a');
+    a.href = `${state.API_URL}${path}`;
+    a.download = '';
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+}
+
+// Download folder as ZIP (the route needs a signed URL, taken from the folder record)
+export async function downloadFolderArchive(folderId) {
+    try {
+        const res = await fetch(`${state.API_URL}/api/files/${folderId}`, {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+        if (!data.success) throw new Error('Folder not found');
+        saveFromUrl(data.data.urls.archive);
+    } catch (err) {
+        console.error('Download error:', err);
+        alert('Download failed');
+    }
+}
+
 // Download current file
 export function downloadCurrentFile() {
     if (state.currentFile) {
@@ -202,30 +232,26 @@ export async function renameFile(fileId, newName) {
 // Move File Logic
 let moveTargetFile = null;
 
-// Helper to fetch folders recursively
-// Helper to fetch folders recursively
-async function fetchAllFolders(parentId = null, level = 0, allFolders = []) {
+// Fetch the whole folder tree in one request and flatten it for the picker
+async function fetchAllFolders(excludeId = null) {
+    const allFolders = [];
     try {
-        const url = parentId
-            ? `${state.API_URL}/api/files?folder_id=${parentId}`
-            : `${state.API_URL}/api/files`; // Fetch root if no parentId
-
-        const res = await fetch(url, {
+        const res = await fetch(`${state.API_URL}/api/files/tree`, {
             headers: { 'Authorization': `Bearer ${state.token}` }
         });
         const data = await res.json();
 
         if (data.success) {
-            const folders = data.data.items.filter(f => f.is_folder);
-
-            for (const folder of folders) {
-                // Add to list with indentation
-                folder.displayName = '&nbsp;&nbsp;&nbsp;'.repeat(level) + '📁 ' + folder.original_filename;
-                allFolders.push(folder);
-
-                // Recursive call
-                await fetchAllFolders(folder.id, level + 1, allFolders);
-            }
+            const walk = (nodes, level) => {
+                for (const folder of nodes) {
+                    // Can't move a folder into itself or its own subfolders
+                    if (folder.id === excludeId) continue;
+                    folder.displayName = '\u00a0\u00a0\u00a0'.repeat(level) + '📁 ' + folder.name;
+                    allFolders.push(folder);
+                    if (folder.children) walk(folder.children, level + 1);
+                }
+            };
+            walk(data.data.folders, 0);
         }
     } catch (e) {
         console.error('Failed to fetch folders', e);
@@ -243,7 +269,7 @@ export async function openMoveDialog(fileId) {
     dialog.classList.remove('hidden');
 
     // Fetch all folders
-    const folders = await fetchAllFolders();
+    const folders = await fetchAllFolders(fileId);
 
     // Clear and populate
     select.innerHTML = '<option value="">Home (Root)</option>';
@@ -564,6 +590,7 @@ export function permanentDeleteContextFile() {
 
 // Make functions available globally
 window.downloadFile = downloadFile;
+window.downloadFolderArchive = downloadFolderArchive;
 window.downloadCurrentFile = downloadCurrentFile;
 window.deleteFile = deleteFile;
 window.deleteCurrentFile = deleteCurrentFile;
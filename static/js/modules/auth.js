@@ -3,6 +3,8 @@
  */
 
 import { state } from '../app.js';
+import { disconnectEvents } from './events.js';
+import { clearListingCache } from './cache.js';
 
 // Show login page
 export function showLogin() {
@@ -50,6 +52,8 @@ export async function handleLogin(e) {
 export function logout() {
     localStorage.removeItem('token');
     state.token = null;
+    disconnectEvents();
+    clearListingCache();
     showLogin();
 }
 
@@ -0,0 +1,102 @@
+/**
+ * CloudDrive - Listing Cache Module
+ * Listings are kept in memory and persisted to IndexedDB, so revisiting a
+ * view renders instantly while the server is asked (with ETag) in the background.
+ */
+
+const DB_NAME = 'clouddrive';
+const STORE = 'listings';
+// Bump when the key format changes: the upgrade drops entries under old keys
+const DB_VERSION = 2;
+const MAX_ENTRIES = 200;
+
+const memory = new Map();
+let dbPromise = null;
+
+function openDb() {
+    if (!('indexedDB' in window)) return Promise.resolve(null);
+    if (!dbPromise) {
+        dbPromise = new Promise(resolve => {
+            const req = indexedDB.open(DB_NAME, DB_VERSION);
+            req.onupgradeneeded = () => {
+                const db = req.result;
+                if (db.objectStoreNames.contains(STORE)) db.deleteObjectStore(STORE);
+                db.createObjectStore(STORE);
+            };
+            req.onsuccess = () => resolve(req.result);
+            req.onerror = () => resolve(null); // Private mode etc: memory only
+        });
+    }
+    return dbPromise;
+}
+
+function idbRequest(mode, fn) {
+    return openDb().then(db => new Promise(resolve => {
+        if (!db) return resolve(null);
+        try {
+            const req = fn(db.transaction(STORE, mode).objectStore(STORE));
+            req.onsuccess = () => resolve(req.result);
+            req.onerror = () => resolve(null);
+        } catch (err) {
+            resolve(null);
+        }
+    }));
+}
+
+// Cache key for a view (folder listing, favorites, trash, search...).
+// Listings are fetched in the server's default order; any other order
+// (e.g. Recent) is applied on the client, so sort is not part of the key.
+export function listingKey(view, id = null) {
+    return `${view}:${id || 'root'}`;
+}
+
+// Get a cached listing: { data, etag, savedAt } or null
+export async function getCachedListing(key) {
+    if (memory.has(key)) return memory.get(key);
+    const entry = await idbRequest('readonly', store => store.get(key));
+    if (entry) memory.set(key, entry);
+    return entry || null;
+}
+
+// Store a listing (etag may be null when the server sends none).
+// persist=false keeps it in memory only (e.g. one-off search results).
+export function setCachedListing(key, data, etag = null, persist = true) {
+    const entry = { data, etag, savedAt: Date.now() };
+    memory.delete(key);
+    memory.set(key, entry);
+    if (memory.size > MAX_ENTRIES) memory.delete(memory.keys().next().value);
+    if (persist) idbRequest('readwrite', store => store.put(entry, key));
+}
+
+// Merge updates into a cached listing and force a full fetch on next revalidation
+export function invalidateListing(key, updates = {}) {
+    const entry = memory.get(key);
+    if (entry) setCachedListing(key, { ...entry.data, ...updates }, null);
+}
+
+// Fetch a listing with If-None-Match from the cache entry.
+// Resolves to { data, etag, fresh } where fresh=false means 304 (cache still valid).
+export async function revalidateListing(key, url, headers) {
+    const cached = await getCachedListing(key);
+    const reqHeaders = { ...headers };
+    if (cached && cached.etag) reqHeaders['If-None-Match'] = cached.etag;
+
+    // no-store keeps the browser's HTTP cache out of the way so 304s reach us
+    const res = await fetch(url, { headers: reqHeaders, cache: 'no-store' });
+    if (res.status === 304 && cached) {
+        return { data: cached.data, etag: cached.etag, fresh: false };
+    }
+
+    const body = await res.json();
+    if (!body.success) return { data: null, etag: null, fresh: true };
+
+    const etag = res.headers.get('ETag');
+    setCachedListing(key, body.data, etag);
+    return { data: body.data, etag, fresh: true };
+}
+
+// Drop everything (logout: the cache holds private metadata)
+export function clearListingCache() {
+    memory.clear();
+    idbRequest('readwrite', store => store.clear());
+}
@@ -0,0 +1,48 @@
+/**
+ * CloudDrive - Live Events Module (Server-Sent Events)
+ */
+
+import { state } from '../app.js';
+import { patchCurrentFiles, syncChanges } from './files.js';
+
+let source = null;
+
+// Open the event stream; file changes are patched into the current listing
+export function connectEvents() {
+    disconnectEvents();
+    if (!state.token || !window.EventSource) return;
+
+    source = new EventSource(`${state.API_URL}/api/events?token=${encodeURIComponent(state.token)}`);
+
+    // (Re)connected: catch up on anything missed while disconnected
+    source.addEventListener('ready', (e) => {
+        const { seq } = JSON.parse(e.data);
+        if (state.currentView === 'files' && state.seq !== undefined && seq !== state.seq) {
+            syncChanges();
+        }
+    });
+
+    source.addEventListener('file', (e) => {
+        const change = JSON.parse(e.data);
+        if (state.currentView !== 'files' || state.seq === undefined) return;
+        if (change.seq <= state.seq) return; // Already applied
+        if (change.seq !== state.seq + 1 || !patchCurrentFiles([change], change.seq)) {
+            syncChanges(); // Gap in the sequence or a folder count changed
+        }
+    });
+
+    // Server dropped our backlog (we were too slow) - fall back to the change feed
+    source.addEventListener('resync', () => syncChanges());
+
+    source.addEventListener('upload_progress', (e) => {
+        window.dispatchEvent(new CustomEvent('upload:progress', { detail: JSON.parse(e.data) }));
+    });
+}
+
+// Close the event stream
+export function disconnectEvents() {
+    if (source) {
+        source.close();
+        source = null;
+    }
+}
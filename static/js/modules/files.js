@@ -4,6 +4,7 @@
 
 import { state } from '../app.js';
 import { renderFiles, renderBreadcrumb } from './render.js';
+import { listingKey, getCachedListing, setCachedListing, revalidateListing, invalidateListing } from './cache.js';
 
 // Update UI based on current view
 function updateViewUI() {
@@ -64,93 +65,131 @@ export function hideLoading() {
     document.getElementById('loading-state').classList.remove('flex');
 }
 
+// Bumped on every navigation so late responses for an old view are ignored
+let navigation = 0;
+
+// Render a listing from cache at once, then revalidate it in the background.
+// render(data) runs for the cached copy and again only if the server sent a newer one.
+async function loadListing(key, url, render) {
+    const current = ++navigation;
+    const isCurrent = () => current === navigation;
+
+    const cached = await getCachedListing(key);
+    if (!isCurrent()) return;
+    if (cached) {
+        hideLoading();
+        render(cached.data);
+    } else {
+        showLoading();
+    }
+
+    try {
+        const result = await revalidateListing(key, url, { 'Authorization': `Bearer ${state.token}` });
+        if (result.data && result.fresh && isCurrent()) render(result.data);
+    } catch (err) {
+        console.error('Error loading listing:', err);
+    }
+    if (isCurrent()) hideLoading();
+}
+
 // Load files from folder
 export async function loadFiles(folderId) {
     state.currentFolder = folderId;
     state.currentView = 'files';
     updateViewUI();
-    showLoading();
 
     const url = folderId ? `${state.API_URL}/api/files?folder_id=${folderId}` : `${state.API_URL}/api/files`;
 
-    try {
-        const res = await fetch(url, {
-            headers: { 'Authorization': `Bearer ${state.token}` }
-        });
-        const data = await res.json();
-
-        if (data.success) {
-            state.currentFiles = data.data.items; // Store in state for context menu actions
-            renderFiles(data.data.items);
-            renderBreadcrumb(data.data.breadcrumb);
-        }
-    } catch (err) {
-        console.error('Error loading files:', err);
-    }
-    hideLoading();
+    await loadListing(listingKey('files', folderId), url, data => {
+        state.currentFiles = data.items; // Store in state for context menu actions
+        state.seq = data.seq; // Change-feed cursor for syncChanges()
+        renderFiles(data.items);
+        renderBreadcrumb(data.breadcrumb);
+    });
 }
 
 // Load favorites
 export async function loadFavorites() {
     state.currentView = 'favorites';
     updateViewUI();
-    showLoading();
-    try {
-        const res = await fetch(`${state.API_URL}/api/files/favorites/list`, {
-            headers: { 'Authorization': `Bearer ${state.token}` }
-        });
-        const data = await res.json();
-        if (data.success) {
-            renderFiles(data.data);
-            document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">⭐ Favorites</span>';
-        }
-    } catch (err) {
-        console.error('Error:', err);
-    }
-    hideLoading();
+    await loadListing(listingKey('favorites'), `${state.API_URL}/api/files/favorites/list`, data => {
+        renderFiles(data);
+        document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">⭐ Favorites</span>';
+    });
 }
 
 // Load trash
 export async function loadTrash() {
     state.currentView = 'trash';
     updateViewUI();
-    showLoading();
-    try {
-        const res = await fetch(`${state.API_URL}/api/files/trash/list`, {
-            headers: { 'Authorization': `Bearer ${state.token}` }
-        });
-        const data = await res.json();
-        if (data.success) {
-            renderFiles(data.data, true);
-            document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">🗑️ Trash</span>';
-        }
-    } catch (err) {
-        console.error('Error:', err);
-    }
-    hideLoading();
+    await loadListing(listingKey('trash'), `${state.API_URL}/api/files/trash/list`, data => {
+        renderFiles(data, true);
+        document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">🗑️ Trash</span>';
+    });
 }
 
-// Load recent files
+// Load recent files (derived from the root listing, so it shares its cache entry)
 export async function loadRecent() {
     state.currentView = 'recent';
     updateViewUI();
-    showLoading();
+    await loadListing(listingKey('files'), `${state.API_URL}/api/files`, data => {
+        const sorted = data.items.filter(f => !f.is_folder).sort((a, b) =>
+            new Date(b.modified_at) - new Date(a.modified_at)
+        ).slice(0, 20);
+        renderFiles(sorted);
+        document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">🕒 Recent</span>';
+    });
+}
+
+// Patch state.currentFiles with change-feed deltas (from /changes or SSE).
+// Returns false when a full reload is needed instead: a visible folder's
+// item count changed and only the server can recount it.
+export function patchCurrentFiles(changes, seq) {
+    const folder = state.currentFolder || null;
+    const files = new Map(state.currentFiles.map(f => [f.id, f]));
+    const visibleFolders = new Set(state.currentFiles.filter(f => f.is_folder).map(f => f.id));
+
+    for (const change of changes) {
+        if (change.parents.some(p => visibleFolders.has(p))) {
+            return false;
+        }
+        const record = change.record;
+        if (!record || record.is_deleted || record.parent_folder_id !== folder) {
+            files.delete(change.id);
+        } else {
+            files.set(change.id, { ...files.get(change.id), ...record });
+        }
+    }
+
+    state.seq = Math.max(state.seq, seq);
+    state.currentFiles = Array.from(files.values()).sort((a, b) =>
+        a.original_filename.toLowerCase().localeCompare(b.original_filename.toLowerCase())
+    );
+    renderFiles(state.currentFiles);
+    // Keep the patched copy for instant display, but revalidate it in full next time
+    invalidateListing(listingKey('files', state.currentFolder), { items: state.currentFiles, seq: state.seq });
+    return true;
+}
+
+// Apply metadata deltas since the last listing instead of re-fetching it.
+// Falls back to a full reload when the cursor is too old.
+export async function syncChanges() {
+    if (state.currentView !== 'files' || state.seq === undefined) {
+        return loadFiles(state.currentFolder);
+    }
+
     try {
-        const res = await fetch(`${state.API_URL}/api/files`, {
+        const res = await fetch(`${state.API_URL}/api/files/changes?since=${state.seq}`, {
             headers: { 'Authorization': `Bearer ${state.token}` }
         });
         const data = await res.json();
-        if (data.success) {
-            const sorted = data.data.items.filter(f => !f.is_folder).sort((a, b) =>
-                new Date(b.modified_at) - new Date(a.modified_at)
-            ).slice(0, 20);
-            renderFiles(sorted);
-            document.getElementById('breadcrumb').innerHTML = '<span class="font-semibold text-slate-900 dark:text-white">🕒 Recent</span>';
+        if (!data.success || data.data.resync_required || !patchCurrentFiles(data.data.changes, data.data.seq)) {
+            return loadFiles(state.currentFolder);
         }
     } catch (err) {
-        console.error('Error:', err);
+        console.error('Error syncing changes:', err);
+        loadFiles(state.currentFolder);
     }
-    hideLoading();
 }
 
 // Refresh current view
@@ -159,6 +198,7 @@ export function refreshCurrentView() {
         case 'favorites': loadFavorites(); break;
         case 'trash': loadTrash(); break;
         case 'recent': loadRecent(); break;
+        case 'files': syncChanges(); break;
         default: loadFiles(state.currentFolder);
     }
 }
@@ -171,20 +211,41 @@ export async function searchFiles(query) {
     }
     state.currentView = 'search';
     updateViewUI();
-    showLoading();
+
+    const current = ++navigation;
+    const key = listingKey('search', query);
+    const show = items => {
+        state.currentFiles = items;
+        renderFiles(items);
+        document.getElementById('breadcrumb').innerHTML = `<span class="font-semibold text-slate-900 dark:text-white">🔍 Search: ${query}</span>`;
+    };
+
+    const cached = await getCachedListing(key);
+    if (current !== navigation) return;
+    if (cached) show(cached.data);
+    else showLoading();
+
     try {
-        const res = await fetch(`${state.API_URL}/api/files?search=${encodeURIComponent(query)}`, {
-            headers: { 'Authorization': `Bearer ${state.token}` }
-        });
-        const data = await res.json();
+        const headers = { 'Authorization': `Bearer ${state.token}` };
+        const q = encodeURIComponent(query);
+        // Name matches first, then ranked content matches not already listed
+        const [nameRes, contentRes] = await Promise.all([
+            fetch(`${state.API_URL}/api/files?search=${q}`, { headers }),
+            fetch(`${state.API_URL}/api/files?content=${q}`, { headers })
+        ]);
+        const data = await nameRes.json();
+        const contentData = await contentRes.json();
         if (data.success) {
-            renderFiles(data.data.items);
-            document.getElementById('breadcrumb').innerHTML = `<span class="font-semibold text-slate-900 dark:text-white">🔍 Search: ${query}</span>`;
+            const seen = new Set(data.data.items.map(f => f.id));
+            const contentItems = contentData.success ? contentData.data.items.filter(f => !seen.has(f.id)) : [];
+            const items = data.data.items.concat(contentItems);
+            setCachedListing(key, items, null, false);
+            if (current === navigation) show(items);
         }
     } catch (err) {
         console.error('Error:', err);
     }
-    hideLoading();
+    if (current === navigation) hideLoading();
 }
 
 // Make functions available globally for HTML onclick
@@ -193,4 +254,5 @@ window.loadFavorites = loadFavorites;
 window.loadTrash = loadTrash;
 window.loadRecent = loadRecent;
 window.refreshCurrentView = refreshCurrentView;
+window.syncChanges = syncChanges;
 window.searchFiles = searchFiles;
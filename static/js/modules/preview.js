@@ -3,7 +3,7 @@
  */
 
 import { state } from '../app.js';
-import { formatSize, formatDate, formatTime } from './utils.js';
+import { formatSize, formatDate, formatTime, escapeHtml } from './utils.js';
 import { getFileIcon } from './render.js';
 
 // Preview file based on type
@@ -39,7 +39,7 @@ export function showImagePreview(file) {
     const modal = document.getElementById('image-preview-modal');
     const img = document.getElementById('preview-image');
 
-    img.src = `${state.API_URL}/api/files/${file.id}/preview`;
+    img.src = `${state.API_URL}${file.urls.preview}`;
     img.alt = file.original_filename;
 
     document.getElementById('preview-filename').textContent = file.original_filename;
@@ -60,7 +60,7 @@ export function showImagePreview(file) {
     `;
     document.getElementById('preview-metadata').innerHTML = metaHtml;
     document.getElementById('preview-thumb-container').innerHTML =
-        `<img src="${state.API_URL}/api/files/${file.id}/preview" class="w-full h-full object-cover" alt="thumbnail"/>`;
+        `<img src="${state.API_URL}${file.urls.preview}" class="w-full h-full object-cover" alt="thumbnail"/>`;
 
     modal.classList.remove('hidden');
 }
@@ -70,7 +70,7 @@ export function showVideoPreview(file) {
     const modal = document.getElementById('video-preview-modal');
     const video = document.getElementById('preview-video');
 
-    video.src = `${state.API_URL}/api/files/${file.id}/preview`;
+    video.src = `${state.API_URL}${file.urls.preview}`;
     document.getElementById('video-filename').textContent = file.original_filename;
     document.getElementById('video-filepath').textContent = formatSize(file.file_size);
     document.getElementById('media-type-icon').textContent = 'movie';
@@ -85,7 +85,7 @@ export function showAudioPreview(file) {
     const modal = document.getElementById('video-preview-modal');
     const video = document.getElementById('preview-video');
 
-    video.src = `${state.API_URL}/api/files/${file.id}/preview`;
+    video.src = `${state.API_URL}${file.urls.preview}`;
     document.getElementById('video-filename').textContent = file.original_filename;
     document.getElementById('video-filepath').textContent = formatSize(file.file_size);
     document.getElementById('media-type-icon').textContent = 'music_note';
@@ -209,19 +209,22 @@ export function showDocPreview(file) {
     const ext = file.original_filename?.toLowerCase().split('.').pop() || '';
 
     if (ext === 'pdf') {
-        pdfViewer.src = `${state.API_URL}/api/files/${file.id}/preview`;
+        pdfViewer.src = `${state.API_URL}${file.urls.preview}`;
         pdfViewer.classList.remove('hidden');
     } else if (ext === 'docx') {
         docLoading.classList.remove('hidden');
-        loadDocxContent(file.id);
+        loadDocxContent(file);
     } else if (['pptx', 'ppsx', 'xlsx'].includes(ext)) {
         docFallback.classList.remove('hidden');
         document.getElementById('doc-fallback-message').innerHTML =
             `PowerPoint/Excel preview coming soon.<br>
              <span class="text-xs">Download to view with your preferred app.</span>`;
-    } else if (ext === 'txt' || ext === 'md') {
+    } else if (file.file_type === 'code' || TEXT_EXTENSIONS.includes(ext)) {
         docLoading.classList.remove('hidden');
         loadTextContent(file.id);
+    } else if (file.file_type === 'archive') {
+        docLoading.classList.remove('hidden');
+        loadArchiveEntries(file);
     } else {
         docFallback.classList.remove('hidden');
         document.getElementById('doc-fallback-message').textContent = 'Preview not available for this file type.';
@@ -231,13 +234,13 @@ export function showDocPreview(file) {
 }
 
 // Load DOCX content
-async function loadDocxContent(fileId) {
+async function loadDocxContent(file) {
     const docxViewer = document.getElementById('docx-viewer');
     const docLoading = document.getElementById('doc-loading');
     const docFallback = document.getElementById('doc-fallback');
 
     try {
-        const response = await fetch(`${state.API_URL}/api/files/${fileId}/preview`);
+        const response = await fetch(`${state.API_URL}${file.urls.preview}`);
         const arrayBuffer = await response.arrayBuffer();
         const result = await mammoth.convertToHtml({ arrayBuffer });
         docxViewer.innerHTML = result.value;
@@ -251,16 +254,81 @@ async function loadDocxContent(fileId) {
     }
 }
 
-// Load text content
+// Load text content page by page (server returns line windows, never the whole file)
+const TEXT_EXTENSIONS = ['txt', 'md', 'csv', 'log', 'tsv', 'ini', 'conf', 'cfg', 'toml'];
+const TEXT_PAGE_LINES = 500;
+const TEXT_PAGE_BYTES = 256 * 1024;
+let textViewer = null;
+
+async function fetchTextWindow(fileId, params) {
+    const query = new URLSearchParams(params).toString();
+    const res = await fetch(`${state.API_URL}/api/files/${fileId}/text?${query}`, {
+        headers: { 'Authorization': `Bearer ${state.token}` }
+    });
+    const data = await res.json();
+    if (!data.success) throw new Error(data.detail || 'Failed to load text');
+    return data.data;
+}
+
+// Append a window: line pages end each line with a newline unless the last
+// one was cut (its rest starts the next page); byte windows are raw text
+function appendTextPage(page) {
+    const text = page.lines ? page.lines.join('\n') + (page.truncated ? '' : '\n') : page.text;
+    textViewer.pre.insertAdjacentHTML('beforeend', escapeHtml(text));
+}
+
+// Where the next window starts: { line, resume } for line pages, { offset } for byte windows
+function nextTextWindow(page) {
+    if (page.lines) {
+        return page.next_line === null ? null : { line: page.next_line, resume: page.next_offset, count: TEXT_PAGE_LINES };
+    }
+    return page.next_offset === null ? null : { offset: page.next_offset, length: TEXT_PAGE_BYTES };
+}
+
+async function loadMoreText() {
+    if (!textViewer || textViewer.loading || textViewer.next === null) return;
+    const viewer = textViewer;
+    viewer.loading = true;
+    try {
+        const page = await fetchTextWindow(viewer.fileId, viewer.next);
+        if (viewer !== textViewer) return; // Modal closed or another file opened
+        appendTextPage(page);
+        viewer.next = nextTextWindow(page);
+    } catch (err) {
+        console.error('Error loading text:', err);
+    }
+    viewer.loading = false;
+}
+
 async function loadTextContent(fileId) {
     const docxViewer = document.getElementById('docx-viewer');
     const docLoading = document.getElementById('doc-loading');
+    const docFallback = document.getElementById('doc-fallback');
 
     try {
-        const response = await fetch(`${state.API_URL}/api/files/${fileId}/preview`);
-        const text = await response.text();
-        const escapeHtml = (t) => { const d = document.createElement('div'); d.textContent = t; return d.innerHTML; };
-        docxViewer.innerHTML = `<pre class="whitespace-pre-wrap font-mono text-sm">${escapeHtml(text)}</pre>`;
+        let page = await fetchTextWindow(fileId, { line: 0, count: TEXT_PAGE_LINES });
+        if (page.is_binary) {
+            docLoading.classList.add('hidden');
+            docFallback.classList.remove('hidden');
+            document.getElementById('doc-fallback-message').textContent = 'This file looks binary - download it to view.';
+            return;
+        }
+        if (!page.line_paging) {
+            // e.g. utf-16: the server can't split lines, page by bytes instead
+            page = await fetchTextWindow(fileId, { offset: 0, length: TEXT_PAGE_BYTES });
+        }
+
+        docxViewer.innerHTML = `<pre class="whitespace-pre-wrap font-mono text-sm"></pre>`;
+        textViewer = { fileId, next: nextTextWindow(page), loading: false, pre: docxViewer.querySelector('pre') };
+        appendTextPage(page);
+
+        // Fetch the next window when scrolled near the bottom
+        docxViewer.onscroll = () => {
+            if (docxViewer.scrollTop + docxViewer.clientHeight >= docxViewer.scrollHeight - 400) {
+                loadMoreText();
+            }
+        };
+
         docLoading.classList.add('hidden');
         docxViewer.classList.remove('hidden');
     } catch (err) {
@@ -269,6 +337,47 @@ async function loadTextContent(fileId) {
     }
 }
 
+// Load archive listing (server reads the zip/tar index, nothing is extracted)
+async function loadArchiveEntries(file) {
+    const docxViewer = document.getElementById('docx-viewer');
+    const docLoading = document.getElementById('doc-loading');
+    const docFallback = document.getElementById('doc-fallback');
+
+    try {
+        const res = await fetch(`${state.API_URL}/api/files/${file.id}/archive/entries`, {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+        if (!data.success) throw new Error(data.detail || 'Unsupported archive');
+
+        const rows = data.data.entries.map(e => {
+            const name = escapeHtml(e.path);
+            if (e.is_dir) {
+                return `<div class="flex items-center gap-2 py-1 text-slate-500">
+                    <span class="material-symbols-outlined text-lg">folder</span><span class="truncate">${name}</span>
+                </div>`;
+            }
+            const href = `${state.API_URL}${file.urls.member}&path=${encodeURIComponent(e.path)}`;
+            return `<a href="${href}" download class="flex items-center gap-2 py-1 hover:text-primary">
+                <span class="material-symbols-outlined text-lg">draft</span>
+                <span class="truncate flex-1">${name}</span>
+                <span class="text-xs text-slate-400">${formatSize(e.size)}</span>
+            </a>`;
+        }).join('');
+
+        docxViewer.innerHTML = `<div class="text-sm">
+            <p class="text-xs text-slate-500 mb-2">${data.data.total} entries (${data.data.format})</p>${rows}
+        </div>`;
+        docLoading.classList.add('hidden');
+        docxViewer.classList.remove('hidden');
+    } catch (err) {
+        console.error('Error loading archive:', err);
+        docLoading.classList.add('hidden');
+        docFallback.classList.remove('hidden');
+        document.getElementById('doc-fallback-message').textContent = 'Cannot list this archive.';
+    }
+}
+
 // Hide modals
 export function hidePreviewModal() {
     document.getElementById('image-preview-modal').classList.add('hidden');
@@ -290,7 +399,9 @@ export function hideDocModal() {
     pdfViewer.src = '';
     pdfViewer.classList.add('hidden');
     docxViewer.innerHTML = '';
+    docxViewer.onscroll = null;
     docxViewer.classList.add('hidden');
+    textViewer = null;
     document.getElementById('doc-loading').classList.add('hidden');
     document.getElementById('doc-fallback').classList.remove('hidden');
     document.getElementById('doc-preview-modal').classList.add('hidden');
@@ -3,7 +3,7 @@
  */
 
 import { state } from '../app.js';
-import { formatSize, formatDate } from './utils.js';
+import { formatSize, formatDate, escapeHtml } from './utils.js';
 
 // Get file icon
 export function getFileIcon(file) {
@@ -21,6 +21,192 @@ export function getFileIcon(file) {
     }
 }
 
+// Render a content-search snippet (server marks hits with \x02...\x03)
+export function renderSnippet(file) {
+    if (!file.snippet) return '';
+    const html = escapeHtml(file.snippet)
+        .replace(/\x02/g, '<mark class="bg-yellow-200 dark:bg-yellow-700 rounded px-0.5">')
+        .replace(/\x03/g, '</mark>');
+    return `<p class="text-xs text-slate-500 mt-1 line-clamp-2 break-all">${html}</p>`;
+}
+
+// ============ Windowed Rendering ============
+// Folders up to this size are rendered in full; larger ones only materialize
+// the rows around the viewport (plus OVERSCAN_ROWS above and below)
+const VIRTUAL_THRESHOLD = 300;
+const OVERSCAN_ROWS = 6;
+
+// Current view: container, files and rendered nodes keyed by file id
+let view = null;
+let framePending = false;
+let thumbObserver = null;
+
+// Lazy thumbnails: background images are only set once a card nears the viewport
+function observeThumbs(node) {
+    const thumbs = node.querySelectorAll('[data-thumb]');
+    if (!thumbs.length) return;
+
+    if (!thumbObserver) {
+        if (!('IntersectionObserver' in window)) {
+            thumbs.forEach(loadThumb);
+            return;
+        }
+        thumbObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (!entry.isIntersecting) return;
+                thumbObserver.unobserve(entry.target);
+                loadThumb(entry.target);
+            });
+        }, { root: getScroller(), rootMargin: '300px 0px' });
+    }
+    thumbs.forEach(el => thumbObserver.observe(el));
+}
+
+function loadThumb(el) {
+    el.style.backgroundImage = `url('${el.dataset.thumb}')`;
+    el.style.backgroundSize = 'cover';
+    el.style.backgroundPosition = 'center';
+    el.removeAttribute('data-thumb');
+}
+
+function releaseNode(node) {
+    if (thumbObserver) node.querySelectorAll('[data-thumb]').forEach(el => thumbObserver.unobserve(el));
+}
+
+function getScroller() {
+    return document.getElementById('files-grid').closest('main');
+}
+
+// Fields that affect a rendered item; unchanged items keep their DOM node
+function itemKey(file) {
+    return [file.original_filename, file.file_size, file.modified_at, file.is_favorite,
+        file.urls?.thumbnail, file.item_count, file.snippet || ''].join('|');
+}
+
+function createNode(file) {
+    const template = document.createElement('template');
+    template.innerHTML = (view.mode === 'grid' ? renderFileCard(file, view.isTrash) : renderFileRow(file, view.isTrash)).trim();
+    const node = template.content.firstElementChild;
+    node.dataset.key = itemKey(file);
+    observeThumbs(node);
+    return node;
+}
+
+function sampleKinds(files) {
+    return [files.some(f => f.is_folder), files.some(f => !f.is_folder && !f.snippet), files.some(f => f.snippet)].join();
+}
+
+// Measure columns and a uniform row height from probe items (one per kind)
+function measureView() {
+    const { container, files } = view;
+    const style = getComputedStyle(container);
+    view.gap = parseFloat(style.rowGap) || 0;
+    view.columns = view.mode === 'grid'
+        ? Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length)
+        : 1;
+
+    const probes = [];
+    const samples = [
+        files.find(f => f.is_folder),
+        files.find(f => !f.is_folder && !f.snippet),
+        files.find(f => f.snippet)
+    ].filter(Boolean);
+
+    container.style.gridAutoRows = '';
+    container.replaceChildren();
+    samples.forEach(file => {
+        const node = createNode(file);
+        releaseNode(node);
+        container.appendChild(node);
+        probes.push(node);
+    });
+    view.rowHeight = Math.max(...probes.map(node => node.offsetHeight), 1);
+    container.replaceChildren();
+    view.nodes.clear();
+
+    if (view.mode === 'grid') container.style.gridAutoRows = `${view.rowHeight}px`;
+}
+
+// Range of items to materialize for the current scroll position
+function visibleRange() {
+    const { files, columns, rowHeight, gap, container } = view;
+    if (!view.virtual) return { start: 0, end: files.length, padTop: 0, padBottom: 0 };
+
+    const scroller = getScroller();
+    const stride = rowHeight + gap;
+    const totalRows = Math.ceil(files.length / columns);
+    const offset = container.getBoundingClientRect().top - scroller.getBoundingClientRect().top;
+    const firstRow = Math.max(0, Math.floor(-offset / stride) - OVERSCAN_ROWS);
+    const lastRow = Math.min(totalRows, firstRow + Math.ceil(scroller.clientHeight / stride) + OVERSCAN_ROWS * 2);
+
+    return {
+        start: firstRow * columns,
+        end: Math.min(files.length, lastRow * columns),
+        padTop: firstRow * stride,
+        padBottom: Math.max(0, (totalRows - lastRow) * stride)
+    };
+}
+
+// Reconcile the container with the visible slice, reusing nodes by file id
+function renderWindow() {
+    if (!view) return;
+    const { container, files, nodes } = view;
+    const { start, end, padTop, padBottom } = visibleRange();
+
+    container.style.paddingTop = padTop ? `${padTop}px` : '';
+    container.style.paddingBottom = padBottom ? `${padBottom}px` : '';
+
+    const next = new Map();
+    const fragment = document.createDocumentFragment();
+    for (let i = start; i < end; i++) {
+        const file = files[i];
+        let node = nodes.get(file.id);
+        if (!node || node.dataset.key !== itemKey(file)) {
+            if (node) releaseNode(node);
+            node = createNode(file);
+        }
+        if (view.virtual && view.mode === 'list') node.style.height = `${view.rowHeight}px`;
+        next.set(file.id, node);
+        fragment.appendChild(node);
+    }
+
+    nodes.forEach((node, id) => {
+        if (!next.has(id)) releaseNode(node);
+    });
+    container.replaceChildren(fragment);
+    view.nodes = next;
+}
+
+function scheduleWindow() {
+    if (framePending || !view || !view.virtual) return;
+    framePending = true;
+    requestAnimationFrame(() => {
+        framePending = false;
+        renderWindow();
+    });
+}
+
+let listenersBound = false;
+function bindScrollListeners() {
+    if (listenersBound) return;
+    listenersBound = true;
+    getScroller().addEventListener('scroll', scheduleWindow, { passive: true });
+    window.addEventListener('resize', () => {
+        if (!view || !view.virtual) return;
+        requestAnimationFrame(() => {
+            if (!view || !view.virtual) return;
+            measureView();
+            renderWindow();
+        });
+    });
+}
+
+function resetContainer(container) {
+    container.style.paddingTop = '';
+    container.style.paddingBottom = '';
+    container.style.gridAutoRows = '';
+}
+
 // Render files grid/list
 export function renderFiles(files, isTrash = false) {
     const grid = document.getElementById('files-grid');
@@ -32,21 +218,44 @@ export function renderFiles(files, isTrash = false) {
         list.classList.add('hidden');
         empty.classList.remove('hidden');
         empty.classList.add('flex');
+        if (view) view.nodes.forEach(releaseNode);
+        view = null;
         return;
     }
 
     empty.classList.add('hidden');
     empty.classList.remove('flex');
 
-    if (state.viewMode === 'grid') {
-        grid.classList.remove('hidden');
-        list.classList.add('hidden');
-        grid.innerHTML = files.map(f => renderFileCard(f, isTrash)).join('');
-    } else {
-        grid.classList.add('hidden');
-        list.classList.remove('hidden');
-        list.innerHTML = files.map(f => renderFileRow(f, isTrash)).join('');
+    const mode = state.viewMode === 'grid' ? 'grid' : 'list';
+    const container = mode === 'grid' ? grid : list;
+    const other = mode === 'grid' ? list : grid;
+    container.classList.remove('hidden');
+    other.classList.add('hidden');
+
+    // Same container and trash flag: keep existing nodes so updates only patch changed items
+    if (!view || view.container !== container || view.isTrash !== isTrash) {
+        if (view) view.nodes.forEach(releaseNode);
+        other.replaceChildren();
+        resetContainer(other);
+        view = { container, mode, isTrash, nodes: new Map() };
+    }
+
+    const wasVirtual = view.virtual;
+    const kinds = sampleKinds(files);
+    view.files = files;
+    view.virtual = files.length > VIRTUAL_THRESHOLD;
+
+    if (view.virtual) {
+        bindScrollListeners();
+        // Row height only depends on which kinds of items are present
+        if (!wasVirtual || view.kinds !== kinds) measureView();
+        view.kinds = kinds;
+    } else if (wasVirtual) {
+        resetContainer(container);
+        view.nodes.forEach(node => { node.style.height = ''; });
     }
+
+    renderWindow();
 }
 
 // Render file card (grid view)
@@ -67,15 +276,16 @@ export function renderFileCard(file, isTrash) {
             <p class="text-xs text-slate-500 mt-1">${file.item_count || 0} items</p>
         </div>`;
     } else {
-        const thumbStyle = file.thumbnail_path ?
-            `background-image: url('${state.API_URL}/${file.thumbnail_path}'); background-size: cover; background-position: center;` : '';
-        const thumbContent = file.thumbnail_path ? '' :
+        // Loaded by the thumbnail observer once the card nears the viewport
+        const thumbUrl = file.thumbnail_path && file.urls?.thumbnail;
+        const thumbAttr = thumbUrl ? `data-thumb="${state.API_URL}${thumbUrl}"` : '';
+        const thumbContent = thumbUrl ? '' :
             `<span class="material-symbols-outlined text-5xl ${icon.color}">${icon.icon}</span>`;
 
         return `
         <div onclick="previewFile('${file.id}')" oncontextmenu="showContextMenu(event, '${file.id}')"
              class="group relative bg-white dark:bg-slate-800 border border-slate-200 dark:border-slate-700 rounded-xl overflow-hidden cursor-pointer hover:shadow-md hover:border-primary/50 transition-all">
-            <div class="aspect-[4/3] w-full bg-slate-100 dark:bg-slate-900 flex items-center justify-center relative overflow-hidden" style="${thumbStyle}">
+            <div class="aspect-[4/3] w-full bg-slate-100 dark:bg-slate-900 flex items-center justify-center relative overflow-hidden" ${thumbAttr}>
                 ${thumbContent}
                 <div class="absolute inset-0 bg-black/20 opacity-0 group-hover:opacity-100 transition-opacity flex items-center justify-center gap-2 z-10">
                     <button onclick="event.stopPropagation(); previewFile('${file.id}')" class="p-2 bg-white/90 rounded-full hover:bg-white text-slate-800 shadow-lg" title="Preview">
@@ -99,6 +309,7 @@ export function renderFileCard(file, isTrash) {
                     <span>${formatSize(file.file_size)}</span>
                     <span>${formatDate(file.modified_at)}</span>
                 </div>
+                ${renderSnippet(file)}
             </div>
         </div>`;
     }
@@ -120,11 +331,12 @@ export function renderFileRow(file, isTrash) {
                 ${file.is_favorite ? '<span class="material-symbols-outlined text-yellow-500 text-sm icon-fill">star</span>' : ''}
             </div>
             <p class="text-xs text-slate-500">${file.is_folder ? (file.item_count || 0) + ' items' : formatSize(file.file_size)}</p>
+            ${renderSnippet(file)}
         </div>
         <div class="text-xs text-slate-400 hidden sm:block w-32">${formatDate(file.modified_at)}</div>
         <div class="flex gap-1 opacity-0 group-hover/row:opacity-100 transition-opacity">
-            ${!file.is_folder ? `
-            <button onclick="event.stopPropagation(); downloadFile('${file.id}')" class="p-2 text-slate-400 hover:text-primary rounded-lg hover:bg-slate-100 dark:hover:bg-slate-600">
+            ${!file.is_folder || !isTrash ? `
+            <button onclick="event.stopPropagation(); ${file.is_folder ? 'downloadFolderArchive' : 'downloadFile'}('${file.id}')" class="p-2 text-slate-400 hover:text-primary rounded-lg hover:bg-slate-100 dark:hover:bg-slate-600" title="${file.is_folder ? 'Download as ZIP' : 'Download'}">
                 <span class="material-symbols-outlined text-lg">download</span>
             </button>` : ''}
             <button onclick="event.stopPropagation(); deleteFile('${file.id}')" class="p-2 text-slate-400 hover:text-red-500 rounded-lg hover:bg-red-50 dark:hover:bg-red-900/20">
@@ -5,7 +5,7 @@
 import { state } from '../app.js';
 import { formatSize } from './utils.js';
 import { showDuplicateDialog } from './dialogs.js';
-import { loadFiles, refreshCurrentView } from './files.js';
+import { refreshCurrentView } from './files.js';
 import { loadStorageInfo } from './storage.js';
 
 const CHUNK_SIZE = 5 * 1024 * 1024; // 5MB chunks
@@ -17,25 +17,29 @@ export async function handleUpload(event) {
     const files = event.target.files;
     if (!files.length) return;
 
+    // One call tells us which names in this drop already exist
+    const existing = await checkExistingNames(Array.from(files, f => f.name));
+
     // Start all uploads
     const uploadPromises = [];
 
     for (const file of files) {
-        uploadPromises.push(processUpload(file));
+        uploadPromises.push(processUpload(file, existing[file.name]));
     }
 
     // Wait for all uploads to complete
     await Promise.all(uploadPromises);
 
-    loadFiles(state.currentFolder);
+    refreshCurrentView();
     loadStorageInfo();
     event.target.value = '';
 }
 
-// Process single upload with duplicate check
-async function processUpload(file) {
-    // Check for duplicate file
-    const existingFile = await checkDuplicateFile(file.name);
+// Process single upload, asking what to do if the name is taken
+async function processUpload(file, existingFile) {
+    // Server resolves the final conflict atomically; 'rename' also covers
+    // names that appear between this check and the upload
+    let conflict = 'rename';
 
     if (existingFile) {
         const action = await showDuplicateDialog(file.name);
@@ -43,58 +47,49 @@ async function processUpload(file) {
         if (action === 'cancel') {
             return;
         } else if (action === 'replace') {
-            await fetch(`${state.API_URL}/api/files/${existingFile.id}`, {
-                method: 'DELETE',
-                headers: { 'Authorization': `Bearer ${state.token}` }
-            });
-        } else if (action === 'keep') {
-            const newName = generateUniqueName(file.name);
-            const renamedFile = new File([file], newName, { type: file.type });
-            return uploadFile(renamedFile);
+            conflict = 'replace';
         }
     }
 
-    return uploadFile(file);
+    return uploadFile(file, conflict);
 }
 
 // Upload file (chooses simple or chunked based on size)
-async function uploadFile(file) {
+async function uploadFile(file, conflict) {
     if (file.size > 10 * 1024 * 1024) {
-        await chunkedUpload(file);
+        await chunkedUpload(file, conflict);
     } else {
-        await simpleUpload(file);
+        await simpleUpload(file, conflict);
     }
 }
 
-// Check for duplicate file
-async function checkDuplicateFile(filename) {
+// Check which filenames already exist in the current folder
+async function checkExistingNames(names) {
     try {
-        const res = await fetch(`${state.API_URL}/api/files?folder_id=${state.currentFolder || ''}`, {
-            headers: { 'Authorization': `Bearer ${state.token}` }
+        const res = await fetch(`${state.API_URL}/api/files/exists`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${state.token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ folder_id: state.currentFolder, names })
         });
         const data = await res.json();
         if (data.success) {
-            return data.data.find(f => f.original_filename === filename && !f.is_folder);
+            return data.data.existing;
         }
     } catch (err) {
-        console.error('Error checking duplicate:', err);
+        console.error('Error checking duplicates:', err);
     }
-    return null;
-}
-
-// Generate unique name
-function generateUniqueName(filename) {
-    const lastDot = filename.lastIndexOf('.');
-    const name = lastDot > 0 ? filename.substring(0, lastDot) : filename;
-    const ext = lastDot > 0 ? filename.substring(lastDot) : '';
-    return `${name} (1)${ext}`;
+    return {};
 }
 
 // Simple upload for small files
-async function simpleUpload(file) {
+async function simpleUpload(file, conflict) {
     const formData = new FormData();
     formData.append('file', file);
     if (state.currentFolder) formData.append('folder_id', state.currentFolder);
+    if (conflict) formData.append('conflict', conflict);
 
     const progressId = showUploadProgress(file.name, 0, file.size, false);
     uploadProgressIds.set(file.name, progressId);
@@ -131,7 +126,7 @@ async function simpleUpload(file) {
 }
 
 // Chunked upload for large files
-async function chunkedUpload(file) {
+async function chunkedUpload(file, conflict) {
     const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
 
     // Show progress immediately
@@ -149,7 +144,8 @@ async function chunkedUpload(file) {
                 filename: file.name,
                 file_size: file.size,
                 total_chunks: totalChunks,
-                folder_id: state.currentFolder
+                folder_id: state.currentFolder,
+                conflict
             })
         });
 